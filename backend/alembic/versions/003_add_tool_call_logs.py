@@ -0,0 +1,47 @@
+"""Add tool_call_logs table
+
+Revision ID: 003_add_tool_call_logs
+Revises: c7a50d642d7d
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003_add_tool_call_logs'
+down_revision = 'c7a50d642d7d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """升级：创建 tool_call_logs 表"""
+    op.create_table(
+        'tool_call_logs',
+        sa.Column('id', sa.Integer(), nullable=False, autoincrement=True),
+        sa.Column('prefix', sa.String(length=50), nullable=False, comment='MCP 前缀'),
+        sa.Column('tool_name', sa.String(length=255), nullable=False, comment='工具名称'),
+        sa.Column('arguments_hash', sa.String(length=64), nullable=False, comment='参数 SHA-256 摘要（不保存原始参数）'),
+        sa.Column('status', sa.String(length=20), nullable=False, comment='结果：success/error'),
+        sa.Column('error', sa.Text(), nullable=True, comment='错误信息'),
+        sa.Column('latency_ms', sa.Float(), nullable=False, comment='调用耗时（毫秒）'),
+        sa.Column('response_bytes', sa.Integer(), nullable=False, comment='上游响应大小（字节）'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, comment='调用时间'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # 创建索引
+    op.create_index('ix_tool_call_logs_id', 'tool_call_logs', ['id'])
+    op.create_index('ix_tool_call_logs_prefix', 'tool_call_logs', ['prefix'])
+    op.create_index('ix_tool_call_logs_tool_name', 'tool_call_logs', ['tool_name'])
+    op.create_index('ix_tool_call_logs_status', 'tool_call_logs', ['status'])
+    op.create_index('ix_tool_call_logs_created_at', 'tool_call_logs', ['created_at'])
+    op.create_index('idx_tool_call_prefix_created', 'tool_call_logs', ['prefix', 'created_at'])
+    op.create_index('idx_tool_call_tool_created', 'tool_call_logs', ['tool_name', 'created_at'])
+
+
+def downgrade() -> None:
+    """降级：删除 tool_call_logs 表"""
+    op.drop_table('tool_call_logs')
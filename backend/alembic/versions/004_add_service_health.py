@@ -0,0 +1,37 @@
+"""Add service_health table
+
+Revision ID: 004_add_service_health
+Revises: 003_add_tool_call_logs
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_add_service_health'
+down_revision = '003_add_tool_call_logs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """升级：创建 service_health 表"""
+    op.create_table(
+        'service_health',
+        sa.Column('service_id', sa.Integer(), nullable=False, autoincrement=False, comment='服务 ID'),
+        sa.Column('last_checked_at', sa.DateTime(), nullable=True, comment='最近检查时间'),
+        sa.Column('last_success_at', sa.DateTime(), nullable=True, comment='最近一次检查成功的时间'),
+        sa.Column('latency_ms', sa.Float(), nullable=True, comment='最近一次获取文档的耗时（毫秒）'),
+        sa.Column('consecutive_failures', sa.Integer(), nullable=False, comment='连续失败次数'),
+        sa.Column('last_error', sa.Text(), nullable=True, comment='最近一次失败的错误信息'),
+        sa.Column('spec_hash', sa.String(length=64), nullable=True, comment='文档内容 SHA-256 摘要'),
+        sa.Column('spec_changed_at', sa.DateTime(), nullable=True, comment='文档内容最近一次变化的时间'),
+        sa.PrimaryKeyConstraint('service_id')
+    )
+
+
+def downgrade() -> None:
+    """降级：删除 service_health 表"""
+    op.drop_table('service_health')
@@ -0,0 +1,32 @@
+"""Add scheduler_leases table
+
+Revision ID: 005_add_scheduler_leases
+Revises: 004_add_service_health
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005_add_scheduler_leases'
+down_revision = '004_add_service_health'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """升级：创建 scheduler_leases 表"""
+    op.create_table(
+        'scheduler_leases',
+        sa.Column('name', sa.String(length=100), nullable=False, comment='任务名称'),
+        sa.Column('owner', sa.String(length=64), nullable=False, comment='持有租约的 worker 标识'),
+        sa.Column('expires_at', sa.DateTime(), nullable=False, comment='租约到期时间'),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    """降级：删除 scheduler_leases 表"""
+    op.drop_table('scheduler_leases')
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth import get_current_user
 from core.database import get_db
+from mcp.registry import server_registry
 from models.combination import Combination, CombinationCreate, CombinationUpdate
 from repositories.combination_repository import CombinationRepository
 
@@ -96,6 +97,9 @@ async def update_combination(
     if not db_combination:
         raise HTTPException(status_code=404, detail=f"组合 ID {combination_id} 不存在")
 
+    # 使引用该组合的 MCP Server 失效
+    await server_registry.invalidate_combination(combination_id)
+
     return Combination.from_orm(db_combination)
 
 
@@ -133,6 +137,9 @@ async def toggle_combination_status(
     await db.commit()
     await db.refresh(existing)
 
+    # 使引用该组合的 MCP Server 失效
+    await server_registry.invalidate_combination(combination_id)
+
     return Combination.from_orm(existing)
 
 
@@ -151,4 +158,8 @@ async def delete_combination(
         raise HTTPException(status_code=404, detail=f"组合 ID {combination_id} 不存在")
 
     await db.commit()
+
+    # 使引用该组合的 MCP Server 失效
+    await server_registry.invalidate_combination(combination_id)
+
     return None
@@ -2,13 +2,18 @@
 """
 Dashboard API 路由
 """
-from fastapi import APIRouter, Depends
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth import get_current_user
 from core.database import get_db
 from models.db_models import CombinationDB, McpServerDB, ServiceDB
+from mcp.session import session_manager
+from services.tool_stats import MAX_WINDOW_MINUTES, tool_stats
+from services.upstream_pool import upstream_pool
 
 # 路由器级别添加 JWT 认证依赖，所有端点都需要登录
 router = APIRouter(
@@ -101,3 +106,35 @@ async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
         },
         "recent_items": recent_items
     }
+
+
+@router.get("/upstream")
+async def get_upstream_stats():
+    """
+    获取上游连接池统计（每个上游的使用中 / 空闲连接数和等待请求数）
+    """
+    return upstream_pool.get_stats()
+
+
+@router.get("/sessions")
+async def get_session_stats():
+    """
+    获取 MCP 会话统计（连接数、排队消息数、溢出丢弃 / 合并的消息数）
+    """
+    return session_manager.get_stats()
+
+
+@router.get("/tools")
+async def get_tool_stats(
+    window: int = Query(15, ge=1, le=MAX_WINDOW_MINUTES, description="统计窗口（分钟）"),
+    limit: int = Query(10, ge=1, le=100),
+    sort: Literal["calls", "p95_ms", "error_rate", "response_bytes"] = "calls",
+    prefix: Optional[str] = None
+):
+    """
+    获取滚动窗口内的工具调用统计
+
+    按调用量（或 p95 延迟、错误率、响应大小）排序的热门工具，
+    包括 p50/p95/p99 延迟、错误率和返回字节数；数据来自内存聚合，不查询数据库。
+    """
+    return tool_stats.snapshot(window_minutes=window, limit=limit, sort_by=sort, prefix=prefix)
@@ -4,18 +4,18 @@ MCP 协议端点（HTTP + SSE 传输）
 """
 import asyncio
 import json
-from fastapi import APIRouter, HTTPException, Request, Depends
+from typing import Any, Awaitable, Callable, Optional
+from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from fastapi.responses import JSONResponse
 from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.database import get_db
+from core.tracing import tracer
 from mcp.protocol import JsonRpcRequest, McpError, create_error_response
-from mcp.server import McpServerHandler
-from mcp.session import session_manager
-from models.combination import Combination
-from models.mcp_server import McpServer
-from repositories.combination_repository import CombinationRepository
+from mcp.registry import server_registry
+from mcp.server import McpServerHandler, NotifyCallback
+from mcp.session import parse_event_id, session_manager
 from repositories.mcp_server_repository import McpServerRepository
 
 router = APIRouter(prefix="/mcp", tags=["mcp-protocol"])
@@ -27,13 +27,15 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
     标准 MCP 协议端点（HTTP + SSE 传输）
 
     符合 MCP 官方标准，同时支持 GET 和 POST 请求：
-    - GET: 打开 SSE 流接收服务器推送消息
-    - POST: 发送 JSON-RPC 请求并获取响应
+    - GET: 打开 SSE 流接收服务器推送消息（每个会话同时只有一个流，新打开的流接管旧的流）
+    - POST: 发送 JSON-RPC 请求并获取响应（支持 JSON-RPC 批量数组，条目并发执行）；
+      Accept 包含 text/event-stream 时以 SSE 流返回进度通知和最终结果（Streamable HTTP）
 
     支持的 HTTP 头：
     - Mcp-Session-Id: 会话标识（POST 请求必需）
+    - Last-Event-ID: 断线重连时最后收到的事件 ID（GET 请求，宽限期内重放未收到的事件）
     - MCP-Protocol-Version: 协议版本（必需）
-    - Accept: text/event-stream（GET 请求）
+    - Accept: text/event-stream（GET 请求；POST 请求时启用流式响应）
 
     Claude Desktop 配置示例：
     {
@@ -44,15 +46,31 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
       }
     }
     """
-    # 查找对应的 MCP Server
-    server_repo = McpServerRepository(db)
-    mcp_server = await server_repo.get_by_prefix(prefix)
+    # 根 Span：延续客户端传入的 W3C traceparent
+    scope = tracer.span(
+        "mcp.request",
+        traceparent=request.headers.get("traceparent"),
+        prefix=prefix,
+        http_method=request.method
+    )
+    with scope as span:
+        response = await _handle_mcp_request(prefix, request, db)
+        # SSE 流在返回响应后才执行：Span 延续到流结束，流中的 mcp.rpc / tool.call 仍是其子 Span
+        if span is not None and isinstance(response, EventSourceResponse):
+            response.body_iterator = scope.defer(response.body_iterator)
+        return response
 
-    if not mcp_server:
+
+async def _handle_mcp_request(prefix: str, request: Request, db: AsyncSession):
+    """处理 MCP 协议请求（见 mcp_endpoint）"""
+    # 从注册表获取已编译的 MCP Server（缓存未命中时才访问数据库）
+    handler = await server_registry.get_handler(prefix, db)
+
+    if not handler:
         raise HTTPException(status_code=404, detail=f"MCP Server with prefix '{prefix}' not found")
 
     # 检查服务状态
-    if mcp_server.status != "active":
+    if handler.server_config.get("status") != "active":
         raise HTTPException(status_code=403, detail=f"MCP Server '{prefix}' is inactive")
 
     # 获取协议版本（如果提供）
@@ -63,14 +81,28 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
         # 获取或创建会话
         session_id = request.headers.get("Mcp-Session-Id")
 
+        # 断线重连：Last-Event-ID 中携带会话 ID 和最后收到的事件序号
+        resume_seq = None
+        last_event_id = request.headers.get("Last-Event-ID")
+        if last_event_id:
+            parsed = parse_event_id(last_event_id)
+            if parsed:
+                event_session_id, resume_seq = parsed
+                session_id = session_id or event_session_id
+                if event_session_id != session_id:
+                    resume_seq = None
+
         if session_id:
-            # 验证现有会话
+            # 验证现有会话（宽限期内断开的会话仍可恢复）
             session = await session_manager.get_session(session_id)
             if not session or session.prefix != prefix:
                 raise HTTPException(status_code=404, detail="Invalid session ID")
+            # 会话队列只有一个消费者：新的 SSE 流接管旧的流（旧流随即结束）
+            stream_id = await session_manager.attach_stream(session)
         else:
             # 创建新会话
             session = await session_manager.create_session(prefix)
+            stream_id = session_manager.mark_connected(session)
 
         async def event_generator():
             """SSE 事件生成器"""
@@ -87,23 +119,30 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
                     })
                 }
 
+                # 重放客户端断线期间未收到的事件
+                if resume_seq is not None:
+                    for event_id, message in session.events_after(resume_seq):
+                        yield message.to_bytes(event_id)
+
                 # 持续监听队列中的消息
                 while True:
                     try:
                         # 等待消息，设置超时以便定期发送 keepalive
                         message = await asyncio.wait_for(
-                            session.queue.get(),
+                            session.next_message(stream_id),
                             timeout=30.0  # 30秒超时
                         )
 
-                        # 发送消息（可以是通知、请求或响应）
-                        yield {
-                            "event": "message",
-                            "data": json.dumps(message)
-                        }
+                        # 会话因队列溢出被服务端关闭，或 SSE 流已被新的流接管
+                        if message is None:
+                            break
+
+                        # 直接写出预编码的帧，只拼接本会话单调递增的事件 ID
+                        yield message.to_bytes(session.record_event(message))
 
-                        # 更新会话活动时间
+                        # 更新会话活动时间（同时刷新共享后端中的记录）
                         session.update_activity()
+                        await session_manager.touch_session(session)
 
                     except asyncio.TimeoutError:
                         # 发送 keepalive 心跳
@@ -112,13 +151,14 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
                             "data": json.dumps({"type": "ping"})
                         }
                         session.update_activity()
+                        await session_manager.touch_session(session)
 
             except asyncio.CancelledError:
                 # 客户端断开连接
                 print(f"SSE connection closed for session {session.session_id}")
             finally:
-                # 清理会话
-                await session_manager.remove_session(session.session_id)
+                # 保留会话等待重连，宽限期后自动清理
+                session_manager.mark_disconnected(session, stream_id)
 
         # 返回 SSE 响应，带会话 ID 头
         response = EventSourceResponse(event_generator())
@@ -131,6 +171,11 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
         # 解析 JSON-RPC 请求
         try:
             body = await request.json()
+
+            # JSON-RPC 批量请求（数组）
+            if isinstance(body, list):
+                return await _handle_batch(prefix, body, request, handler, protocol_version)
+
             rpc_request = JsonRpcRequest(**body)
         except Exception as e:
             error_response = create_error_response(
@@ -142,24 +187,11 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
             response.headers["MCP-Protocol-Version"] = protocol_version
             return response
 
-        # 获取所有组合（用于 McpServerHandler）
-        comb_repo = CombinationRepository(db)
-        all_combinations = await comb_repo.get_all()
-        combinations_list = [Combination.from_orm(c).model_dump() for c in all_combinations]
-
         # 特殊处理 initialize 请求
         if rpc_request.method == "initialize":
             # 创建新会话
             session = await session_manager.create_session(prefix)
 
-            # 创建 MCP Server Handler
-            server_dict = McpServer.from_orm(mcp_server).model_dump()
-
-            handler = McpServerHandler(
-                server_config=server_dict,
-                combinations=combinations_list
-            )
-
             # 处理初始化请求
             result = await handler.handle_request(
                 method=rpc_request.method,
@@ -200,13 +232,17 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
         # 更新会话活动时间
         session.update_activity()
 
-        # 创建 MCP Server Handler
-        server_dict = McpServer.from_orm(mcp_server).model_dump()
+        # Streamable HTTP：客户端接受 SSE 时以事件流返回进度通知和最终结果
+        if _accepts_event_stream(request):
+            async def run(notify: NotifyCallback):
+                return await handler.handle_request(
+                    method=rpc_request.method,
+                    params=rpc_request.params,
+                    request_id=rpc_request.id,
+                    notify=notify
+                )
 
-        handler = McpServerHandler(
-            server_config=server_dict,
-            combinations=combinations_list
-        )
+            return _stream_response(run, session_id, protocol_version)
 
         # 处理请求
         result = await handler.handle_request(
@@ -222,6 +258,170 @@ async def mcp_endpoint(prefix: str, request: Request, db: AsyncSession = Depends
         return response
 
 
+def _accepts_event_stream(request: Request) -> bool:
+    """判断客户端是否接受 SSE 流式响应（Streamable HTTP）"""
+    return "text/event-stream" in request.headers.get("Accept", "")
+
+
+def _stream_response(
+    run: Callable[[NotifyCallback], Awaitable[Any]],
+    session_id: str,
+    protocol_version: str
+) -> EventSourceResponse:
+    """
+    以 SSE 流返回 POST 请求的处理结果（Streamable HTTP 传输）
+
+    处理过程中产生的通知（如 notifications/progress）实时推送，
+    最后推送 JSON-RPC 响应并结束流；等待期间由 sse_starlette 定期发送 ping 保活。
+
+    Args:
+        run: 处理函数，接收通知回调并返回 JSON-RPC 响应（或批量响应数组）
+        session_id: 会话 ID
+        protocol_version: 协议版本
+
+    Returns:
+        SSE 响应
+    """
+    # 每个请求独立的通知队列，避免进度通知混入会话的 GET 流
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def notify(message: dict):
+        await queue.put(message)
+
+    async def event_generator():
+        task = asyncio.create_task(run(notify))
+        # 处理完成后放入哨兵，结束通知转发
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                yield {
+                    "event": "message",
+                    "data": json.dumps(message)
+                }
+
+            result = task.result()
+            if result:
+                yield {
+                    "event": "message",
+                    "data": json.dumps(result)
+                }
+        finally:
+            # 客户端提前断开时取消仍在进行的上游调用
+            if not task.done():
+                task.cancel()
+
+    response = EventSourceResponse(event_generator())
+    response.headers["Mcp-Session-Id"] = session_id
+    response.headers["MCP-Protocol-Version"] = protocol_version
+    return response
+
+
+async def _handle_batch(
+    prefix: str,
+    items: list,
+    request: Request,
+    handler: McpServerHandler,
+    protocol_version: str
+) -> Response:
+    """
+    处理 JSON-RPC 2.0 批量请求
+
+    各条目并发执行（例如多个 tools/call 同时调用各自的上游），
+    响应按请求顺序合并为一个数组返回；通知（无 id）不产生响应。
+
+    Args:
+        prefix: MCP Server 前缀
+        items: 批量请求数组
+        request: HTTP 请求
+        handler: 已编译的 MCP Server Handler
+        protocol_version: 协议版本
+
+    Returns:
+        HTTP 响应
+    """
+    if not items:
+        error_response = create_error_response(
+            code=McpError.INVALID_REQUEST,
+            message="Empty batch request",
+            id=None
+        )
+        response = JSONResponse(content=error_response, status_code=400)
+        response.headers["MCP-Protocol-Version"] = protocol_version
+        return response
+
+    # 批量请求需要已建立的会话（initialize 不能出现在批量请求中）
+    session_id = request.headers.get("Mcp-Session-Id")
+    session = await session_manager.get_session(session_id) if session_id else None
+    if not session or session.prefix != prefix:
+        error_response = create_error_response(
+            code=McpError.INVALID_REQUEST,
+            message="Missing Mcp-Session-Id header" if not session_id else "Invalid session ID",
+            id=None
+        )
+        response = JSONResponse(content=error_response, status_code=400 if not session_id else 404)
+        response.headers["MCP-Protocol-Version"] = protocol_version
+        return response
+
+    # 更新会话活动时间
+    session.update_activity()
+
+    async def run_item(item, notify: Optional[NotifyCallback] = None) -> Optional[dict]:
+        """执行单个批量条目，通知返回 None"""
+        if not isinstance(item, dict):
+            return create_error_response(
+                code=McpError.INVALID_REQUEST,
+                message="Invalid JSON-RPC request: batch item must be an object",
+                id=None
+            )
+
+        try:
+            rpc_request = JsonRpcRequest(**item)
+        except Exception as e:
+            return create_error_response(
+                code=McpError.INVALID_REQUEST,
+                message=f"Invalid JSON-RPC request: {str(e)}",
+                id=item.get("id")
+            )
+
+        if rpc_request.method == "initialize":
+            result = create_error_response(
+                code=McpError.INVALID_REQUEST,
+                message="initialize must not be part of a batch",
+                id=rpc_request.id
+            )
+        else:
+            result = await handler.handle_request(
+                method=rpc_request.method,
+                params=rpc_request.params,
+                request_id=rpc_request.id,
+                notify=notify
+            )
+
+        return result if "id" in item else None
+
+    async def run_batch(notify: Optional[NotifyCallback] = None) -> list:
+        results = await asyncio.gather(*(run_item(item, notify) for item in items))
+        return [result for result in results if result is not None]
+
+    # Streamable HTTP：以事件流返回
+    if _accepts_event_stream(request):
+        return _stream_response(run_batch, session.session_id, protocol_version)
+
+    responses = await run_batch()
+
+    # 全部为通知时没有响应体
+    if not responses:
+        response = Response(status_code=202)
+    else:
+        response = JSONResponse(content=responses)
+    response.headers["Mcp-Session-Id"] = session.session_id
+    response.headers["MCP-Protocol-Version"] = protocol_version
+    return response
+
+
 @router.get("/{prefix}/config")
 async def get_mcp_config(prefix: str, db: AsyncSession = Depends(get_db)):
     """
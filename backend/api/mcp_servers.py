@@ -8,10 +8,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth import get_current_user
 from core.database import get_db
+from mcp.registry import server_registry
 from models.mcp_server import McpServer, McpServerCreate, McpServerUpdate
 from repositories.combination_repository import CombinationRepository
 from repositories.mcp_server_repository import McpServerRepository
-from mcp.session import session_manager
+from mcp.session import notify_tools_changed
 
 # 路由器级别添加 JWT 认证依赖，所有端点都需要登录
 router = APIRouter(
@@ -21,22 +22,6 @@ router = APIRouter(
 )
 
 
-async def notify_tools_changed(prefix: str):
-    """
-    通知工具列表已变更
-
-    Args:
-        prefix: MCP Server 前缀
-    """
-    notification = {
-        "jsonrpc": "2.0",
-        "method": "notifications/tools/list_changed"
-    }
-
-    await session_manager.broadcast_to_prefix(prefix, notification)
-    print(f"Notified tools changed for prefix: {prefix}")
-
-
 @router.get("", response_model=list[McpServer])
 async def get_mcp_servers(db: AsyncSession = Depends(get_db)):
     """
@@ -93,6 +78,10 @@ async def create_mcp_server(
     )
 
     await db.commit()
+
+    # 清除可能残留的同前缀缓存（例如删除后重建）
+    await server_registry.invalidate(db_server.prefix)
+
     return McpServer.from_orm(db_server)
 
 
@@ -133,7 +122,8 @@ async def update_mcp_server(
     if not db_server:
         raise HTTPException(status_code=404, detail=f"MCP 服务 ID {server_id} 不存在")
 
-    # 通知工具列表已变更
+    # 使注册表中的已编译 Handler 失效，并通知工具列表已变更
+    await server_registry.invalidate(db_server.prefix)
     await notify_tools_changed(db_server.prefix)
 
     return McpServer.from_orm(db_server)
@@ -165,7 +155,8 @@ async def toggle_mcp_server_status(
     await db.commit()
     await db.refresh(existing)
 
-    # 通知工具列表已变更
+    # 使注册表中的已编译 Handler 失效，并通知工具列表已变更
+    await server_registry.invalidate(existing.prefix)
     await notify_tools_changed(existing.prefix)
 
     return McpServer.from_orm(existing)
@@ -181,9 +172,18 @@ async def delete_mcp_server(
     """
     repo = McpServerRepository(db)
 
+    existing = await repo.get_by_id(server_id)
+    if not existing:
+        raise HTTPException(status_code=404, detail=f"MCP 服务 ID {server_id} 不存在")
+    prefix = existing.prefix
+
     success = await repo.delete(server_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"MCP 服务 ID {server_id} 不存在")
 
     await db.commit()
+
+    # 使注册表中的已编译 Handler 失效
+    await server_registry.invalidate(prefix)
+
     return None
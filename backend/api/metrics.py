@@ -0,0 +1,56 @@
+# backend/api/metrics.py
+"""
+Prometheus 指标 API 路由
+"""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from core.metrics import (
+    metrics,
+    mcp_adopted_sessions_total,
+    mcp_coalesced_messages_total,
+    mcp_dropped_messages_total,
+    mcp_overflow_disconnects_total,
+    mcp_queued_messages,
+    mcp_sessions,
+    mcp_sessions_connected,
+    mcp_stream_takeovers_total,
+    upstream_connections
+)
+from mcp.session import session_manager
+from services.upstream_pool import upstream_pool
+
+# 供 Prometheus 抓取，与 MCP 协议端点一样不受认证保护
+router = APIRouter(tags=["metrics"])
+
+
+def _collect_snapshots():
+    """抓取时根据会话管理器和上游连接池的当前状态刷新仪表和累计计数"""
+    stats = session_manager.get_stats()
+    mcp_sessions.clear()
+    for prefix, count in stats["sessions_by_prefix"].items():
+        mcp_sessions.set(count, prefix=prefix)
+    mcp_sessions_connected.set(stats["connected_sessions"])
+    mcp_queued_messages.set(stats["queued_messages"])
+    mcp_dropped_messages_total.set_total(stats["dropped_messages"])
+    mcp_coalesced_messages_total.set_total(stats["coalesced_messages"])
+    mcp_overflow_disconnects_total.set_total(stats["overflow_disconnects"])
+    mcp_adopted_sessions_total.set_total(stats["adopted_sessions"])
+    mcp_stream_takeovers_total.set_total(stats["stream_takeovers"])
+
+    upstream_connections.clear()
+    for origin, pool in upstream_pool.get_stats()["upstreams"].items():
+        for state in ("in_use", "idle", "waiting"):
+            upstream_connections.set(pool[state], origin=origin, state=state)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus 文本格式指标
+
+    包括按前缀 / 工具统计的调用次数、上游延迟直方图、错误类别、响应大小、
+    数据库语句耗时以及 MCP 会话和上游连接池仪表。
+    """
+    _collect_snapshots()
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
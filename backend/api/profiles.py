@@ -0,0 +1,70 @@
+# backend/api/profiles.py
+"""
+请求剖析结果 API 路由
+
+管理员在任意管理或 MCP 请求上加 X-Synapse-Profile: 1 头（或 ?_profile=1）触发剖析，
+响应头 X-Synapse-Profile-Id 中返回结果 ID，通过本路由查看。仅管理员可以访问。
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core.auth import get_current_admin_user
+from core.profiling import profiler
+
+router = APIRouter(
+    prefix="/api/v1/profiles",
+    tags=["profiles"],
+    dependencies=[Depends(get_current_admin_user)]  # 所有端点都需要管理员权限
+)
+
+
+@router.get("")
+async def list_profiles():
+    """
+    获取内存中保留的剖析结果摘要（最新的在前）
+
+    Returns:
+        剖析结果摘要列表
+    """
+    profiles = profiler.list_profiles()
+    return {"profiles": profiles, "total": len(profiles)}
+
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str):
+    """
+    获取剖析结果详情：按累计耗时排序的函数（含调用方）和最慢的 SQL 语句
+
+    Args:
+        profile_id: 剖析结果 ID
+
+    Returns:
+        剖析结果
+    """
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.to_dict()
+
+
+@router.get("/{profile_id}/pstats", response_class=PlainTextResponse)
+async def get_profile_text(profile_id: str):
+    """
+    以 pstats 文本格式获取剖析结果
+
+    Args:
+        profile_id: 剖析结果 ID
+
+    Returns:
+        pstats 输出文本
+    """
+    profile = profiler.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile.stats_text
+
+
+@router.delete("", status_code=204)
+async def clear_profiles():
+    """清空剖析结果"""
+    profiler.clear()
@@ -2,13 +2,18 @@
 """
 服务管理 API 路由
 """
-from fastapi import APIRouter, HTTPException, Path, Depends
+import httpx
+from fastapi import APIRouter, HTTPException, Path, Query, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.auth import get_current_user
 from core.database import get_db
-from models.service import Service, ServiceCreate, ServiceUpdate
+from models.service import Service, ServiceCreate, ServiceHealth, ServiceUpdate
+from repositories.service_health_repository import ServiceHealthRepository
 from repositories.service_repository import ServiceRepository
+from services.endpoint_index import endpoint_index
+from services.service_health import service_health_scheduler
+from services.spec_sync import resync_service
 
 # 路由器级别添加 JWT 认证依赖，所有端点都需要登录
 router = APIRouter(
@@ -28,6 +33,15 @@ async def get_services(db: AsyncSession = Depends(get_db)):
     return [Service.from_orm(s) for s in db_services]
 
 
+@router.get("/health", response_model=list[ServiceHealth])
+async def get_services_health(db: AsyncSession = Depends(get_db)):
+    """
+    获取所有服务的健康检查状态（由后台调度器定期更新）
+    """
+    repo = ServiceHealthRepository(db)
+    return [ServiceHealth.from_orm(h) for h in await repo.get_all()]
+
+
 @router.get("/{service_id}", response_model=Service)
 async def get_service(
     service_id: int = Path(..., description="服务 ID"),
@@ -63,6 +77,9 @@ async def create_service(
     )
 
     await db.commit()
+
+    # 建立接口索引（文档获取失败时只打印警告，健康检查成功后会补上）
+    await endpoint_index.refresh_service(db_service.id, db_service.name, db_service.url)
     return Service.from_orm(db_service)
 
 
@@ -95,9 +112,50 @@ async def update_service(
     if not db_service:
         raise HTTPException(status_code=404, detail=f"服务 ID {service_id} 不存在")
 
+    if service_update.name is not None or service_update.url is not None:
+        await endpoint_index.refresh_service(db_service.id, db_service.name, db_service.url)
+
     return Service.from_orm(db_service)
 
 
+@router.post("/{service_id}/check", response_model=ServiceHealth)
+async def check_service_health(
+    service_id: int = Path(..., description="服务 ID")
+):
+    """
+    立即检查服务：重新验证文档并更新状态，文档变化时自动同步到组合
+    """
+    health = await service_health_scheduler.check_service(service_id)
+    if health is None:
+        raise HTTPException(status_code=404, detail=f"服务 ID {service_id} 不存在")
+    return health
+
+
+@router.post("/{service_id}/resync")
+async def resync_service_endpoints(
+    service_id: int = Path(..., description="服务 ID"),
+    dry_run: bool = Query(False, description="只返回差异，不修改组合"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    重新获取服务文档，只更新组合中有变化的接口定义，
+    并只通知引用了这些组合的 MCP 服务
+    """
+    repo = ServiceRepository(db)
+    db_service = await repo.get_by_id(service_id)
+    if not db_service:
+        raise HTTPException(status_code=404, detail=f"服务 ID {service_id} 不存在")
+
+    try:
+        result = await resync_service(db, db_service, dry_run=dry_run)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except (httpx.HTTPError, ValueError) as e:
+        raise HTTPException(status_code=502, detail=f"获取服务文档失败: {e}")
+
+    return result.to_dict()
+
+
 @router.delete("/{service_id}", status_code=204)
 async def delete_service(
     service_id: int = Path(..., description="服务 ID"),
@@ -111,6 +169,8 @@ async def delete_service(
     success = await repo.delete(service_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"服务 ID {service_id} 不存在")
+    await ServiceHealthRepository(db).delete(service_id)
 
     await db.commit()
+    await endpoint_index.remove_service(service_id)
     return None
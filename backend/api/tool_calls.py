@@ -0,0 +1,87 @@
+# backend/api/tool_calls.py
+"""
+工具调用审计日志 API 路由
+
+提供最近调用记录和错误率查询，仅管理员可以访问。
+"""
+from datetime import datetime, timedelta
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.auth import get_current_admin_user
+from core.database import get_db
+from models.tool_call import ToolCallLog, ToolCallLogListResponse
+from repositories.tool_call_log_repository import ToolCallLogRepository
+from services.tool_call_log import tool_call_logger
+
+router = APIRouter(
+    prefix="/api/v1/tool-calls",
+    tags=["tool-calls"],
+    dependencies=[Depends(get_current_admin_user)]  # 所有端点都需要管理员权限
+)
+
+
+@router.get("", response_model=ToolCallLogListResponse)
+async def list_recent_calls(
+    limit: int = Query(100, ge=1, le=1000),
+    prefix: Optional[str] = None,
+    tool: Optional[str] = None,
+    status: Optional[Literal["success", "error"]] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取最近的工具调用记录（仅管理员）
+
+    记录由后台任务批量写入，最近几秒内的调用可能仍在内存缓冲区中。
+
+    Args:
+        limit: 返回的最大记录数
+        prefix: 按 MCP 前缀过滤
+        tool: 按工具名称过滤
+        status: 按调用结果过滤
+        db: 数据库会话
+
+    Returns:
+        调用记录列表
+    """
+    repo = ToolCallLogRepository(db)
+    calls = await repo.get_recent(limit=limit, prefix=prefix, tool_name=tool, status=status)
+    return ToolCallLogListResponse(
+        calls=[ToolCallLog.from_orm(call) for call in calls],
+        total=len(calls)
+    )
+
+
+@router.get("/stats")
+async def get_tool_call_stats(
+    minutes: int = Query(60, ge=1, le=60 * 24 * 30),
+    prefix: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取指定时间窗口内按工具统计的调用次数、错误率和耗时（仅管理员）
+
+    Args:
+        minutes: 统计窗口（分钟）
+        prefix: 按 MCP 前缀过滤
+        db: 数据库会话
+
+    Returns:
+        各工具的统计结果和审计日志缓冲区状态
+    """
+    repo = ToolCallLogRepository(db)
+    since = datetime.now() - timedelta(minutes=minutes)
+    tools = await repo.get_error_rates(since=since, prefix=prefix)
+
+    calls = sum(item["calls"] for item in tools)
+    errors = sum(item["errors"] for item in tools)
+    return {
+        "since": since,
+        "calls": calls,
+        "errors": errors,
+        "error_rate": round(errors / calls, 4) if calls else 0.0,
+        "tools": tools,
+        "buffer": tool_call_logger.get_stats(),
+    }
@@ -2,12 +2,15 @@
 """
 工具相关 API 路由（OpenAPI 转换）
 """
+import time
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Depends
 
 from core.auth import get_current_user
 from mcp.openapi_to_mcp import convert_openapi_to_mcp
-from services.openapi_fetcher import fetch_openapi_spec, extract_api_endpoints
+from services.cpu_pool import cpu_pool
+from services.endpoint_index import endpoint_index
+from services.openapi_fetcher import SCHEMA_MODES, fetch_openapi_spec, extract_api_endpoints
 
 # 路由器级别添加 JWT 认证依赖，所有端点都需要登录
 router = APIRouter(
@@ -64,14 +67,51 @@ MOCK_OPENAPI_SPEC = {
 }
 
 
+@router.get("/api/v1/endpoints/search")
+async def search_endpoints(
+    q: str = Query("", max_length=200, description="Search text matched against path, method, summary, description, operationId and tags (prefix match, all words required)."),
+    method: Optional[str] = Query(None, description="Only return endpoints with this HTTP method."),
+    service_id: Optional[int] = Query(None, description="Only return endpoints of this service."),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100)
+):
+    """
+    Searches the endpoint index built from every registered service's spec.
+    The index is refreshed incrementally whenever a service spec is fetched or revalidated.
+    """
+    started = time.perf_counter()
+    total, items = endpoint_index.search(
+        query=q,
+        method=method,
+        service_id=service_id,
+        offset=(page - 1) * page_size,
+        limit=page_size
+    )
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "took_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
+
+
 @router.get("/api/v1/endpoints")
-async def get_api_endpoints(url: str = Query(..., description="URL to the OpenAPI 3.0 specification.")):
+async def get_api_endpoints(
+    url: str = Query(..., description="URL to the OpenAPI 3.0 specification."),
+    schema_mode: str = Query(
+        "inline",
+        pattern=f"^({'|'.join(SCHEMA_MODES)})$",
+        description="inline: expand $refs in place; defs: keep shared components in per-endpoint schemaDefs (emitted as $defs)"
+    ),
+    refresh: bool = Query(False, description="Revalidate the cached spec with the upstream immediately.")
+):
     """
     Fetches an OpenAPI 3.0 specification and returns a simplified list of its endpoints.
     """
     try:
-        openapi_spec = await fetch_openapi_spec(url)
-        endpoints = extract_api_endpoints(openapi_spec)
+        openapi_spec = await fetch_openapi_spec(url, force_refresh=refresh)
+        endpoints = await cpu_pool.run(extract_api_endpoints, openapi_spec, schema_mode=schema_mode)
         return endpoints
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -80,22 +120,25 @@ async def get_api_endpoints(url: str = Query(..., description="URL to the OpenAP
 
 
 @router.get("/mcp/v1/tools")
-async def get_mcp_tools(openapi_url: Optional[str] = Query(
-    None,
-    description="URL to the OpenAPI 3.0 specification. If not provided, a mock spec will be used."
-)):
+async def get_mcp_tools(
+    openapi_url: Optional[str] = Query(
+        None,
+        description="URL to the OpenAPI 3.0 specification. If not provided, a mock spec will be used."
+    ),
+    refresh: bool = Query(False, description="Revalidate the cached spec with the upstream immediately.")
+):
     """
     Exposes converted MCP Tools from an OpenAPI 3.0 specification.
     """
     try:
         if openapi_url:
-            openapi_spec = await fetch_openapi_spec(openapi_url)
+            openapi_spec = await fetch_openapi_spec(openapi_url, force_refresh=refresh)
         else:
             # Use the mock spec if no URL is provided
             openapi_spec = MOCK_OPENAPI_SPEC
             print("Using mock OpenAPI spec.")
 
-        mcp_tools = convert_openapi_to_mcp(openapi_spec)
+        mcp_tools = await cpu_pool.run(convert_openapi_to_mcp, openapi_spec)
         return mcp_tools
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=f"OpenAPI spec file not found: {e}")
@@ -0,0 +1,7 @@
+"""
+Synapse 基准测试工具
+
+- specs: 合成 OpenAPI 文档生成器
+- mock_upstream: 根据 OpenAPI 文档生成的模拟上游服务
+- load_test: 模拟 MCP 客户端集群的网关压测
+"""
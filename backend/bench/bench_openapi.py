@@ -0,0 +1,234 @@
+"""
+OpenAPI 解析与工具转换微基准
+对合成文档（宽 / 深 / 循环 / 企业形态）逐阶段测量耗时和峰值内存：
+- parse: parse_spec_content 解析文档文本（安装 orjson 时使用 orjson）
+- resolve: 解析 components/schemas 中每个模型的 $ref
+- extract: extract_api_endpoints 提取接口（含参数和请求体的 $ref 解析）
+- convert: convert_openapi_endpoint_to_mcp_tool 转换为 MCP 工具
+
+结果可保存为基线（bench/baselines/openapi.json），修改相关函数后与基线对比。
+
+用法:
+    python -m bench.bench_openapi                       # 运行并打印结果
+    python -m bench.bench_openapi --compare             # 与基线对比，出现回退时退出码为 1
+    python -m bench.bench_openapi --save                # 更新基线
+    python -m bench.bench_openapi --specs wide,cyclic --repeat 3
+"""
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from bench.specs import build_cyclic_spec, build_deep_spec, build_enterprise_spec, build_wide_spec
+from mcp.protocol import convert_openapi_endpoint_to_mcp_tool
+from services.openapi_fetcher import extract_api_endpoints
+from services.schema_resolver import SchemaResolver
+from services.spec_cache import parse_spec_content
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "openapi.json"
+
+# 基准文档：名称 -> 生成函数（规模固定，保证结果可复现）
+SPECS: Dict[str, Callable[[], Dict[str, Any]]] = {
+    "wide": lambda: build_wide_spec(resources=400),
+    "deep": lambda: build_deep_spec(depth=8, fanout=2, operations=50),
+    "cyclic": lambda: build_cyclic_spec(models=20, operations=100),
+    "enterprise": lambda: build_enterprise_spec(domains=50, operations_per_domain=40),
+}
+
+
+def _stage_parse(spec: Dict[str, Any], text: str, endpoints: List[dict]) -> Any:
+    return parse_spec_content(text, "bench")
+
+
+def _stage_resolve(spec: Dict[str, Any], text: str, endpoints: List[dict]) -> Any:
+    schemas = spec.get("components", {}).get("schemas", {})
+    resolver = SchemaResolver(spec)
+    return [resolver.resolve({"$ref": f"#/components/schemas/{name}"}) for name in schemas]
+
+
+def _stage_extract(spec: Dict[str, Any], text: str, endpoints: List[dict]) -> Any:
+    return extract_api_endpoints(spec)
+
+
+def _stage_convert(spec: Dict[str, Any], text: str, endpoints: List[dict]) -> Any:
+    return [convert_openapi_endpoint_to_mcp_tool(endpoint, prefix="bench") for endpoint in endpoints]
+
+
+STAGES: Dict[str, Callable[[Dict[str, Any], str, List[dict]], Any]] = {
+    "parse": _stage_parse,
+    "resolve": _stage_resolve,
+    "extract": _stage_extract,
+    "convert": _stage_convert,
+}
+
+
+def _measure_time(func: Callable[[], Any], repeat: int) -> Tuple[float, float]:
+    """多次运行取最小值和中位数（毫秒），计时期间关闭 GC 以减少抖动"""
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        finally:
+            gc.enable()
+    return min(samples), statistics.median(samples)
+
+
+def _measure_memory(func: Callable[[], Any]) -> int:
+    """单独运行一次，记录 tracemalloc 峰值（字节，包含返回结果本身）"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def run_benchmarks(spec_names: List[str], repeat: int) -> Dict[str, Any]:
+    """
+    运行基准
+
+    Args:
+        spec_names: 要运行的基准文档
+        repeat: 每个阶段的计时次数
+
+    Returns:
+        {spec: {"operations": n, "spec_bytes": n, "stages": {stage: {...}}}}
+    """
+    results: Dict[str, Any] = {}
+    for name in spec_names:
+        spec = SPECS[name]()
+        text = json.dumps(spec)
+        endpoints = extract_api_endpoints(spec)
+        tools = _stage_convert(spec, text, endpoints)
+
+        stages: Dict[str, Any] = {}
+        for stage, func in STAGES.items():
+            call = lambda func=func: func(spec, text, endpoints)
+            best_ms, median_ms = _measure_time(call, repeat)
+            stages[stage] = {
+                "min_ms": round(best_ms, 3),
+                "median_ms": round(median_ms, 3),
+                "peak_bytes": _measure_memory(call),
+            }
+            print(f"  {name:<11}{stage:<9}{best_ms:>10.2f} ms{stages[stage]['peak_bytes'] / 1024 / 1024:>10.2f} MiB",
+                  file=sys.stderr)
+
+        results[name] = {
+            "operations": len(endpoints),
+            "spec_bytes": len(text),
+            "endpoints_bytes": len(json.dumps(endpoints)),
+            "tools_bytes": len(json.dumps([tool.model_dump() for tool in tools])),
+            # schema_mode=defs 时 tools/list 中工具定义的大小
+            "tools_defs_bytes": len(json.dumps([
+                convert_openapi_endpoint_to_mcp_tool(endpoint, prefix="bench").model_dump()
+                for endpoint in extract_api_endpoints(spec, schema_mode="defs")
+            ])),
+            "stages": stages,
+        }
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    与基线对比，打印比值并返回回退列表
+
+    Args:
+        results: 本次结果
+        baseline: 基线结果
+        threshold: 比值超过该值视为回退（例如 1.25 表示慢 25% 以上）
+
+    Returns:
+        回退描述列表
+    """
+    regressions = []
+    print(f"{'spec':<12}{'stage':<9}{'min_ms':>12}{'base':>12}{'ratio':>8}{'peak MiB':>12}{'base':>10}{'ratio':>8}")
+    for name, result in results.items():
+        base_spec = baseline.get("results", {}).get(name)
+        if not base_spec:
+            continue
+        for stage, current in result["stages"].items():
+            base = base_spec["stages"].get(stage)
+            if not base:
+                continue
+            time_ratio = current["min_ms"] / base["min_ms"] if base["min_ms"] else 1.0
+            memory_ratio = current["peak_bytes"] / base["peak_bytes"] if base["peak_bytes"] else 1.0
+            flag = ""
+            if time_ratio > threshold:
+                regressions.append(f"{name}.{stage} time x{time_ratio:.2f}")
+                flag = " !"
+            if memory_ratio > threshold:
+                regressions.append(f"{name}.{stage} memory x{memory_ratio:.2f}")
+                flag = " !"
+            print(f"{name:<12}{stage:<9}{current['min_ms']:>12.2f}{base['min_ms']:>12.2f}{time_ratio:>8.2f}"
+                  f"{current['peak_bytes'] / 1048576:>12.2f}{base['peak_bytes'] / 1048576:>10.2f}{memory_ratio:>8.2f}{flag}")
+    return regressions
+
+
+def print_results(results: Dict[str, Any]):
+    """打印本次结果"""
+    print(f"{'spec':<12}{'ops':>6}{'stage':>9}{'min_ms':>12}{'median_ms':>12}{'peak MiB':>12}")
+    for name, result in results.items():
+        for stage, current in result["stages"].items():
+            print(f"{name:<12}{result['operations']:>6}{stage:>9}{current['min_ms']:>12.2f}"
+                  f"{current['median_ms']:>12.2f}{current['peak_bytes'] / 1048576:>12.2f}")
+        print(f"{'':<12}endpoints {result['endpoints_bytes']} bytes, tools {result['tools_bytes']} bytes "
+              f"(schema_mode=defs: {result['tools_defs_bytes']} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAPI 解析与工具转换微基准")
+    parser.add_argument("--specs", default=",".join(SPECS), help=f"逗号分隔的基准文档（{', '.join(SPECS)}）")
+    parser.add_argument("--repeat", type=int, default=5, help="每个阶段的计时次数")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="基线文件路径")
+    parser.add_argument("--save", action="store_true", help="将本次结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与基线对比")
+    parser.add_argument("--threshold", type=float, default=1.25, help="判定回退的比值阈值")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.specs.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SPECS]
+    if unknown:
+        parser.error(f"unknown specs: {', '.join(unknown)}")
+
+    results = run_benchmarks(names, args.repeat)
+
+    if args.compare:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.is_file():
+            print(f"Baseline not found: {baseline_path}")
+            sys.exit(2)
+        regressions = compare(results, json.loads(baseline_path.read_text(encoding="utf-8")), args.threshold)
+        if regressions:
+            print("\nRegressions: " + "; ".join(regressions))
+            sys.exit(1)
+        print("\nNo regressions")
+    else:
+        print_results(results)
+
+    if args.save:
+        baseline_path = Path(args.baseline)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline: Dict[str, Any] = {}
+        if baseline_path.is_file():
+            baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        baseline.setdefault("results", {}).update(results)
+        baseline["environment"] = {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+        }
+        baseline_path.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline saved to {baseline_path}")
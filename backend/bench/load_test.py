@@ -0,0 +1,353 @@
+"""
+网关压测工具
+1. 启动根据 OpenAPI 文档生成的本地模拟上游
+2. 通过管理 API 注册服务、组合和 MCP Server
+3. 驱动 N 个并发的模拟 MCP 客户端：initialize → SSE → tools/list → tools/call × M
+4. 输出各阶段吞吐量和 p50 / p90 / p99 延迟，可保存为 JSON 供回归对比
+
+用法（网关需已启动，例如 uv run uvicorn main:app --port 8000）:
+    python -m bench.load_test --clients 50 --calls 20
+    python -m bench.load_test --clients 200 --calls 50 --mock-latency-ms 20 --output result.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from bench.mock_upstream import MockUpstream, load_spec, sample_from_schema
+
+# 报告中的阶段顺序
+STAGES = ("initialize", "sse_connect", "tools_list", "tools_call")
+
+
+@dataclass
+class StageStats:
+    """单个阶段的延迟样本和错误计数"""
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        """汇总为报告条目"""
+        samples = sorted(self.latencies_ms)
+        return {
+            "count": len(samples),
+            "errors": self.errors,
+            "throughput": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+            "mean_ms": round(sum(samples) / len(samples), 2) if samples else None,
+            "p50_ms": percentile(samples, 0.50),
+            "p90_ms": percentile(samples, 0.90),
+            "p99_ms": percentile(samples, 0.99),
+            "max_ms": round(samples[-1], 2) if samples else None,
+        }
+
+
+def percentile(sorted_samples: List[float], q: float) -> Optional[float]:
+    """
+    最近秩分位数
+
+    Args:
+        sorted_samples: 升序排列的样本
+        q: 分位（0 ~ 1）
+
+    Returns:
+        分位数，没有样本时返回 None
+    """
+    if not sorted_samples:
+        return None
+    rank = max(1, math.ceil(q * len(sorted_samples)))
+    return round(sorted_samples[rank - 1], 2)
+
+
+class GatewayFixture:
+    """通过管理 API 注册压测所需的服务、组合和 MCP Server，结束后可清理"""
+
+    def __init__(self, client: httpx.AsyncClient, username: str, password: str):
+        self.client = client
+        self.username = username
+        self.password = password
+        self.headers: Dict[str, str] = {}
+        self.prefix: Optional[str] = None
+        self._service_id: Optional[int] = None
+        self._combination_id: Optional[int] = None
+        self._server_id: Optional[int] = None
+
+    async def setup(self, spec_url: str, max_tools: int) -> int:
+        """
+        登录并注册服务、组合和 MCP Server
+
+        Args:
+            spec_url: 模拟上游的 OpenAPI 文档地址
+            max_tools: 组合中最多包含的接口数
+
+        Returns:
+            注册的接口数
+        """
+        response = await self.client.post(
+            "/api/v1/auth/login",
+            json={"username": self.username, "password": self.password}
+        )
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        run_id = uuid.uuid4().hex[:8]
+        name = f"bench-{run_id}"
+
+        response = await self.client.post(
+            "/api/v1/services",
+            json={"name": name, "url": spec_url, "type": "OpenAPI 3.0"},
+            headers=self.headers
+        )
+        response.raise_for_status()
+        self._service_id = response.json()["id"]
+
+        response = await self.client.get("/api/v1/endpoints", params={"url": spec_url}, headers=self.headers)
+        response.raise_for_status()
+        endpoints = [
+            {**endpoint, "serviceName": name, "serviceUrl": spec_url}
+            for endpoint in response.json()[:max_tools]
+        ]
+
+        response = await self.client.post(
+            "/api/v1/combinations",
+            json={"name": name, "description": "load test", "endpoints": endpoints},
+            headers=self.headers
+        )
+        response.raise_for_status()
+        self._combination_id = response.json()["id"]
+
+        response = await self.client.post(
+            "/api/v1/mcp-servers",
+            json={"name": name, "prefix": name, "combination_ids": [self._combination_id]},
+            headers=self.headers
+        )
+        response.raise_for_status()
+        self._server_id = response.json()["id"]
+        self.prefix = response.json()["prefix"]
+        return len(endpoints)
+
+    async def teardown(self):
+        """删除本次注册的资源（忽略失败）"""
+        for path, resource_id in (
+            ("/api/v1/mcp-servers", self._server_id),
+            ("/api/v1/combinations", self._combination_id),
+            ("/api/v1/services", self._service_id),
+        ):
+            if resource_id is None:
+                continue
+            try:
+                await self.client.delete(f"{path}/{resource_id}", headers=self.headers)
+            except httpx.HTTPError as e:
+                print(f"Failed to delete {path}/{resource_id}: {e}")
+
+
+def build_arguments(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """根据工具 inputSchema 为必填参数生成示例值"""
+    schema = tool.get("inputSchema") or {}
+    properties = schema.get("properties") or {}
+    return {
+        name: sample_from_schema(properties.get(name)) or 1
+        for name in schema.get("required") or []
+    }
+
+
+class SimulatedClient:
+    """模拟 MCP 客户端：按标准流程建立会话并循环调用工具"""
+
+    def __init__(self, client: httpx.AsyncClient, prefix: str, stats: Dict[str, StageStats], calls: int):
+        self.client = client
+        self.url = f"/mcp/{prefix}"
+        self.stats = stats
+        self.calls = calls
+        self._next_id = 0
+        self._headers = {"MCP-Protocol-Version": "2024-11-05"}
+
+    async def _rpc(self, stage: str, method: str, params: Optional[Dict[str, Any]] = None) -> Optional[httpx.Response]:
+        """发送一次 JSON-RPC 请求并记录延迟，失败时返回 None"""
+        self._next_id += 1
+        payload: Dict[str, Any] = {"jsonrpc": "2.0", "method": method, "id": self._next_id}
+        if params is not None:
+            payload["params"] = params
+
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(self.url, json=payload, headers=self._headers)
+        except httpx.HTTPError:
+            self.stats[stage].errors += 1
+            return None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if response.status_code != 200 or "error" in response.json():
+            self.stats[stage].errors += 1
+            return None
+        self.stats[stage].latencies_ms.append(elapsed_ms)
+        return response
+
+    async def _open_stream(self, ready: asyncio.Event):
+        """打开 SSE 流，收到第一个事件后记为连接完成，随后持续读取推送直到被取消"""
+        headers = {**self._headers, "Accept": "text/event-stream"}
+        started = time.perf_counter()
+        try:
+            async with self.client.stream("GET", self.url, headers=headers) as response:
+                if response.status_code != 200:
+                    self.stats["sse_connect"].errors += 1
+                    return
+                async for line in response.aiter_lines():
+                    if not ready.is_set() and line.startswith("event:"):
+                        self.stats["sse_connect"].latencies_ms.append((time.perf_counter() - started) * 1000)
+                        ready.set()
+        except httpx.HTTPError:
+            if not ready.is_set():
+                self.stats["sse_connect"].errors += 1
+        finally:
+            ready.set()
+
+    async def run(self):
+        """执行完整的客户端流程"""
+        response = await self._rpc("initialize", "initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "synapse-bench", "version": "1.0"}
+        })
+        if response is None:
+            return
+        self._headers["Mcp-Session-Id"] = response.headers["mcp-session-id"]
+
+        ready = asyncio.Event()
+        stream_task = asyncio.create_task(self._open_stream(ready))
+        try:
+            await ready.wait()
+
+            response = await self._rpc("tools_list", "tools/list")
+            if response is None:
+                return
+            tools = response.json()["result"]["tools"]
+            if not tools:
+                return
+            arguments = [build_arguments(tool) for tool in tools]
+
+            for index in range(self.calls):
+                position = index % len(tools)
+                await self._rpc("tools_call", "tools/call", {
+                    "name": tools[position]["name"],
+                    "arguments": arguments[position]
+                })
+        finally:
+            stream_task.cancel()
+            try:
+                await stream_task
+            except asyncio.CancelledError:
+                pass
+
+
+async def run_load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    执行压测
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        压测报告
+    """
+    spec = load_spec(args.spec, args.resources)
+    upstream = MockUpstream(
+        spec,
+        port=args.mock_port,
+        latency_ms=args.mock_latency_ms,
+        jitter_ms=args.mock_jitter_ms
+    )
+    upstream.start()
+
+    # 每个客户端同时占用一个 SSE 长连接和一个请求连接
+    limits = httpx.Limits(max_connections=args.clients * 2 + 10, max_keepalive_connections=args.clients * 2 + 10)
+    try:
+        async with httpx.AsyncClient(base_url=args.gateway, timeout=args.timeout, limits=limits) as client:
+            fixture = GatewayFixture(client, args.username, args.password)
+            try:
+                tool_count = await fixture.setup(upstream.spec_url, args.tools)
+                print(f"Registered MCP Server '{fixture.prefix}' with {tool_count} tools")
+
+                stats = {stage: StageStats() for stage in STAGES}
+                clients = [SimulatedClient(client, fixture.prefix, stats, args.calls) for _ in range(args.clients)]
+
+                started = time.perf_counter()
+                await asyncio.gather(*(simulated.run() for simulated in clients))
+                elapsed = time.perf_counter() - started
+            finally:
+                if not args.keep:
+                    await fixture.teardown()
+    finally:
+        upstream.stop()
+
+    total_requests = sum(len(stage.latencies_ms) for stage in stats.values())
+    return {
+        "config": {
+            "gateway": args.gateway,
+            "clients": args.clients,
+            "calls_per_client": args.calls,
+            "tools": tool_count,
+            "mock_latency_ms": args.mock_latency_ms,
+            "mock_jitter_ms": args.mock_jitter_ms,
+            "python": platform.python_version(),
+        },
+        "elapsed_seconds": round(elapsed, 3),
+        "total_requests": total_requests,
+        "throughput": round(total_requests / elapsed, 2) if elapsed > 0 else 0.0,
+        "stages": {name: stats[name].summary(elapsed) for name in STAGES},
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    """以表格形式打印压测报告"""
+    config = report["config"]
+    print()
+    print(f"clients={config['clients']} calls/client={config['calls_per_client']} "
+          f"tools={config['tools']} upstream latency={config['mock_latency_ms']}ms")
+    print(f"elapsed {report['elapsed_seconds']}s, {report['total_requests']} requests, "
+          f"{report['throughput']} req/s")
+    print()
+
+    def cell(value: Any) -> str:
+        return "-" if value is None else str(value)
+
+    header = f"{'stage':<12}{'count':>8}{'errors':>8}{'req/s':>10}{'mean':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, stage in report["stages"].items():
+        print(f"{name:<12}{stage['count']:>8}{stage['errors']:>8}{stage['throughput']:>10}"
+              f"{cell(stage['mean_ms']):>10}{cell(stage['p50_ms']):>10}{cell(stage['p90_ms']):>10}"
+              f"{cell(stage['p99_ms']):>10}{cell(stage['max_ms']):>10}")
+    print("(latency in ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synapse 网关压测")
+    parser.add_argument("--gateway", default="http://127.0.0.1:8000", help="网关地址")
+    parser.add_argument("--username", default="admin", help="管理员用户名")
+    parser.add_argument("--password", default="admin123", help="管理员密码")
+    parser.add_argument("--clients", type=int, default=20, help="并发客户端数")
+    parser.add_argument("--calls", type=int, default=10, help="每个客户端的 tools/call 次数")
+    parser.add_argument("--tools", type=int, default=20, help="注册到 MCP Server 的最大工具数")
+    parser.add_argument("--timeout", type=float, default=30.0, help="单个请求超时（秒）")
+    parser.add_argument("--spec", help="模拟上游使用的 OpenAPI 文档文件（默认生成合成文档）")
+    parser.add_argument("--resources", type=int, default=10, help="合成文档的资源数量（每个资源 5 个操作）")
+    parser.add_argument("--mock-port", type=int, default=18080, help="模拟上游端口")
+    parser.add_argument("--mock-latency-ms", type=float, default=0.0, help="模拟上游固定延迟（毫秒）")
+    parser.add_argument("--mock-jitter-ms", type=float, default=0.0, help="模拟上游随机抖动上限（毫秒）")
+    parser.add_argument("--keep", action="store_true", help="结束后保留注册的服务、组合和 MCP Server")
+    parser.add_argument("--output", help="将报告保存为 JSON 文件")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Report saved to {args.output}")
@@ -0,0 +1,238 @@
+"""
+模拟上游服务
+根据 OpenAPI 文档生成 Starlette 应用：在 /openapi.json 提供文档本身，
+每个操作按响应 schema 返回预生成的示例数据，并可注入固定延迟和随机抖动
+
+用法:
+    python -m bench.mock_upstream --port 18080 --resources 20 --latency-ms 5
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from bench.specs import build_wide_spec
+
+_HTTP_METHODS = ("get", "put", "post", "delete", "patch", "head", "options")
+
+
+def _lookup_ref(ref: str, spec: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """按 JSON Pointer 查找本地 $ref"""
+    node: Any = spec
+    for part in ref.lstrip("#/").split("/"):
+        if not isinstance(node, dict) or part not in node:
+            return None
+        node = node[part]
+    return node if isinstance(node, dict) else None
+
+
+def sample_from_schema(schema: Optional[Dict[str, Any]], spec: Optional[Dict[str, Any]] = None, depth: int = 0) -> Any:
+    """
+    按 JSON Schema 生成示例值
+
+    Args:
+        schema: JSON Schema（可包含本地 $ref）
+        spec: 所属 OpenAPI 文档，用于解析 $ref
+        depth: 当前嵌套深度（超过 6 层后返回 None，避免循环引用无限展开）
+
+    Returns:
+        示例值
+    """
+    if not schema or depth > 6:
+        return None
+    if "$ref" in schema:
+        target = _lookup_ref(schema["$ref"], spec or {})
+        return sample_from_schema(target, spec, depth + 1)
+    if "example" in schema:
+        return schema["example"]
+    if "default" in schema:
+        return schema["default"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    for combinator in ("allOf", "oneOf", "anyOf"):
+        if schema.get(combinator):
+            return sample_from_schema(schema[combinator][0], spec, depth + 1)
+
+    schema_type = schema.get("type")
+    if schema_type == "object" or "properties" in schema:
+        return {
+            name: sample_from_schema(prop, spec, depth + 1)
+            for name, prop in (schema.get("properties") or {}).items()
+        }
+    if schema_type == "array":
+        item = sample_from_schema(schema.get("items"), spec, depth + 1)
+        return [] if item is None else [item]
+    if schema_type == "integer":
+        return 1
+    if schema_type == "number":
+        return 1.5
+    if schema_type == "boolean":
+        return True
+    if schema_type == "string":
+        if schema.get("format") == "date-time":
+            return "2024-01-01T00:00:00Z"
+        return "string"
+    return None
+
+
+def _response_sample(operation: Dict[str, Any], spec: Dict[str, Any]) -> tuple[int, Optional[bytes]]:
+    """选取操作的成功响应，预先生成状态码和 JSON 响应体"""
+    responses = operation.get("responses") or {}
+    for code, response in responses.items():
+        if not str(code).startswith("2"):
+            continue
+        if "$ref" in response:
+            response = _lookup_ref(response["$ref"], spec) or {}
+        media = (response.get("content") or {}).get("application/json")
+        if media is None:
+            return int(code), None
+        return int(code), json.dumps(sample_from_schema(media.get("schema"), spec)).encode()
+    return 200, json.dumps({"ok": True}).encode()
+
+
+def create_mock_app(spec: Dict[str, Any], latency_ms: float = 0.0, jitter_ms: float = 0.0) -> Starlette:
+    """
+    根据 OpenAPI 文档创建模拟上游应用
+
+    Args:
+        spec: OpenAPI 文档
+        latency_ms: 每个请求的固定延迟（毫秒）
+        jitter_ms: 在固定延迟上叠加的随机抖动上限（毫秒）
+
+    Returns:
+        Starlette 应用
+    """
+    spec_body = json.dumps(spec).encode()
+    stats = {"requests": 0}
+
+    async def openapi(request: Request) -> Response:
+        return Response(spec_body, media_type="application/json")
+
+    async def mock_stats(request: Request) -> Response:
+        return JSONResponse(stats)
+
+    def make_endpoint(samples: Dict[str, tuple[int, Optional[bytes]]]):
+        async def endpoint(request: Request) -> Response:
+            stats["requests"] += 1
+            delay = latency_ms + (random.random() * jitter_ms if jitter_ms else 0.0)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+            status_code, body = samples[request.method.lower()]
+            if body is None:
+                return Response(status_code=status_code)
+            return Response(body, status_code=status_code, media_type="application/json")
+        return endpoint
+
+    routes: List[Route] = [
+        Route("/openapi.json", openapi, methods=["GET"]),
+        Route("/__mock__/stats", mock_stats, methods=["GET"]),
+    ]
+    for path, path_item in (spec.get("paths") or {}).items():
+        samples = {
+            method: _response_sample(operation, spec)
+            for method, operation in path_item.items()
+            if method in _HTTP_METHODS
+        }
+        if samples:
+            routes.append(Route(path, make_endpoint(samples), methods=[m.upper() for m in samples]))
+
+    return Starlette(routes=routes)
+
+
+class MockUpstream:
+    """在后台线程中运行的模拟上游服务"""
+
+    def __init__(
+        self,
+        spec: Dict[str, Any],
+        host: str = "127.0.0.1",
+        port: int = 18080,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0
+    ):
+        self.spec = spec
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(
+            create_mock_app(spec, latency_ms, jitter_ms),
+            host=host,
+            port=port,
+            log_level="warning",
+            access_log=False
+        ))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def spec_url(self) -> str:
+        return f"{self.base_url}/openapi.json"
+
+    def start(self, timeout: float = 10.0):
+        """
+        启动服务并等待就绪
+
+        Args:
+            timeout: 等待就绪的超时时间（秒）
+        """
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Mock upstream failed to start on {self.base_url}")
+            time.sleep(0.05)
+
+    def stop(self):
+        """停止服务"""
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def load_spec(spec_path: Optional[str], resources: int) -> Dict[str, Any]:
+    """
+    加载 OpenAPI 文档：指定文件时读取文件（JSON / YAML），否则生成合成文档
+
+    Args:
+        spec_path: 文档文件路径
+        resources: 合成文档的资源数量
+
+    Returns:
+        OpenAPI 文档
+    """
+    if not spec_path:
+        return build_wide_spec(resources=resources)
+    content = Path(spec_path).read_text(encoding="utf-8")
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        import yaml
+        return yaml.safe_load(content)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synapse 模拟上游服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--spec", help="OpenAPI 文档文件（默认生成合成文档）")
+    parser.add_argument("--resources", type=int, default=10, help="合成文档的资源数量（每个资源 5 个操作）")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="随机抖动上限（毫秒）")
+    args = parser.parse_args()
+
+    app = create_mock_app(load_spec(args.spec, args.resources), args.latency_ms, args.jitter_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
@@ -0,0 +1,353 @@
+"""
+合成 OpenAPI 文档生成器
+生成结构可控、结果可复现的 OpenAPI 3.0 文档，供模拟上游和基准测试使用
+"""
+from typing import Any, Dict
+
+
+def _info(title: str) -> Dict[str, Any]:
+    return {"title": title, "version": "1.0.0"}
+
+
+def build_wide_spec(resources: int = 10, shared_fields: int = 8) -> Dict[str, Any]:
+    """
+    生成“宽”文档：多个资源，每个资源 5 个 CRUD 操作，共享分页和错误模型
+
+    Args:
+        resources: 资源数量（操作数 = resources × 5）
+        shared_fields: 每个资源模型的字段数
+
+    Returns:
+        OpenAPI 文档
+    """
+    schemas: Dict[str, Any] = {
+        "Error": {
+            "type": "object",
+            "properties": {
+                "code": {"type": "integer"},
+                "message": {"type": "string"},
+            },
+            "required": ["code", "message"],
+        },
+        "Page": {
+            "type": "object",
+            "properties": {
+                "page": {"type": "integer"},
+                "size": {"type": "integer"},
+                "total": {"type": "integer"},
+            },
+        },
+    }
+    paths: Dict[str, Any] = {}
+
+    for index in range(resources):
+        name = f"Resource{index}"
+        collection = f"/resources{index}"
+        schemas[name] = {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer", "format": "int64"},
+                **{f"field{j}": {"type": "string", "description": f"Field {j}"} for j in range(shared_fields)},
+                "page": {"$ref": "#/components/schemas/Page"},
+            },
+            "required": ["id"],
+        }
+        ref = {"$ref": f"#/components/schemas/{name}"}
+        error = {
+            "description": "Error",
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/Error"}}},
+        }
+        id_param = {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}
+
+        paths[collection] = {
+            "get": {
+                "operationId": f"list{name}",
+                "summary": f"List {name}",
+                "parameters": [
+                    {"name": "page", "in": "query", "schema": {"type": "integer", "default": 1}},
+                    {"name": "size", "in": "query", "schema": {"type": "integer", "default": 20}},
+                ],
+                "responses": {
+                    "200": {
+                        "description": "OK",
+                        "content": {"application/json": {"schema": {"type": "array", "items": ref}}},
+                    },
+                    "default": error,
+                },
+            },
+            "post": {
+                "operationId": f"create{name}",
+                "summary": f"Create {name}",
+                "requestBody": {"required": True, "content": {"application/json": {"schema": ref}}},
+                "responses": {
+                    "201": {"description": "Created", "content": {"application/json": {"schema": ref}}},
+                    "default": error,
+                },
+            },
+        }
+        paths[f"{collection}/{{id}}"] = {
+            "get": {
+                "operationId": f"get{name}",
+                "summary": f"Get {name}",
+                "parameters": [id_param],
+                "responses": {
+                    "200": {"description": "OK", "content": {"application/json": {"schema": ref}}},
+                    "default": error,
+                },
+            },
+            "put": {
+                "operationId": f"update{name}",
+                "summary": f"Update {name}",
+                "parameters": [id_param],
+                "requestBody": {"required": True, "content": {"application/json": {"schema": ref}}},
+                "responses": {
+                    "200": {"description": "OK", "content": {"application/json": {"schema": ref}}},
+                    "default": error,
+                },
+            },
+            "delete": {
+                "operationId": f"delete{name}",
+                "summary": f"Delete {name}",
+                "parameters": [id_param],
+                "responses": {"204": {"description": "Deleted"}, "default": error},
+            },
+        }
+
+    return {
+        "openapi": "3.0.0",
+        "info": _info("Synthetic wide API"),
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
+
+
+def build_deep_spec(depth: int = 8, fanout: int = 2, operations: int = 50) -> Dict[str, Any]:
+    """
+    生成“深”文档：模型按层级逐层引用，每层通过 fanout 个属性引用下一层
+
+    Args:
+        depth: 引用层数
+        fanout: 每层引用下一层的属性数（完全展开后的节点数约为 fanout^depth）
+        operations: 引用顶层模型的操作数
+
+    Returns:
+        OpenAPI 文档
+    """
+    schemas: Dict[str, Any] = {}
+    for level in range(depth):
+        properties: Dict[str, Any] = {
+            "name": {"type": "string"},
+            "value": {"type": "number"},
+        }
+        if level + 1 < depth:
+            for branch in range(fanout):
+                properties[f"child{branch}"] = {"$ref": f"#/components/schemas/Level{level + 1}"}
+        schemas[f"Level{level}"] = {"type": "object", "properties": properties}
+
+    top = {"$ref": "#/components/schemas/Level0"}
+    paths = {
+        f"/deep{index}": {
+            "post": {
+                "operationId": f"deep{index}",
+                "summary": f"Deep operation {index}",
+                "parameters": [{"name": "filter", "in": "query", "schema": top}],
+                "requestBody": {"content": {"application/json": {"schema": top}}},
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": top}}}},
+            }
+        }
+        for index in range(operations)
+    }
+    return {
+        "openapi": "3.0.0",
+        "info": _info("Synthetic deep API"),
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
+
+
+def build_cyclic_spec(models: int = 20, operations: int = 100) -> Dict[str, Any]:
+    """
+    生成带循环引用的文档：自引用树节点、父子互相引用，以及跨模型的引用环
+
+    Args:
+        models: 环上的模型数
+        operations: 操作数（轮流引用环上的模型）
+
+    Returns:
+        OpenAPI 文档
+    """
+    schemas: Dict[str, Any] = {
+        "TreeNode": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer"},
+                "children": {"type": "array", "items": {"$ref": "#/components/schemas/TreeNode"}},
+            },
+        },
+        "Parent": {
+            "type": "object",
+            "properties": {
+                "children": {"type": "array", "items": {"$ref": "#/components/schemas/Child"}},
+            },
+        },
+        "Child": {
+            "type": "object",
+            "properties": {
+                "parent": {"$ref": "#/components/schemas/Parent"},
+                "tree": {"$ref": "#/components/schemas/TreeNode"},
+            },
+        },
+    }
+    for index in range(models):
+        schemas[f"Ring{index}"] = {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer"},
+                "next": {"$ref": f"#/components/schemas/Ring{(index + 1) % models}"},
+                "owner": {"$ref": "#/components/schemas/Child"},
+            },
+        }
+
+    paths = {}
+    for index in range(operations):
+        ref = {"$ref": f"#/components/schemas/Ring{index % models}"}
+        paths[f"/cyclic{index}"] = {
+            "put": {
+                "operationId": f"cyclic{index}",
+                "summary": f"Cyclic operation {index}",
+                "requestBody": {"content": {"application/json": {"schema": ref}}},
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": ref}}}},
+            }
+        }
+    return {
+        "openapi": "3.0.0",
+        "info": _info("Synthetic cyclic API"),
+        "paths": paths,
+        "components": {"schemas": schemas},
+    }
+
+
+def build_enterprise_spec(domains: int = 50, operations_per_domain: int = 40) -> Dict[str, Any]:
+    """
+    生成接近真实企业文档的形态：每个业务域 CRUD 大量操作，
+    所有域共享一套多层嵌套的公共模型（地址、客户、订单、审计信息、分页信封）
+
+    Args:
+        domains: 业务域数量
+        operations_per_domain: 每个业务域的操作数（约 2000 个操作使用默认值）
+
+    Returns:
+        OpenAPI 文档
+    """
+    schemas: Dict[str, Any] = {
+        "Audit": {
+            "type": "object",
+            "properties": {
+                "createdAt": {"type": "string", "format": "date-time"},
+                "createdBy": {"$ref": "#/components/schemas/UserRef"},
+                "updatedAt": {"type": "string", "format": "date-time"},
+                "updatedBy": {"$ref": "#/components/schemas/UserRef"},
+            },
+        },
+        "UserRef": {
+            "type": "object",
+            "properties": {"id": {"type": "string"}, "name": {"type": "string"}},
+        },
+        "Address": {
+            "type": "object",
+            "properties": {
+                "line1": {"type": "string"},
+                "city": {"type": "string"},
+                "country": {"type": "string", "enum": ["CN", "US", "DE", "JP"]},
+                "geo": {
+                    "type": "object",
+                    "properties": {"lat": {"type": "number"}, "lng": {"type": "number"}},
+                },
+            },
+        },
+        "Customer": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "billing": {"$ref": "#/components/schemas/Address"},
+                "shipping": {"$ref": "#/components/schemas/Address"},
+                "audit": {"$ref": "#/components/schemas/Audit"},
+            },
+        },
+        "OrderLine": {
+            "type": "object",
+            "properties": {
+                "sku": {"type": "string"},
+                "quantity": {"type": "integer"},
+                "price": {"type": "number"},
+            },
+        },
+        "Order": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "string"},
+                "customer": {"$ref": "#/components/schemas/Customer"},
+                "lines": {"type": "array", "items": {"$ref": "#/components/schemas/OrderLine"}},
+                "audit": {"$ref": "#/components/schemas/Audit"},
+            },
+        },
+        "Problem": {
+            "type": "object",
+            "properties": {
+                "type": {"type": "string"},
+                "title": {"type": "string"},
+                "detail": {"type": "string"},
+            },
+        },
+    }
+    common_params = {
+        "TenantHeader": {"name": "X-Tenant-Id", "in": "header", "required": True, "schema": {"type": "string"}},
+        "PageParam": {"name": "page", "in": "query", "schema": {"type": "integer", "minimum": 1}},
+    }
+
+    paths: Dict[str, Any] = {}
+    for domain in range(domains):
+        entity = f"Entity{domain}"
+        schemas[entity] = {
+            "allOf": [
+                {"$ref": "#/components/schemas/Order"},
+                {
+                    "type": "object",
+                    "properties": {
+                        "domainField": {"type": "string"},
+                        "related": {"type": "array", "items": {"$ref": "#/components/schemas/Customer"}},
+                    },
+                },
+            ]
+        }
+        ref = {"$ref": f"#/components/schemas/{entity}"}
+        problem = {
+            "description": "Problem",
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/Problem"}}},
+        }
+        for index in range(operations_per_domain):
+            method = ("get", "post", "put", "patch", "delete")[index % 5]
+            operation: Dict[str, Any] = {
+                "operationId": f"{method}{entity}Op{index}",
+                "summary": f"{method.upper()} {entity} operation {index}",
+                "tags": [f"domain{domain}"],
+                "parameters": [
+                    {"$ref": "#/components/parameters/TenantHeader"},
+                    {"$ref": "#/components/parameters/PageParam"},
+                    {"name": "id", "in": "path", "required": True, "schema": {"type": "string"}},
+                ],
+                "responses": {
+                    "200": {"description": "OK", "content": {"application/json": {"schema": ref}}},
+                    "default": problem,
+                },
+            }
+            if method in ("post", "put", "patch"):
+                operation["requestBody"] = {"required": True, "content": {"application/json": {"schema": ref}}}
+            paths[f"/domain{domain}/op{index}/{{id}}"] = {method: operation}
+
+    return {
+        "openapi": "3.0.0",
+        "info": _info("Synthetic enterprise API"),
+        "paths": paths,
+        "components": {"schemas": schemas, "parameters": common_params},
+    }
@@ -6,7 +6,7 @@
 import os
 import re
 from pathlib import Path
-from typing import Literal, Optional
+from typing import Dict, Literal, Optional
 
 import yaml
 from pydantic import BaseModel, Field, field_validator
@@ -101,6 +101,101 @@ class MigrationConfig(BaseModel):
     )
 
 
+class UpstreamConfig(BaseModel):
+    """上游服务 HTTP 连接池配置"""
+    max_connections: int = Field(default=100, description="每个上游的最大连接数")
+    max_keepalive_connections: int = Field(default=20, description="每个上游保持的最大空闲连接数")
+    keepalive_expiry: float = Field(default=30.0, description="空闲连接保持时间（秒）")
+    http2: bool = Field(default=True, description="是否启用 HTTP/2（需要安装 h2）")
+    timeout: float = Field(default=30.0, description="默认请求超时（秒）")
+    connect_timeout: float = Field(default=5.0, description="建立连接超时（秒）")
+    service_timeouts: Dict[str, float] = Field(
+        default_factory=dict,
+        description="按服务名称或基础 URL 覆盖请求超时（秒）"
+    )
+
+
+class SessionConfig(BaseModel):
+    """MCP 会话配置"""
+    max_idle_seconds: int = Field(default=3600, description="会话最大空闲时间（秒）")
+    replay_buffer_size: int = Field(default=100, description="每个会话保留的可重放事件数")
+    resume_grace_seconds: int = Field(default=120, description="SSE 断开后允许通过 Last-Event-ID 恢复的宽限期（秒）")
+    expiry_tick_seconds: float = Field(default=1.0, description="会话过期时间轮的精度（秒）")
+    max_queue_size: int = Field(default=1000, description="每个会话待发送消息队列的最大长度")
+    overflow_policy: Literal["drop_oldest", "coalesce", "disconnect"] = Field(
+        default="coalesce",
+        description="队列溢出策略：drop_oldest（丢弃最旧）, coalesce（合并重复的 list_changed 通知后丢弃最旧）, disconnect（断开慢客户端）"
+    )
+    backend: Literal["memory", "sqlite"] = Field(
+        default="memory",
+        description="会话共享后端：memory（单进程）, sqlite（同一主机多 worker 共享）"
+    )
+    sqlite_path: str = Field(default="./data/sessions.db", description="sqlite 后端的数据库文件路径")
+    poll_interval: float = Field(default=0.2, description="sqlite 后端轮询跨 worker 消息的间隔（秒）")
+    touch_interval: float = Field(default=30.0, description="向共享后端同步会话活动时间的最小间隔（秒）")
+
+
+class ToolCallLogConfig(BaseModel):
+    """工具调用审计日志配置"""
+    enabled: bool = Field(default=True, description="是否记录工具调用审计日志")
+    buffer_size: int = Field(default=10000, description="内存缓冲区最大记录数")
+    batch_size: int = Field(default=500, description="每批写入数据库的记录数，缓冲区达到该数量时立即刷新")
+    flush_interval: float = Field(default=2.0, description="定时刷新间隔（秒）")
+    overflow_policy: Literal["drop_oldest", "drop_newest"] = Field(
+        default="drop_oldest",
+        description="缓冲区写满时的丢弃策略：drop_oldest（丢弃最旧）, drop_newest（丢弃新记录）"
+    )
+
+
+class TracingConfig(BaseModel):
+    """链路追踪配置"""
+    exporter: Literal["none", "console", "file"] = Field(
+        default="none",
+        description="Span 导出器：none（关闭）, console（输出到 stderr）, file（JSON Lines 文件）"
+    )
+    file_path: str = Field(default="./data/traces.jsonl", description="file 导出器的输出路径")
+    sample_rate: float = Field(default=1.0, ge=0.0, le=1.0, description="根 Span 采样率（上游传入 traceparent 时沿用其采样标志）")
+
+
+class SpecCacheConfig(BaseModel):
+    """OpenAPI 文档缓存配置"""
+    enabled: bool = Field(default=True, description="是否缓存远程 OpenAPI 文档")
+    directory: str = Field(default="./data/spec_cache", description="缓存目录（按文档 URL 的 SHA-256 命名）")
+    revalidate_after: float = Field(default=300.0, description="缓存在该时间（秒）内直接使用，超过后发起条件请求重新验证")
+    memory_entries: int = Field(default=16, description="内存中保留的已解析文档数")
+    timeout: float = Field(default=30.0, description="下载文档的超时（秒）")
+
+
+class CpuPoolConfig(BaseModel):
+    """CPU 密集任务池配置（文档解析、$ref 展开、工具转换）"""
+    enabled: bool = Field(default=True, description="是否在任务池中执行，关闭时直接在事件循环中执行")
+    kind: Literal["thread", "process"] = Field(
+        default="thread",
+        description="任务池类型：thread（线程池）, process（进程池，完全隔离 GIL，但需要序列化参数和结果）"
+    )
+    max_workers: int = Field(default=2, ge=1, description="最大工作线程 / 进程数")
+
+
+class ServiceHealthConfig(BaseModel):
+    """服务健康检查与文档刷新配置"""
+    enabled: bool = Field(default=True, description="是否在后台定期检查服务文档")
+    interval: float = Field(default=300.0, gt=0, description="每个服务的检查间隔（秒）")
+    jitter: float = Field(default=0.2, ge=0.0, le=1.0, description="检查间隔的随机抖动比例，避免所有服务同时检查")
+    initial_delay: float = Field(default=10.0, ge=0, description="启动后首轮检查前的等待时间（秒）")
+    max_concurrency: int = Field(default=4, ge=1, description="同时进行的检查数")
+    failure_threshold: int = Field(default=2, ge=1, description="连续失败达到该次数时将服务标记为 unhealthy")
+    auto_resync: bool = Field(default=True, description="文档内容变化时自动把变化同步到组合")
+    lease_ttl: float = Field(default=900.0, gt=0, description="多 worker 时后台检查租约的有效期（秒，至少为两个检查间隔），持有者退出后其他 worker 在到期后接管")
+
+
+class ProfilingConfig(BaseModel):
+    """按需请求剖析配置（仅管理员可触发）"""
+    enabled: bool = Field(default=True, description="是否允许管理员通过请求头或查询参数触发剖析")
+    max_profiles: int = Field(default=20, description="内存中保留的剖析结果数")
+    top_functions: int = Field(default=40, description="每个剖析结果保留的函数数（按累计耗时排序）")
+    max_queries: int = Field(default=50, description="每个剖析结果保留的最慢 SQL 语句数")
+
+
 class AppSettings(BaseModel):
     """应用设置"""
     debug: bool = Field(default=False)
@@ -111,6 +206,14 @@ class AppConfig(BaseModel):
     """应用配置"""
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
     migration: MigrationConfig = Field(default_factory=MigrationConfig)
+    upstream: UpstreamConfig = Field(default_factory=UpstreamConfig)
+    session: SessionConfig = Field(default_factory=SessionConfig)
+    tracing: TracingConfig = Field(default_factory=TracingConfig)
+    tool_call_log: ToolCallLogConfig = Field(default_factory=ToolCallLogConfig)
+    profiling: ProfilingConfig = Field(default_factory=ProfilingConfig)
+    spec_cache: SpecCacheConfig = Field(default_factory=SpecCacheConfig)
+    service_health: ServiceHealthConfig = Field(default_factory=ServiceHealthConfig)
+    cpu_pool: CpuPoolConfig = Field(default_factory=CpuPoolConfig)
     app: AppSettings = Field(default_factory=AppSettings)
 
     @classmethod
@@ -0,0 +1,322 @@
+"""
+指标模块
+轻量级 Prometheus 指标（Counter / Gauge / Histogram），以文本格式暴露给 /metrics
+"""
+import bisect
+import math
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from core.profiling import profiler
+
+# 默认延迟分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 响应大小分桶（字节）
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    """转义标签值"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """指标基类"""
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        初始化指标
+
+        Args:
+            name: 指标名称
+            documentation: 指标说明（HELP）
+            labelnames: 标签名列表
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _format_labels(self, values: LabelValues, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        """生成 Prometheus 文本格式的样本行"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """单调递增计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        """
+        计数器加值
+
+        Args:
+            amount: 增加量
+            **labels: 标签值
+        """
+        key = self._label_values(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels: str):
+        """
+        用外部维护的累计值设置计数器（抓取时从各组件的统计信息同步）
+
+        Args:
+            value: 自进程启动以来的累计值
+            **labels: 标签值
+        """
+        self._values[self._label_values(labels)] = value
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """可增可减的仪表"""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str):
+        """
+        设置仪表值
+
+        Args:
+            value: 当前值
+            **labels: 标签值
+        """
+        self._values[self._label_values(labels)] = value
+
+    def clear(self):
+        """清空所有标签组合（用于按快照重新填充）"""
+        self._values.clear()
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Histogram(Metric):
+    """分桶直方图"""
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签组合 -> [各桶计数（非累计，最后一个为 +Inf）, 总和]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """
+        记录一次观测值
+
+        Args:
+            value: 观测值
+            **labels: 标签值
+        """
+        key = self._label_values(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket{self._format_labels(key, ('le', _format_value(bound)))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{self._format_labels(key)} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{self._format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """注册指标（同名指标只保留第一个）"""
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        生成 Prometheus 文本格式输出
+
+        Returns:
+            text/plain; version=0.0.4 格式的指标文本
+        """
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+# ============= 工具调用 =============
+tool_calls_total = metrics.counter(
+    "synapse_tool_calls_total",
+    "MCP tools/call requests by prefix, tool and outcome",
+    ("prefix", "tool", "outcome")
+)
+upstream_request_seconds = metrics.histogram(
+    "synapse_upstream_request_duration_seconds",
+    "Latency of upstream HTTP calls made for tools/call",
+    ("prefix", "tool", "service")
+)
+upstream_errors_total = metrics.counter(
+    "synapse_upstream_errors_total",
+    "Upstream call failures by class (timeout, connect, request, http_<status>)",
+    ("prefix", "tool", "error")
+)
+tool_response_bytes = metrics.histogram(
+    "synapse_tool_response_bytes",
+    "Size of upstream response bodies returned to agents",
+    ("prefix", "tool"),
+    buckets=SIZE_BUCKETS
+)
+
+# ============= 数据库 =============
+db_query_seconds = metrics.histogram(
+    "synapse_db_query_duration_seconds",
+    "Database statement execution time by statement type",
+    ("statement",)
+)
+
+# ============= MCP 会话（抓取时根据 SessionManager.get_stats 填充） =============
+mcp_sessions = metrics.gauge("synapse_mcp_sessions", "MCP sessions by prefix", ("prefix",))
+mcp_sessions_connected = metrics.gauge("synapse_mcp_sessions_connected", "MCP sessions with an open SSE stream")
+mcp_queued_messages = metrics.gauge("synapse_mcp_queued_messages", "Messages waiting in session queues")
+mcp_dropped_messages_total = metrics.counter(
+    "synapse_mcp_dropped_messages_total", "Messages dropped by queue overflow"
+)
+mcp_coalesced_messages_total = metrics.counter(
+    "synapse_mcp_coalesced_messages_total", "Notifications coalesced by queue overflow policy"
+)
+mcp_overflow_disconnects_total = metrics.counter(
+    "synapse_mcp_overflow_disconnects_total", "Sessions disconnected for queue overflow"
+)
+mcp_stream_takeovers_total = metrics.counter(
+    "synapse_mcp_stream_takeovers_total", "SSE streams replaced by a newer stream on the same session"
+)
+mcp_adopted_sessions_total = metrics.counter(
+    "synapse_mcp_adopted_sessions_total", "Sessions created by another worker and adopted by this one"
+)
+
+# ============= 上游连接池（抓取时根据 UpstreamClientPool.get_stats 填充） =============
+upstream_connections = metrics.gauge(
+    "synapse_upstream_connections",
+    "Upstream pool connections by origin and state",
+    ("origin", "state")
+)
+
+
+def record_upstream_error(prefix: str, tool: str, error: str):
+    """
+    记录上游调用失败
+
+    Args:
+        prefix: MCP Server 前缀
+        tool: 工具名称
+        error: 错误类别
+    """
+    upstream_errors_total.inc(prefix=prefix, tool=tool, error=error)
+
+
+def instrument_engine(engine: Engine):
+    """
+    为数据库引擎注册语句执行耗时统计
+
+    Args:
+        engine: 同步引擎（AsyncEngine.sync_engine）
+    """
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("synapse_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("synapse_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        statement_type = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "unknown"
+        db_query_seconds.observe(elapsed, statement=statement_type)
+        # 管理员按需剖析的请求额外记录语句明细
+        profiler.record_query(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # 执行失败时不会触发 after_cursor_execute，丢弃对应的开始时间
+        starts = context.connection.info.get("synapse_query_start") if context.connection else None
+        if starts:
+            starts.pop()
@@ -0,0 +1,318 @@
+"""
+按需请求剖析模块
+管理员在单个请求上加 X-Synapse-Profile 头或 _profile 查询参数时，
+对该请求做 cProfile 剖析并统计 SQL 执行次数和耗时，结果保存在内存中供管理 API 查询
+"""
+import contextvars
+import cProfile
+import io
+import pstats
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from core import database
+from core.auth import get_current_admin_user, get_current_user
+from core.config import ProfilingConfig
+
+# 触发剖析的请求头和查询参数
+PROFILE_HEADER = "x-synapse-profile"
+PROFILE_QUERY_PARAM = "_profile"
+# 响应头：剖析结果 ID，或未执行剖析的原因（denied / busy）
+PROFILE_ID_HEADER = b"x-synapse-profile-id"
+PROFILE_STATUS_HEADER = b"x-synapse-profile"
+
+# 当前请求的剖析结果（SQLAlchemy 在同一上下文中执行语句，事件回调可直接取到）
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "synapse_current_profile", default=None
+)
+
+
+@dataclass(slots=True)
+class RequestProfile:
+    """一次请求的剖析结果"""
+    profile_id: str
+    method: str
+    path: str
+    query: str
+    user: str
+    started_at: datetime
+    duration_ms: float = 0.0
+    status_code: Optional[int] = None
+    db_queries: int = 0
+    db_time_ms: float = 0.0
+    # 最慢的 SQL 语句：{"statement": ..., "duration_ms": ...}
+    slow_queries: List[Dict[str, Any]] = field(default_factory=list)
+    # 按累计耗时排序的函数及其调用方
+    functions: List[Dict[str, Any]] = field(default_factory=list)
+    stats_text: str = ""
+
+    def summary(self) -> Dict[str, Any]:
+        """列表展示用的摘要"""
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "user": self.user,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "status_code": self.status_code,
+            "db_queries": self.db_queries,
+            "db_time_ms": round(self.db_time_ms, 2),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """完整结果（不含 pstats 文本）"""
+        return {
+            **self.summary(),
+            "slow_queries": self.slow_queries,
+            "functions": self.functions,
+        }
+
+
+def _format_function(key: tuple) -> str:
+    """pstats 函数键 (file, line, name) 转为可读字符串"""
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{filename}:{line}({name})"
+
+
+class RequestProfiler:
+    """
+    请求剖析器
+
+    cProfile 剖析的是事件循环线程，剖析期间同时运行的其他协程也会计入结果；
+    同一时间只允许一个剖析，其余请求正常处理但不剖析（响应头标记 busy）。
+    aiosqlite 等驱动在工作线程中执行 SQL，这部分耗时体现在 db_time_ms 中。
+    """
+
+    def __init__(self, config: Optional[ProfilingConfig] = None):
+        self.config = config or ProfilingConfig()
+        self._profiles: Deque[RequestProfile] = deque(maxlen=self.config.max_profiles)
+        self._active = False
+
+    def configure(self, config: ProfilingConfig):
+        """
+        更新配置
+
+        Args:
+            config: 剖析配置
+        """
+        self.config = config
+        self._profiles = deque(self._profiles, maxlen=config.max_profiles)
+
+    def record_query(self, statement: str, elapsed: float):
+        """
+        记录一条 SQL 执行（由数据库引擎事件调用，不在剖析中时直接返回）
+
+        Args:
+            statement: SQL 语句
+            elapsed: 执行耗时（秒）
+        """
+        profile = _current_profile.get()
+        if profile is None:
+            return
+        elapsed_ms = elapsed * 1000
+        profile.db_queries += 1
+        profile.db_time_ms += elapsed_ms
+
+        # 只保留最慢的 max_queries 条语句
+        queries = profile.slow_queries
+        if len(queries) >= self.config.max_queries:
+            if elapsed_ms <= queries[-1]["duration_ms"]:
+                return
+            queries.pop()
+        queries.append({"statement": " ".join(statement.split())[:500], "duration_ms": round(elapsed_ms, 3)})
+        queries.sort(key=lambda item: item["duration_ms"], reverse=True)
+
+    def begin(self, profile: RequestProfile) -> Optional[cProfile.Profile]:
+        """
+        开始剖析
+
+        Args:
+            profile: 剖析结果（请求信息已填充）
+
+        Returns:
+            已启用的 cProfile，已有剖析在进行或无法启用时返回 None
+        """
+        if self._active:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # 已有其他剖析工具（如调试器）占用
+            return None
+        self._active = True
+        _current_profile.set(profile)
+        return profiler
+
+    def end(self, profile: RequestProfile, profiler: cProfile.Profile, started: float):
+        """
+        结束剖析并保存结果
+
+        Args:
+            profile: 剖析结果
+            profiler: begin() 返回的 cProfile
+            started: 请求开始时间（perf_counter）
+        """
+        profiler.disable()
+        self._active = False
+        _current_profile.set(None)
+        profile.duration_ms = (time.perf_counter() - started) * 1000
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.config.top_functions)
+        profile.stats_text = stream.getvalue()
+
+        ordered = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+        for key, (_, ncalls, tottime, cumtime, callers) in ordered[:self.config.top_functions]:
+            profile.functions.append({
+                "function": _format_function(key),
+                "ncalls": ncalls,
+                "tottime_ms": round(tottime * 1000, 3),
+                "cumtime_ms": round(cumtime * 1000, 3),
+                "callers": [_format_function(caller) for caller in list(callers)[:5]],
+            })
+        self._profiles.append(profile)
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """获取所有剖析结果的摘要（最新的在前）"""
+        return [profile.summary() for profile in reversed(self._profiles)]
+
+    def get_profile(self, profile_id: str) -> Optional[RequestProfile]:
+        """
+        根据 ID 获取剖析结果
+
+        Args:
+            profile_id: 剖析结果 ID
+
+        Returns:
+            剖析结果，不存在时返回 None
+        """
+        for profile in self._profiles:
+            if profile.profile_id == profile_id:
+                return profile
+        return None
+
+    def clear(self):
+        """清空剖析结果"""
+        self._profiles.clear()
+
+
+async def _authorize_admin(authorization: str) -> Optional[str]:
+    """
+    按 get_current_admin_user 的规则校验 Authorization 头
+
+    Args:
+        authorization: Authorization 请求头
+
+    Returns:
+        管理员用户名，校验失败时返回 None
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token or database.db_manager is None:
+        return None
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token.strip())
+    try:
+        async with database.db_manager.get_session() as db:
+            user = await get_current_admin_user(await get_current_user(credentials, db))
+    except HTTPException:
+        return None
+    return user.username
+
+
+class ProfilingMiddleware:
+    """
+    ASGI 中间件：识别剖析请求，校验管理员身份后剖析整个请求处理过程
+
+    剖析结果 ID 通过 X-Synapse-Profile-Id 响应头返回；
+    GET 方式打开的 SSE 长连接不支持剖析。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope) -> bool:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER.encode():
+                return value.strip().lower() not in (b"", b"0", b"false")
+        query = scope.get("query_string", b"")
+        if PROFILE_QUERY_PARAM.encode() in query:
+            values = parse_qs(query.decode("latin-1")).get(PROFILE_QUERY_PARAM, [])
+            return any(value.lower() not in ("", "0", "false") for value in values)
+        return False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.config.enabled or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        if scope["method"] == "GET" and "text/event-stream" in headers.get("accept", ""):
+            await self.app(scope, receive, send)
+            return
+
+        username = await _authorize_admin(headers.get("authorization", ""))
+        if username is None:
+            await self.app(scope, receive, _send_with_header(send, PROFILE_STATUS_HEADER, b"denied"))
+            return
+
+        profile = RequestProfile(
+            profile_id=uuid.uuid4().hex[:12],
+            method=scope["method"],
+            path=scope["path"],
+            query=scope.get("query_string", b"").decode("latin-1"),
+            user=username,
+            started_at=datetime.now()
+        )
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        cprofile = profiler.begin(profile)
+        if cprofile is None:
+            await self.app(scope, receive, _send_with_header(send, PROFILE_STATUS_HEADER, b"busy"))
+            return
+
+        try:
+            await self.app(scope, receive, _send_with_header(send_wrapper, PROFILE_ID_HEADER, profile.profile_id.encode()))
+        finally:
+            profiler.end(profile, cprofile, started)
+
+
+def _send_with_header(send, name: bytes, value: bytes):
+    """
+    包装 ASGI send，在响应头中追加一个头
+
+    Args:
+        send: 原始 send
+        name: 头名称（小写）
+        value: 头的值
+
+    Returns:
+        包装后的 send
+    """
+    async def wrapper(message):
+        if message["type"] == "http.response.start":
+            message = {**message, "headers": [*message.get("headers", []), (name, value)]}
+        await send(message)
+    return wrapper
+
+
+# 全局请求剖析器实例
+profiler = RequestProfiler()
@@ -0,0 +1,338 @@
+"""
+链路追踪模块
+基于 contextvars 的轻量级 Span 追踪，支持 W3C traceparent 传播和可插拔导出器
+"""
+import contextvars
+import json
+import os
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from core.config import TracingConfig
+
+# 当前 Span（异步任务创建时自动继承）
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("synapse_current_span", default=None)
+
+
+def _random_hex(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """
+    解析 W3C traceparent 头
+
+    Args:
+        header: traceparent 头的值，例如 00-<trace_id>-<span_id>-01
+
+    Returns:
+        (trace_id, parent_span_id, sampled)，格式无效时返回 None
+    """
+    if not header:
+        return None
+    parts = header.strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    _, trace_id, span_id, flags = parts[:4]
+    if len(trace_id) != 32 or len(span_id) != 16 or len(flags) != 2:
+        return None
+    try:
+        int(trace_id, 16), int(span_id, 16)
+        sampled = bool(int(flags, 16) & 0x01)
+    except ValueError:
+        return None
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id, sampled
+
+
+@dataclass(slots=True)
+class Span:
+    """追踪片段"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    # 未采样的 Span 仍参与上下文传播，但不会导出
+    recording: bool = True
+    # 本进程内的根 Span（父 Span 可能来自上游传入的 traceparent）
+    local_root: bool = False
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    start_time: float = field(default_factory=time.time)
+    start_perf: float = field(default_factory=time.perf_counter)
+    duration_ms: Optional[float] = None
+    status: str = "ok"
+    error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        """生成向下游传播的 W3C traceparent 头"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.recording else '00'}"
+
+    def set_attribute(self, key: str, value: Any):
+        """
+        设置 Span 属性
+
+        Args:
+            key: 属性名
+            value: 属性值
+        """
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        """
+        将 Span 标记为失败
+
+        Args:
+            message: 错误信息
+        """
+        self.status = "error"
+        self.error = message
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可导出的字典"""
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class SpanExporter:
+    """Span 导出器接口"""
+
+    def export(self, span: Span):
+        """导出一个已结束的 Span"""
+
+    def shutdown(self):
+        """关闭导出器"""
+
+
+class ConsoleSpanExporter(SpanExporter):
+    """控制台导出器：每个 Span 输出一行 JSON 到 stderr（不干扰 stdio 传输）"""
+
+    def export(self, span: Span):
+        print(json.dumps(span.to_dict(), ensure_ascii=False, default=str), file=sys.stderr, flush=True)
+
+
+class FileSpanExporter(SpanExporter):
+    """文件导出器：以 JSON Lines 格式追加写入本地文件，可离线分析"""
+
+    def __init__(self, path: str):
+        """
+        初始化文件导出器
+
+        Args:
+            path: 输出文件路径
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span):
+        self._file.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n")
+        # 根 Span 结束时刷新，一次请求只产生一次系统调用
+        if span.local_root:
+            self._file.flush()
+
+    def shutdown(self):
+        self._file.close()
+
+
+class _SpanScope:
+    """Span 上下文管理器：进入时设为当前 Span，退出时记录耗时、异常并导出"""
+    __slots__ = ("tracer", "span", "_token", "_deferred")
+
+    def __init__(self, tracer: "Tracer", span: Span):
+        self.tracer = tracer
+        self.span = span
+        self._token = None
+        self._deferred = False
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if not (self._deferred and exc is None):
+            self._finish(exc_type, exc)
+        return False
+
+    def defer(self, iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """
+        延续到流式响应结束：退出 with 块时不结束 Span，
+        在迭代响应体期间重新设为当前 Span，迭代结束后再记录耗时并导出
+
+        Args:
+            iterator: 流式响应体（如 EventSourceResponse.body_iterator）
+
+        Returns:
+            包装后的响应体
+        """
+        self._deferred = True
+        return self._iterate(iterator)
+
+    async def _iterate(self, iterator: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        token = _current_span.set(self.span)
+        error: Optional[BaseException] = None
+        try:
+            async for item in iterator:
+                yield item
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # 提前关闭时（客户端断开）同样关闭被包装的响应体，执行其清理逻辑
+            aclose = getattr(iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # 由其他上下文关闭生成器时无需恢复
+                pass
+            self._finish(type(error) if error else None, error)
+
+    def _finish(self, exc_type=None, exc=None):
+        span = self.span
+        span.duration_ms = (time.perf_counter() - span.start_perf) * 1000
+        if exc is not None and span.status == "ok":
+            span.set_error(f"{exc_type.__name__}: {exc}")
+        if span.recording:
+            self.tracer._export(span)
+
+
+class _NoopScope:
+    """追踪关闭时使用的空上下文管理器"""
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class Tracer:
+    """追踪器"""
+
+    def __init__(self, config: Optional[TracingConfig] = None):
+        self.config = config or TracingConfig()
+        self._exporter: Optional[SpanExporter] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._exporter is not None
+
+    def configure(self, config: TracingConfig):
+        """
+        根据配置创建导出器
+
+        Args:
+            config: 追踪配置
+        """
+        self.config = config
+        if config.exporter == "console":
+            self.set_exporter(ConsoleSpanExporter())
+        elif config.exporter == "file":
+            path = Path(config.file_path)
+            if not path.is_absolute():
+                # 相对路径基于 backend 目录
+                path = Path(__file__).parent.parent / path
+            self.set_exporter(FileSpanExporter(str(path)))
+        else:
+            self.set_exporter(None)
+
+    def set_exporter(self, exporter: Optional[SpanExporter]):
+        """
+        设置导出器（可替换为自定义实现，None 表示关闭追踪）
+
+        Args:
+            exporter: Span 导出器
+        """
+        if self._exporter is not None and self._exporter is not exporter:
+            self._exporter.shutdown()
+        self._exporter = exporter
+
+    def shutdown(self):
+        """关闭导出器"""
+        self.set_exporter(None)
+
+    def _export(self, span: Span):
+        try:
+            if self._exporter is not None:
+                self._exporter.export(span)
+        except Exception as e:
+            print(f"Failed to export span {span.name}: {e}", file=sys.stderr)
+
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes: Any):
+        """
+        创建子 Span（没有当前 Span 时创建根 Span）
+
+        用法：
+            with tracer.span("upstream.request", method="GET") as span:
+                ...
+
+        追踪关闭时返回空上下文管理器，as 得到 None。
+
+        Args:
+            name: Span 名称
+            traceparent: 上游传入的 traceparent（仅根 Span 使用）
+            **attributes: Span 属性
+
+        Returns:
+            上下文管理器
+        """
+        if self._exporter is None:
+            return _NOOP_SCOPE
+
+        parent = _current_span.get()
+        if parent is not None:
+            span = Span(
+                name=name,
+                trace_id=parent.trace_id,
+                span_id=_random_hex(8),
+                parent_id=parent.span_id,
+                recording=parent.recording,
+                attributes=attributes
+            )
+        else:
+            incoming = parse_traceparent(traceparent)
+            if incoming:
+                trace_id, parent_id, recording = incoming
+            else:
+                trace_id, parent_id = _random_hex(16), None
+                recording = random.random() < self.config.sample_rate
+            span = Span(
+                name=name,
+                trace_id=trace_id,
+                span_id=_random_hex(8),
+                parent_id=parent_id,
+                recording=recording,
+                local_root=True,
+                attributes=attributes
+            )
+        return _SpanScope(self, span)
+
+
+def current_span() -> Optional[Span]:
+    """获取当前 Span"""
+    return _current_span.get()
+
+
+# 全局追踪器实例
+tracer = Tracer()
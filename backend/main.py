@@ -17,11 +17,21 @@ from core.config import load_config
 from core.database import init_database
 from core.migration import auto_migrate_if_needed
 from core.init_admin import ensure_default_admin
+from core.metrics import instrument_engine
+from core.profiling import ProfilingMiddleware, profiler
+from core.tracing import tracer
 from models.db_models import Base
 from mcp.session import session_manager
+from mcp.session_backend import create_session_backend
+from services.cpu_pool import cpu_pool
+from services.endpoint_index import endpoint_index
+from services.service_health import service_health_scheduler
+from services.spec_cache import spec_cache
+from services.tool_call_log import tool_call_logger
+from services.upstream_pool import upstream_pool
 
 # API 路由
-from api import services, combinations, mcp_servers, dashboard, tools, mcp_protocol, auth, users
+from api import services, combinations, mcp_servers, dashboard, tools, mcp_protocol, auth, users, metrics, tool_calls, profiles
 
 # 数据目录
 DATA_DIR = PathLib(__file__).parent / "data"
@@ -29,12 +39,12 @@ DATA_DIR.mkdir(exist_ok=True)
 
 
 async def run_session_cleanup():
-    """Background task to clean up stale sessions"""
+    """Background task to expire idle sessions (advances the expiry timing wheel)"""
     while True:
         try:
-            # Check every 10 minutes
-            await asyncio.sleep(600)
-            await session_manager.cleanup_stale_sessions()
+            # Advance once per wheel tick; only due buckets are examined
+            await asyncio.sleep(session_manager.config.expiry_tick_seconds)
+            await session_manager.expire_idle_sessions()
         except asyncio.CancelledError:
             raise
         except Exception as e:
@@ -57,6 +67,7 @@ async def lifespan(app: FastAPI):
     # 2. 初始化数据库
     print("🗄️  初始化数据库连接...")
     manager = init_database(app_config)  # 保存返回的 manager 实例
+    instrument_engine(manager.engine.sync_engine)
 
     # 3. 创建表结构（如果不存在）
     print("📊 创建数据库表结构...")
@@ -79,10 +90,37 @@ async def lifespan(app: FastAPI):
     async with manager.session_maker() as session:
         await ensure_default_admin(session)
     
-    # 6. 启动会话清理任务
+    # 6. 配置上游连接池和链路追踪
+    print("🔗 配置上游连接池...")
+    upstream_pool.configure(app_config.upstream)
+    tracer.configure(app_config.tracing)
+    profiler.configure(app_config.profiling)
+    spec_cache.configure(app_config.spec_cache)
+    cpu_pool.configure(app_config.cpu_pool)
+
+    # 7. 配置 MCP 会话并启动共享后端
+    print(f"💬 启动会话后端: {app_config.session.backend}")
+    session_manager.configure(app_config.session)
+    await session_manager.start(create_session_backend(app_config.session))
+
+    # 8. 启动会话清理任务
     print("🧹 启动会话清理任务...")
     cleanup_task = asyncio.create_task(run_session_cleanup())
 
+    # 9. 启动工具调用审计日志写入任务
+    print("📝 启动工具调用审计日志...")
+    tool_call_logger.configure(app_config.tool_call_log)
+    await tool_call_logger.start(manager)
+
+    # 10. 启动服务健康检查
+    print("🩺 启动服务健康检查...")
+    service_health_scheduler.configure(app_config.service_health)
+    await service_health_scheduler.start(manager)
+
+    # 11. 建立接口索引
+    print("🔎 建立接口索引...")
+    await endpoint_index.start(manager)
+
     print("=" * 60)
     print("✅ Synapse MCP Gateway 已启动")
     print("   访问 API 文档: http://localhost:8000/docs")
@@ -98,6 +136,22 @@ async def lifespan(app: FastAPI):
     except asyncio.CancelledError:
         pass
 
+    await service_health_scheduler.stop()
+    await endpoint_index.stop()
+
+    # 写入剩余的审计日志
+    print("🛑 写入剩余的工具调用审计日志...")
+    await tool_call_logger.stop()
+
+    # 停止会话后端
+    await session_manager.stop()
+
+    # 关闭上游连接
+    print("🛑 关闭上游连接池...")
+    await upstream_pool.aclose()
+    tracer.shutdown()
+    cpu_pool.shutdown()
+
     # 关闭数据库连接
     print("🛑 关闭数据库连接...")
     await manager.close()
@@ -117,8 +171,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Synapse-Profile-Id", "X-Synapse-Profile"],
 )
 
+# 管理员按需剖析单个请求（X-Synapse-Profile 头或 _profile 查询参数）
+app.add_middleware(ProfilingMiddleware)
+
 # ============= 注册路由 =============
 # 认证和用户管理
 app.include_router(auth.router)
@@ -130,10 +188,15 @@ app.include_router(combinations.router)
 app.include_router(mcp_servers.router)
 app.include_router(dashboard.router)
 app.include_router(tools.router)
+app.include_router(tool_calls.router)
+app.include_router(profiles.router)
 
 # MCP 协议（不受认证保护）
 app.include_router(mcp_protocol.router)
 
+# Prometheus 指标（不受认证保护）
+app.include_router(metrics.router)
+
 
 if __name__ == '__main__':
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -60,6 +60,67 @@ def create_success_response(result: Any, id: Optional[int | str] = None) -> Dict
     }
 
 
+def create_progress_notification(
+    progress_token: int | str,
+    progress: float,
+    total: Optional[float] = None,
+    message: Optional[str] = None
+) -> Dict[str, Any]:
+    """创建进度通知（notifications/progress）"""
+    params: Dict[str, Any] = {
+        "progressToken": progress_token,
+        "progress": progress
+    }
+    if total is not None:
+        params["total"] = total
+    if message:
+        params["message"] = message
+
+    return {
+        "jsonrpc": "2.0",
+        "method": "notifications/progress",
+        "params": params
+    }
+
+
+def build_tool_name(endpoint: Dict[str, Any], prefix: str = "") -> str:
+    """
+    生成工具名称：prefix_method_path
+
+    Args:
+        endpoint: 组合中的端点信息
+        prefix: 工具名称前缀（用于避免冲突）
+
+    Returns:
+        工具名称
+    """
+    path = endpoint.get("path", "").replace("/", "_").replace("{", "").replace("}", "").strip("_")
+    method = endpoint.get("method", "GET").lower()
+    return f"{prefix}_{method}_{path}" if prefix else f"{method}_{path}"
+
+
+def json_body_schema(endpoint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    获取端点 application/json 请求体的 schema
+
+    工具 inputSchema 是否包含 body 参数、上游路由是否把 body 作为 JSON 请求体发送，
+    都以此为准，两者保持一致
+
+    Args:
+        endpoint: 组合中的端点信息
+
+    Returns:
+        请求体 schema，没有 JSON 请求体或未声明 schema 时返回 None
+    """
+    req_body = endpoint.get("requestBody")
+    if not req_body:
+        return None
+    json_content = (req_body.get("content") or {}).get("application/json")
+    if not json_content or "schema" not in json_content:
+        return None
+    return json_content["schema"]
+
+
 def convert_openapi_endpoint_to_mcp_tool(
     endpoint: Dict[str, Any],
     prefix: str = ""
@@ -67,6 +128,10 @@ def convert_openapi_endpoint_to_mcp_tool(
     """
     将 OpenAPI 端点转换为 MCP 工具
 
+    上游调用所需的 method/path/serviceUrl 由服务端路由表（mcp.routing）维护，
+    不再作为隐藏参数暴露在 inputSchema 中。
+    端点带有 schemaDefs 时，共享 schema 放入 inputSchema 的 $defs，参数和请求体通过本地 $ref 引用。
+
     Args:
         endpoint: 组合中的端点信息
         prefix: 工具名称前缀（用于避免冲突）
@@ -74,10 +139,8 @@ def convert_openapi_endpoint_to_mcp_tool(
     Returns:
         MCP 工具定义
     """
-    # 生成工具名称：prefix_method_path
-    path = endpoint.get("path", "").replace("/", "_").replace("{", "").replace("}", "").strip("_")
+    tool_name = build_tool_name(endpoint, prefix)
     method = endpoint.get("method", "GET").lower()
-    tool_name = f"{prefix}_{method}_{path}" if prefix else f"{method}_{path}"
 
     # 工具描述
     description = endpoint.get("summary", "") or endpoint.get("description", "") or f"{method.upper()} {endpoint.get('path', '')}"
@@ -90,18 +153,18 @@ def convert_openapi_endpoint_to_mcp_tool(
     }
 
     # 处理参数 (Query, Path, Header, Cookie)
-    for param in endpoint.get("parameters", []):
+    for param in endpoint.get("parameters") or []:
         param_name = param.get("name")
         if not param_name:
             continue
 
         param_schema = param.get("schema", {})
-        description = param.get("description", "")
+        param_description = param.get("description", "")
         
-        # 添加参数到 schema
+        # 添加参数到 schema（引用 $defs 的参数类型由被引用的 schema 决定）
         input_schema["properties"][param_name] = {
-            "type": param_schema.get("type", "string"),
-            "description": description,
+            **({} if "$ref" in param_schema else {"type": param_schema.get("type", "string")}),
+            "description": param_description,
             # 复制其他 schema 属性 (format, enum, etc.)
             **{k: v for k, v in param_schema.items() if k not in ["type", "description"]}
         }
@@ -109,42 +172,24 @@ def convert_openapi_endpoint_to_mcp_tool(
         if param.get("required", False):
             input_schema["required"].append(param_name)
 
-    # 处理请求体 (Request Body)
-    req_body = endpoint.get("requestBody")
-    if req_body:
-        content = req_body.get("content", {})
-        # 优先处理 application/json
-        json_content = content.get("application/json")
-        if json_content and "schema" in json_content:
-            body_schema = json_content["schema"]
-            body_desc = req_body.get("description", "Request body")
-            
-            # 将请求体作为一个名为 'body' 的参数
-            input_schema["properties"]["body"] = {
-                "type": "object",
-                "description": body_desc,
-                **body_schema
-            }
-            if req_body.get("required", False):
-                input_schema["required"].append("body")
-
-    # 添加基本元数据（隐藏参数）
-    input_schema["properties"]["_method"] = {
-        "type": "string",
-        "description": "HTTP method",
-        "enum": [method.upper()],
-        "default": method.upper()
-    }
-    input_schema["properties"]["_path"] = {
-        "type": "string",
-        "description": "API path",
-        "default": endpoint.get("path", "")
-    }
-    input_schema["properties"]["_serviceUrl"] = {
-        "type": "string",
-        "description": "Service base URL",
-        "default": endpoint.get("serviceUrl", "")
-    }
+    # 处理请求体 (Request Body)：只处理 application/json
+    body_schema = json_body_schema(endpoint)
+    if body_schema is not None:
+        req_body = endpoint["requestBody"]
+        body_desc = req_body.get("description", "Request body")
+
+        # 将请求体作为一个名为 'body' 的参数（引用 $defs 时类型由被引用的 schema 决定）
+        input_schema["properties"]["body"] = {
+            **({} if "$ref" in body_schema else {"type": "object"}),
+            "description": body_desc,
+            **body_schema
+        }
+        if req_body.get("required", False):
+            input_schema["required"].append("body")
+
+    schema_defs = endpoint.get("schemaDefs")
+    if schema_defs:
+        input_schema["$defs"] = schema_defs
 
     return McpTool(
         name=tool_name,
@@ -0,0 +1,230 @@
+"""
+MCP Server 注册表
+按前缀缓存已编译的 McpServerHandler，避免每次请求都访问数据库
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.tracing import tracer
+from mcp.server import McpServerHandler
+from mcp.session import session_manager
+from models.combination import Combination
+from models.mcp_server import McpServer
+from repositories.combination_repository import CombinationRepository
+from repositories.mcp_server_repository import McpServerRepository
+from services.cpu_pool import cpu_pool
+
+# 跨 worker 同步注册表失效的消息主题
+INVALIDATE_TOPIC = "registry.invalidate"
+
+
+async def load_server_snapshot(prefix: str, db: AsyncSession) -> Optional[Dict[str, Any]]:
+    """
+    从数据库加载 MCP Server 及其引用的组合
+
+    Args:
+        prefix: MCP Server 前缀
+        db: 数据库会话
+
+    Returns:
+        可 JSON 序列化的快照 {"server": ..., "combinations": [...]}，前缀不存在时返回 None
+    """
+    server_repo = McpServerRepository(db)
+    mcp_server = await server_repo.get_by_prefix(prefix)
+    if not mcp_server:
+        return None
+
+    # 只加载当前 MCP Server 引用的组合
+    comb_repo = CombinationRepository(db)
+    db_combinations = await comb_repo.get_by_ids(mcp_server.combination_ids or [])
+
+    return {
+        "server": McpServer.from_orm(mcp_server).model_dump(mode="json"),
+        "combinations": [Combination.from_orm(c).model_dump(mode="json") for c in db_combinations]
+    }
+
+
+def build_handler(snapshot: Dict[str, Any]) -> McpServerHandler:
+    """
+    根据快照编译 Handler（预先编译工具列表和路由）
+
+    Args:
+        snapshot: load_server_snapshot 返回的快照
+
+    Returns:
+        Handler 实例
+    """
+    handler = McpServerHandler(
+        server_config=snapshot["server"],
+        combinations=snapshot["combinations"]
+    )
+    handler.get_tools()
+    return handler
+
+
+class McpServerRegistry:
+    """
+    已编译 MCP Server 注册表（进程级）
+
+    - 首次访问某个前缀时从数据库加载配置并编译工具列表
+    - 之后的 tools/list、tools/call 直接命中内存，零数据库往返
+    - 管理 API 修改配置后调用 invalidate* 使对应前缀失效，下次访问时重建，
+      失效消息通过会话后端同步到其他 worker
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, McpServerHandler] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # 每个前缀构建锁的使用者数（包括等待者）
+        self._lock_users: Dict[str, int] = {}
+        # 每个前缀的失效版本号，用于丢弃在失效期间构建出的过期 Handler
+        self._versions: Dict[str, int] = {}
+        # 全局失效纪元，组合变更时递增（构建中的前缀无法按组合精确匹配）
+        self._epoch = 0
+
+    def get_cached(self, prefix: str) -> Optional[McpServerHandler]:
+        """仅从内存获取 Handler（不访问数据库）"""
+        return self._handlers.get(prefix)
+
+    async def get_handler(self, prefix: str, db: AsyncSession) -> Optional[McpServerHandler]:
+        """
+        获取指定前缀的已编译 Handler
+
+        Args:
+            prefix: MCP Server 前缀
+            db: 数据库会话（仅在缓存未命中时使用）
+
+        Returns:
+            Handler 实例，前缀不存在时返回 None
+        """
+        handler = self._handlers.get(prefix)
+        if handler is not None:
+            return handler
+
+        with tracer.span("registry.get_handler", prefix=prefix):
+            return await self._get_or_build(prefix, db)
+
+    async def _get_or_build(self, prefix: str, db: AsyncSession) -> Optional[McpServerHandler]:
+        """
+        缓存未命中时串行构建 Handler（同一前缀只构建一次）
+
+        构建锁只在有请求使用时存在，最后一个使用者退出后删除，
+        请求不存在的前缀不会留下任何条目
+        """
+        lock = self._locks.get(prefix)
+        if lock is None:
+            lock = self._locks[prefix] = asyncio.Lock()
+        self._lock_users[prefix] = self._lock_users.get(prefix, 0) + 1
+        try:
+            async with lock:
+                # 双重检查：等待锁期间可能已被其他请求构建完成
+                handler = self._handlers.get(prefix)
+                if handler is not None:
+                    return handler
+
+                version = (self._epoch, self._versions.get(prefix, 0))
+                handler = await self._build_handler(prefix, db)
+
+                # 构建期间发生了失效，不缓存本次结果（但仍可用于当前请求）
+                if handler is not None and (self._epoch, self._versions.get(prefix, 0)) == version:
+                    self._handlers[prefix] = handler
+
+                return handler
+        finally:
+            users = self._lock_users[prefix] - 1
+            if users:
+                self._lock_users[prefix] = users
+            else:
+                del self._lock_users[prefix]
+                del self._locks[prefix]
+
+    async def _build_handler(self, prefix: str, db: AsyncSession) -> Optional[McpServerHandler]:
+        """从数据库加载配置并编译 Handler"""
+        with tracer.span("registry.load", prefix=prefix):
+            snapshot = await load_server_snapshot(prefix, db)
+        if snapshot is None:
+            return None
+        with tracer.span("registry.compile", prefix=prefix) as span:
+            # 编译涉及全部工具的 schema 转换，放到线程池中执行（Handler 不可序列化，不能用进程池）
+            handler = await cpu_pool.run_in_thread(build_handler, snapshot)
+            if span:
+                span.set_attribute("tools", len(handler.get_tools()))
+        return handler
+
+    async def invalidate(self, prefix: str):
+        """
+        使指定前缀的 Handler 失效（所有 worker）
+
+        Args:
+            prefix: MCP Server 前缀
+        """
+        self._invalidate_prefix(prefix)
+        await session_manager.publish(INVALIDATE_TOPIC, {"prefix": prefix})
+
+    async def invalidate_combination(self, combination_id: int) -> List[str]:
+        """
+        使引用了指定组合的所有 Handler 失效（所有 worker）
+
+        Args:
+            combination_id: 组合 ID
+
+        Returns:
+            本 worker 上被失效的前缀列表
+        """
+        affected = self._invalidate_combination(combination_id)
+        await session_manager.publish(INVALIDATE_TOPIC, {"combination_id": combination_id})
+        return affected
+
+    async def invalidate_all(self):
+        """使所有 Handler 失效（所有 worker）"""
+        self._invalidate_all()
+        await session_manager.publish(INVALIDATE_TOPIC, {"all": True})
+
+    def _invalidate_prefix(self, prefix: str):
+        """使本 worker 上指定前缀的 Handler 失效"""
+        self._versions[prefix] = self._versions.get(prefix, 0) + 1
+        self._handlers.pop(prefix, None)
+
+    def _invalidate_combination(self, combination_id: int) -> List[str]:
+        """使本 worker 上引用了指定组合的 Handler 失效"""
+        self._epoch += 1
+        affected = [
+            prefix
+            for prefix, handler in self._handlers.items()
+            if combination_id in handler.server_config.get("combination_ids", [])
+        ]
+        for prefix in affected:
+            self._invalidate_prefix(prefix)
+        return affected
+
+    def _invalidate_all(self):
+        """使本 worker 上的所有 Handler 失效"""
+        self._epoch += 1
+        for prefix in list(self._handlers.keys()):
+            self._invalidate_prefix(prefix)
+
+    async def _on_remote_invalidation(self, payload: Dict[str, Any]):
+        """处理其他 worker 发布的失效消息"""
+        if payload.get("all"):
+            self._invalidate_all()
+        elif payload.get("combination_id") is not None:
+            self._invalidate_combination(payload["combination_id"])
+        elif payload.get("prefix"):
+            self._invalidate_prefix(payload["prefix"])
+
+    def get_stats(self) -> dict:
+        """获取注册表统计信息"""
+        return {
+            "cached_servers": len(self._handlers),
+            "tools_by_prefix": {
+                prefix: len(handler.get_tools())
+                for prefix, handler in self._handlers.items()
+            }
+        }
+
+
+# 全局 MCP Server 注册表实例
+server_registry = McpServerRegistry()
+session_manager.subscribe(INVALIDATE_TOPIC, server_registry._on_remote_invalidation)
@@ -0,0 +1,158 @@
+"""
+MCP 工具路由
+将组合中的端点预编译为上游调用路由，tools/call 时按工具名 O(1) 查找
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Tuple
+from urllib.parse import quote
+
+from mcp.protocol import json_body_schema
+
+# 路径模板参数，如 /pet/{petId}
+_PATH_PARAM_PATTERN = re.compile(r"\{([^{}]+)\}")
+
+# 这些方法在没有显式 body 参数时，会把未声明的参数作为 JSON body 发送
+_BODY_METHODS = {"POST", "PUT", "PATCH"}
+
+
+@dataclass(frozen=True)
+class ToolRoute:
+    """已编译的工具路由"""
+    name: str
+    method: str
+    path_template: str
+    # 预拆分的路径模板：偶数位为字面量，奇数位为参数名
+    path_segments: Tuple[str, ...]
+    path_params: FrozenSet[str]
+    query_params: FrozenSet[str]
+    header_params: FrozenSet[str]
+    cookie_params: FrozenSet[str]
+    has_body: bool
+    base_url: str
+    service_name: str = ""
+
+    def build_request(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        根据工具参数构建上游请求
+
+        Args:
+            arguments: tools/call 传入的参数
+
+        Returns:
+            httpx.request 所需的关键字参数（method, url, params, headers, json）
+
+        Raises:
+            ValueError: 缺少路径参数时抛出
+        """
+        # 1. 路径参数
+        parts = []
+        for index, segment in enumerate(self.path_segments):
+            if index % 2 == 0:
+                parts.append(segment)
+                continue
+            if segment not in arguments:
+                raise ValueError(f"Missing required path parameter: {segment}")
+            parts.append(quote(str(arguments[segment]), safe=""))
+
+        # 2. 按声明的位置分配其余参数（忽略以 _ 开头的内部参数）
+        params: Dict[str, Any] = {}
+        headers: Dict[str, str] = {}
+        cookies: Dict[str, str] = {}
+        undeclared: Dict[str, Any] = {}
+        json_body = None
+
+        for key, value in arguments.items():
+            if key in self.path_params or key.startswith("_"):
+                continue
+            if key == "body" and self.has_body:
+                json_body = value
+            elif key in self.query_params:
+                params[key] = value
+            elif key in self.header_params:
+                headers[key] = str(value)
+            elif key in self.cookie_params:
+                cookies[key] = str(value)
+            else:
+                undeclared[key] = value
+
+        # 3. 未声明的参数：写方法且无显式 body 时作为 JSON body，否则作为查询参数
+        if undeclared:
+            if json_body is None and self.method in _BODY_METHODS:
+                json_body = undeclared
+            else:
+                params.update(undeclared)
+
+        request = {
+            "method": self.method,
+            "url": f"{self.base_url}{''.join(parts)}",
+            "params": params,
+        }
+        # Cookie 参数作为显式请求头发送：共享客户端的 Cookie 罐不保存任何 Cookie
+        if cookies:
+            cookie_header = "; ".join(f"{key}={value}" for key, value in cookies.items())
+            existing = next((key for key in headers if key.lower() == "cookie"), None)
+            if existing:
+                headers[existing] = f"{headers[existing]}; {cookie_header}"
+            else:
+                headers["Cookie"] = cookie_header
+        if headers:
+            request["headers"] = headers
+        if json_body is not None:
+            request["json"] = json_body
+        return request
+
+
+def resolve_base_url(service_url: str) -> str:
+    """
+    从 OpenAPI 文档地址推导服务基础 URL
+
+    Args:
+        service_url: OpenAPI/Swagger 文档地址
+
+    Returns:
+        服务基础 URL
+    """
+    return service_url.replace("/openapi.json", "").replace("/swagger.json", "")
+
+
+def compile_tool_route(endpoint: Dict[str, Any], tool_name: str) -> ToolRoute:
+    """
+    将组合中的端点编译为工具路由
+
+    Args:
+        endpoint: 组合中的端点信息
+        tool_name: 对应的 MCP 工具名称
+
+    Returns:
+        已编译的工具路由
+    """
+    path_template = endpoint.get("path", "")
+    path_segments = tuple(_PATH_PARAM_PATTERN.split(path_template))
+
+    placement: Dict[str, set] = {"path": set(), "query": set(), "header": set(), "cookie": set()}
+    for param in endpoint.get("parameters") or []:
+        name = param.get("name")
+        location = param.get("in", "query")
+        if name and location in placement:
+            placement[location].add(name)
+
+    # 路径模板中出现的参数一律视为路径参数
+    placement["path"].update(path_segments[1::2])
+
+    # 与工具 inputSchema 中是否有 body 参数的判断一致
+    has_body = json_body_schema(endpoint) is not None
+
+    return ToolRoute(
+        name=tool_name,
+        method=endpoint.get("method", "GET").upper(),
+        path_template=path_template,
+        path_segments=path_segments,
+        path_params=frozenset(placement["path"]),
+        query_params=frozenset(placement["query"]),
+        header_params=frozenset(placement["header"]),
+        cookie_params=frozenset(placement["cookie"]),
+        has_body=has_body,
+        base_url=resolve_base_url(endpoint.get("serviceUrl", "")),
+        service_name=endpoint.get("serviceName", ""),
+    )
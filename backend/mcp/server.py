@@ -3,16 +3,37 @@
 MCP Server 核心逻辑
 处理工具列表、工具调用等
 """
-import re
-from typing import Dict, List, Any, Optional
+import time
+from typing import Awaitable, Callable, Dict, List, Any, Optional, Tuple
 import httpx
+
+from core.metrics import (
+    record_upstream_error,
+    tool_calls_total,
+    tool_response_bytes,
+    upstream_request_seconds
+)
+from core.tracing import tracer
 from mcp.protocol import (
     McpTool,
+    build_tool_name,
     convert_openapi_endpoint_to_mcp_tool,
     create_error_response,
+    create_progress_notification,
     create_success_response,
     McpError
 )
+from mcp.routing import ToolRoute, compile_tool_route
+from services.tool_call_log import tool_call_logger
+from services.tool_stats import tool_stats
+from services.upstream_pool import upstream_pool
+
+
+# 向客户端推送 JSON-RPC 通知的回调（例如 Streamable HTTP 的 SSE 响应流）
+NotifyCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+# 进度上报回调：(progress, total, message)
+ProgressCallback = Callable[[float, Optional[float], Optional[str]], Awaitable[None]]
 
 
 class McpServerHandler:
@@ -34,10 +55,26 @@ class McpServerHandler:
         self.combinations = combinations
         self.prefix = server_config.get("prefix", "")
         self._tools_cache: Optional[List[McpTool]] = None
+        self._routes: Dict[str, ToolRoute] = {}
 
     def invalidate_cache(self):
         """使工具缓存失效（当配置变更时调用）"""
         self._tools_cache = None
+        self._routes = {}
+
+    def get_route(self, tool_name: str) -> Optional[ToolRoute]:
+        """
+        根据工具名称获取已编译的路由
+
+        Args:
+            tool_name: 工具名称
+
+        Returns:
+            工具路由，不存在时返回 None
+        """
+        if self._tools_cache is None:
+            self.get_tools()
+        return self._routes.get(tool_name)
 
     def get_tools(self) -> List[McpTool]:
         """
@@ -49,6 +86,7 @@ class McpServerHandler:
             return self._tools_cache
 
         tools = []
+        routes: Dict[str, ToolRoute] = {}
         combination_ids = self.server_config.get("combination_ids", [])
 
         for combination in self.combinations:
@@ -64,15 +102,22 @@ class McpServerHandler:
             endpoints = combination.get("endpoints", [])
             for endpoint in endpoints:
                 try:
+                    tool_name = build_tool_name(endpoint, prefix=self.prefix)
+                    if tool_name in routes:
+                        # 多个组合包含同一接口时只保留第一个
+                        continue
+
                     tool = convert_openapi_endpoint_to_mcp_tool(
                         endpoint,
                         prefix=self.prefix
                     )
+                    routes[tool_name] = compile_tool_route(endpoint, tool_name)
                     tools.append(tool)
                 except Exception as e:
                     print(f"Failed to convert endpoint to tool: {e}")
                     continue
 
+        self._routes = routes
         self._tools_cache = tools
         return tools
 
@@ -102,7 +147,8 @@ class McpServerHandler:
         self,
         tool_name: str,
         arguments: Dict[str, Any],
-        request_id: Optional[int | str] = None
+        request_id: Optional[int | str] = None,
+        report_progress: Optional[ProgressCallback] = None
     ) -> Dict[str, Any]:
         """
         处理 tools/call 请求
@@ -112,121 +158,160 @@ class McpServerHandler:
             tool_name: 工具名称
             arguments: 工具参数
             request_id: 请求 ID
+            report_progress: 进度上报回调（客户端提供 progressToken 时）
 
         Returns:
             JSON-RPC 响应
         """
-        try:
-            # Copy arguments to avoid modifying the original
-            args = arguments.copy()
+        route = self.get_route(tool_name)
+        if route is None:
+            return create_error_response(
+                code=McpError.INVALID_PARAMS,
+                message=f"Unknown tool: {tool_name}",
+                id=request_id
+            )
 
-            # 从参数中提取必要信息
-            method = args.get("_method", "GET")
-            path_template = args.get("_path", "")
-            service_url = args.get("_serviceUrl", "")
+        prefix = self.server_config.get("prefix", "")
+        started = time.perf_counter()
+        with tracer.span("tool.call", prefix=prefix, tool=tool_name) as span:
+            result, response_bytes, status_code = await self._call_upstream(
+                route, arguments, request_id, report_progress
+            )
+            # 上游 HTTP 4xx/5xx 仍以工具结果返回给客户端，但在统计和审计日志中计为失败
+            if "error" in result:
+                error = result["error"].get("message", "")
+            elif status_code is not None and status_code >= 400:
+                error = f"HTTP {status_code}"
+            else:
+                error = None
+            outcome = "error" if error is not None else "success"
+            if span and error is not None:
+                span.set_error(error)
+        tool_calls_total.inc(prefix=prefix, tool=tool_name, outcome=outcome)
+
+        # 审计日志只写入内存缓冲区，由后台任务批量落库
+        latency_ms = (time.perf_counter() - started) * 1000
+        tool_call_logger.record(
+            prefix=prefix,
+            tool_name=tool_name,
+            arguments=arguments,
+            status=outcome,
+            latency_ms=latency_ms,
+            response_bytes=response_bytes,
+            error=error
+        )
+        tool_stats.record(prefix, tool_name, outcome, latency_ms, response_bytes)
+        return result
+
+    async def _call_upstream(
+        self,
+        route: ToolRoute,
+        arguments: Dict[str, Any],
+        request_id: Optional[int | str],
+        report_progress: Optional[ProgressCallback]
+    ) -> Tuple[Dict[str, Any], int, Optional[int]]:
+        """
+        按预编译路由调用上游 API，并记录延迟、错误类别和响应大小
 
-            if not service_url or not path_template:
+        Returns:
+            (JSON-RPC 响应, 上游响应字节数, 上游 HTTP 状态码（未收到响应时为 None）)
+        """
+        prefix = self.server_config.get("prefix", "")
+        tool_name = route.name
+        response_bytes = 0
+        try:
+            # 根据预编译路由构建上游请求（路径、查询、请求头、请求体）
+            try:
+                with tracer.span("tool.build_request"):
+                    upstream_request = route.build_request(arguments or {})
+            except ValueError as e:
                 return create_error_response(
                     code=McpError.INVALID_PARAMS,
-                    message="Missing required parameters: _serviceUrl or _path",
+                    message=str(e),
                     id=request_id
-                )
-
-            # 1. 处理路径参数 (Path Parameters)
-            # 查找路径中的参数，如 /pet/{petId}
-            path_params = re.findall(r"\{([a-zA-Z0-9_]+)\}", path_template)
-            actual_path = path_template
-
-            for param_name in path_params:
-                if param_name in args:
-                    val = args.pop(param_name)  # 从参数中移除，避免重复发送
-                    actual_path = actual_path.replace(f"{{{param_name}}}", str(val))
-                else:
-                    # 如果缺少路径参数，可能导致调用失败，但暂时不做严格校验
-                    pass
-
-            # 构建完整 URL
-            base_url = service_url.replace("/openapi.json", "").replace("/swagger.json", "")
-            full_url = f"{base_url}{actual_path}"
-
-            # 2. 处理请求体 (Request Body)
-            json_body = None
-            if "body" in args:
-                json_body = args.pop("body")
-
-            # 3. 准备剩余参数 (Query Params)
-            # 过滤掉内部参数（以 _ 开头的）
-            request_params = {
-                k: v for k, v in args.items()
-                if not k.startswith("_")
-            }
-
-            # 执行 HTTP 请求
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                if method.upper() == "GET":
-                    response = await client.get(full_url, params=request_params)
-                elif method.upper() == "DELETE":
-                    response = await client.delete(full_url, params=request_params)
-                elif method.upper() in ["POST", "PUT", "PATCH"]:
-                    # 如果有显式的 body 参数，使用它作为 JSON body
-                    # 剩余的 request_params 作为 query params
-                    if json_body is not None:
-                        response = await client.request(
-                            method, 
-                            full_url, 
-                            json=json_body, 
-                            params=request_params
-                        )
-                    else:
-                        # 否则，将所有参数作为 JSON body
-                        response = await client.request(
-                            method, 
-                            full_url, 
-                            json=request_params
-                        )
-                else:
-                    return create_error_response(
-                        code=McpError.INVALID_PARAMS,
-                        message=f"Unsupported HTTP method: {method}",
-                        id=request_id
+                ), response_bytes, None
+
+            if report_progress:
+                await report_progress(0, 1, f"Calling {route.method} {route.path_template}")
+
+            # 执行 HTTP 请求（复用上游长连接）
+            client = upstream_pool.get_client(route.base_url)
+            with tracer.span(
+                "upstream.request",
+                http_method=route.method,
+                url=upstream_request["url"],
+                service=route.service_name
+            ) as span:
+                # 向上游传播 W3C 追踪上下文
+                if span:
+                    upstream_request.setdefault("headers", {})["traceparent"] = span.traceparent
+
+                started = time.perf_counter()
+                try:
+                    response = await client.request(
+                        **upstream_request,
+                        timeout=upstream_pool.get_timeout(route.service_name, route.base_url)
+                    )
+                finally:
+                    upstream_request_seconds.observe(
+                        time.perf_counter() - started,
+                        prefix=prefix, tool=tool_name, service=route.service_name
                     )
 
+                response_bytes = len(response.content)
+                if span:
+                    span.set_attribute("status_code", response.status_code)
+                    span.set_attribute("response_bytes", response_bytes)
+                    if response.status_code >= 400:
+                        span.set_error(f"HTTP {response.status_code}")
+
+            if response.status_code >= 400:
+                record_upstream_error(prefix, tool_name, f"http_{response.status_code}")
+            tool_response_bytes.observe(response_bytes, prefix=prefix, tool=tool_name)
+
+            if report_progress:
+                await report_progress(1, 1, f"Upstream responded with HTTP {response.status_code}")
+
             # 返回 API 响应
-            try:
-                result_data = response.json()
-            except Exception:
-                result_data = {"text": response.text, "status_code": response.status_code}
+            with tracer.span("tool.serialize"):
+                try:
+                    result_data = response.json()
+                except Exception:
+                    result_data = {"text": response.text, "status_code": response.status_code}
+                text = str(result_data)
 
             return create_success_response(
                 result={
                     "content": [
                         {
                             "type": "text",
-                            "text": str(result_data)
+                            "text": text
                         }
                     ]
                 },
                 id=request_id
-            )
+            ), response_bytes, response.status_code
 
         except httpx.TimeoutException:
+            record_upstream_error(prefix, tool_name, "timeout")
             return create_error_response(
                 code=McpError.INTERNAL_ERROR,
                 message="API request timeout",
                 id=request_id
-            )
+            ), response_bytes, None
         except httpx.RequestError as e:
+            record_upstream_error(prefix, tool_name, "connect" if isinstance(e, httpx.ConnectError) else "request")
             return create_error_response(
                 code=McpError.INTERNAL_ERROR,
                 message=f"API request failed: {str(e)}",
                 id=request_id
-            )
+            ), response_bytes, None
         except Exception as e:
             return create_error_response(
                 code=McpError.INTERNAL_ERROR,
                 message=f"Tool execution failed: {str(e)}",
                 id=request_id
-            )
+            ), response_bytes, None
 
     async def handle_initialize(self, params: Optional[Dict[str, Any]] = None, request_id: Optional[int | str] = None) -> Dict[str, Any]:
         """
@@ -258,7 +343,13 @@ class McpServerHandler:
             id=request_id
         )
 
-    async def handle_request(self, method: str, params: Optional[Dict[str, Any]], request_id: Optional[int | str]) -> Dict[str, Any]:
+    async def handle_request(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]],
+        request_id: Optional[int | str],
+        notify: Optional[NotifyCallback] = None
+    ) -> Dict[str, Any]:
         """
         统一处理 MCP 请求
 
@@ -266,10 +357,22 @@ class McpServerHandler:
             method: RPC 方法名
             params: 请求参数
             request_id: 请求 ID
+            notify: 推送通知的回调（支持流式响应时提供，用于进度通知）
 
         Returns:
             JSON-RPC 响应
         """
+        with tracer.span("mcp.rpc", rpc_method=method):
+            return await self._dispatch(method, params, request_id, notify)
+
+    async def _dispatch(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]],
+        request_id: Optional[int | str],
+        notify: Optional[NotifyCallback]
+    ) -> Dict[str, Any]:
+        """按 RPC 方法分发请求"""
         if method == "initialize":
             return await self.handle_initialize(params, request_id)
         elif method == "tools/list":
@@ -289,7 +392,14 @@ class McpServerHandler:
                     message="Missing tool name",
                     id=request_id
                 )
-            return await self.handle_tools_call(tool_name, arguments, request_id)
+            # 客户端在 _meta.progressToken 中请求进度通知
+            report_progress = None
+            progress_token = (params.get("_meta") or {}).get("progressToken")
+            if notify and progress_token is not None:
+                async def report_progress(progress: float, total: Optional[float], message: Optional[str]):
+                    await notify(create_progress_notification(progress_token, progress, total, message))
+
+            return await self.handle_tools_call(tool_name, arguments, request_id, report_progress)
         else:
             return create_error_response(
                 code=McpError.METHOD_NOT_FOUND,
@@ -3,33 +3,389 @@ MCP Session Manager
 管理 SSE 连接和客户端会话
 """
 import asyncio
+import json
+import time
 import uuid
-from typing import Dict, Optional, Set
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 from dataclasses import dataclass, field
 
+from sse_starlette.sse import ServerSentEvent
 
-@dataclass
+from core.config import SessionConfig
+from mcp.session_backend import InProcessSessionBackend, SessionBackend
+from mcp.timing_wheel import TimingWheel
+
+
+# 可合并的通知：队列中已有相同通知待发送时，新通知不再入队
+COALESCABLE_METHODS = {
+    "notifications/tools/list_changed",
+    "notifications/resources/list_changed",
+    "notifications/prompts/list_changed",
+}
+
+# 跨 worker 广播到前缀会话的消息主题
+BROADCAST_TOPIC = "session.broadcast"
+# 会话的 SSE 流被新的流接管（可能在其他 worker 上）
+STREAM_TAKEOVER_TOPIC = "session.stream_takeover"
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedMessage:
+    """
+    预编码的 SSE 消息
+
+    广播时只序列化一次，所有会话的队列和重放缓冲区共享同一个对象，
+    SSE 写出时仅在共享帧前拼接各会话自己的 id 行。
+    """
+    # 可合并通知的方法名（请求 / 响应为 None）
+    method: Optional[str]
+    # 不含 id 行的 SSE 帧（event + data）
+    frame: bytes
+
+    def to_bytes(self, event_id: str) -> bytes:
+        """
+        生成带事件 ID 的完整 SSE 帧
+
+        Args:
+            event_id: 事件 ID
+
+        Returns:
+            可直接写出的 SSE 帧
+        """
+        return b"id: " + event_id.encode() + b"\r\n" + self.frame
+
+
+def encode_message(message: dict) -> EncodedMessage:
+    """
+    将 JSON-RPC 消息编码为 SSE 帧
+
+    Args:
+        message: JSON-RPC 消息
+
+    Returns:
+        预编码消息
+    """
+    return EncodedMessage(
+        method=message.get("method") if "id" not in message else None,
+        frame=ServerSentEvent(data=json.dumps(message), event="message").encode()
+    )
+
+
+def format_event_id(session_id: str, seq: int) -> str:
+    """
+    生成 SSE 事件 ID（会话 ID + 单调递增序号）
+
+    事件 ID 中携带会话 ID，即使客户端重连时只发送 Last-Event-ID 也能定位会话。
+    """
+    return f"{session_id}:{seq}"
+
+
+def parse_event_id(event_id: str) -> Optional[Tuple[str, int]]:
+    """
+    解析 SSE 事件 ID
+
+    Returns:
+        (会话 ID, 序号)，格式无效时返回 None
+    """
+    session_id, sep, seq = event_id.rpartition(":")
+    if not sep or not seq.isdigit():
+        return None
+    return session_id, int(seq)
+
+
+class SessionQueue:
+    """
+    轻量级单消费者消息队列
+
+    替代 asyncio.Queue：存储按需分配、清空后释放，
+    大量空闲长连接会话只占用极少内存。
+    """
+    __slots__ = ("maxsize", "_items", "_waiter")
+
+    def __init__(self, maxsize: int = 0):
+        self.maxsize = maxsize
+        self._items: Optional[Deque] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+    def qsize(self) -> int:
+        return len(self._items) if self._items else 0
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= self.qsize()
+
+    def put_nowait(self, item):
+        if self._items is None:
+            self._items = deque()
+        self._items.append(item)
+        self.wake()
+
+    def wake(self):
+        """唤醒正在等待的消费者（即使队列为空）"""
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def get_nowait(self):
+        if not self._items:
+            raise asyncio.QueueEmpty
+        item = self._items.popleft()
+        if not self._items:
+            self._items = None
+        return item
+
+    async def wait(self):
+        """等待新消息入队或被 wake() 唤醒"""
+        waiter = self._waiter = asyncio.get_running_loop().create_future()
+        try:
+            await waiter
+        finally:
+            # 被接管的旧消费者退出时不能清除新消费者的等待
+            if self._waiter is waiter:
+                self._waiter = None
+
+    async def get(self):
+        while not self._items:
+            await self.wait()
+        return self.get_nowait()
+
+
+@dataclass(slots=True)
 class McpSession:
     """MCP 客户端会话"""
     session_id: str
     prefix: str  # MCP Server 前缀
-    queue: asyncio.Queue = field(default_factory=asyncio.Queue)
+    queue: SessionQueue = field(default_factory=SessionQueue)
+    # 是否由本 worker 创建；从共享后端接管的副本为 False，只有创建者才能注销会话
+    owned: bool = True
     created_at: datetime = field(default_factory=datetime.now)
     last_activity: datetime = field(default_factory=datetime.now)
+    # 单调时钟下的最后活动时间，用于过期判断
+    last_activity_mono: float = field(default_factory=time.monotonic)
+    # 最近一次向共享后端同步活动时间的时刻（单调时钟）
+    last_synced_mono: float = field(default_factory=time.monotonic)
+    # 已发送事件的重放环形缓冲区：(序号, 预编码消息)，首次发送事件时分配
+    replay_buffer_size: int = 100
+    replay_buffer: Optional[Deque[Tuple[int, EncodedMessage]]] = None
+    last_event_seq: int = 0
+    # SSE 连接状态（断开后在宽限期内可恢复）
+    connected: bool = False
+    # 当前 SSE 流的编号，新的流接管时递增，旧流的消费者随之退出
+    stream_id: int = 0
+    disconnected_at: Optional[datetime] = None
+    disconnected_mono: Optional[float] = None
+    # 队列溢出统计
+    dropped_messages: int = 0
+    coalesced_messages: int = 0
+    # 队列中待发送的可合并通知（method -> 数量）
+    pending_notifications: Dict[str, int] = field(default_factory=dict, repr=False)
 
     def update_activity(self):
-        """更新最后活动时间"""
+        """更新最后活动时间（O(1)，过期时间轮惰性重新调度）"""
         self.last_activity = datetime.now()
+        self.last_activity_mono = time.monotonic()
+
+    def enqueue(self, message: EncodedMessage, overflow_policy: str = "coalesce") -> bool:
+        """
+        将消息放入待发送队列（非阻塞）
+
+        Args:
+            message: 预编码的消息（可被多个会话共享）
+            overflow_policy: 队列溢出策略（drop_oldest / coalesce / disconnect）
+
+        Returns:
+            是否成功入队；策略为 disconnect 且队列已满时返回 False
+        """
+        method = message.method
+        coalescable = method in COALESCABLE_METHODS
+
+        if overflow_policy == "coalesce" and coalescable and self.pending_notifications.get(method):
+            self.coalesced_messages += 1
+            return True
+
+        if self.queue.full():
+            if overflow_policy == "disconnect":
+                return False
+            self._drop_oldest()
+
+        self.queue.put_nowait(message)
+        if coalescable:
+            self.pending_notifications[method] = self.pending_notifications.get(method, 0) + 1
+        return True
+
+    async def next_message(self, stream_id: Optional[int] = None) -> Optional[EncodedMessage]:
+        """
+        等待下一条待发送消息
+
+        Args:
+            stream_id: 调用方 SSE 流的编号，该流被接管后返回 None
+
+        Returns:
+            消息；会话被服务端关闭或 SSE 流被接管时返回 None
+        """
+        while True:
+            if stream_id is not None and stream_id != self.stream_id:
+                return None
+            if not self.queue.empty():
+                break
+            await self.queue.wait()
+        message = self.queue.get_nowait()
+        self._untrack(message)
+        return message
+
+    def close(self):
+        """清空队列并放入结束标记，使 SSE 流结束"""
+        while not self.queue.empty():
+            self._untrack(self.queue.get_nowait())
+        self.queue.put_nowait(None)
+
+    def _drop_oldest(self):
+        """丢弃队列中最旧的一条消息"""
+        self._untrack(self.queue.get_nowait())
+        self.dropped_messages += 1
+
+    def _untrack(self, message: Optional[EncodedMessage]):
+        """消息出队后更新可合并通知计数"""
+        if message is None or message.method is None:
+            return
+        method = message.method
+        count = self.pending_notifications.get(method)
+        if count:
+            if count == 1:
+                del self.pending_notifications[method]
+            else:
+                self.pending_notifications[method] = count - 1
+
+    def record_event(self, message: EncodedMessage) -> str:
+        """
+        为即将发送的消息分配事件 ID 并写入重放缓冲区
+
+        Args:
+            message: 要发送的预编码消息
+
+        Returns:
+            事件 ID
+        """
+        self.last_event_seq += 1
+        if self.replay_buffer is None:
+            self.replay_buffer = deque(maxlen=self.replay_buffer_size)
+        self.replay_buffer.append((self.last_event_seq, message))
+        return format_event_id(self.session_id, self.last_event_seq)
+
+    def events_after(self, seq: int) -> List[Tuple[str, EncodedMessage]]:
+        """
+        获取指定序号之后仍在缓冲区中的事件（用于断线重放）
+
+        Args:
+            seq: 客户端最后收到的事件序号
+
+        Returns:
+            [(事件 ID, 预编码消息)] 列表
+        """
+        return [
+            (format_event_id(self.session_id, event_seq), message)
+            for event_seq, message in self.replay_buffer or ()
+            if event_seq > seq
+        ]
 
 
 class SessionManager:
     """会话管理器"""
 
-    def __init__(self):
+    def __init__(self, config: Optional[SessionConfig] = None):
+        self.config = config or SessionConfig()
         self._sessions: Dict[str, McpSession] = {}
         self._prefix_sessions: Dict[str, Set[str]] = {}  # prefix -> set of session_ids
-        self._lock = asyncio.Lock()
+        # 空闲 / 断线过期时间轮（键为 session_id）
+        self._expiry_wheel = TimingWheel(self.config.expiry_tick_seconds)
+        # 已移除会话的溢出统计（活跃会话的统计在会话对象上）
+        self._dropped_total = 0
+        self._coalesced_total = 0
+        self._overflow_disconnects = 0
+        # 共享后端（多 worker 时共享会话注册表并转发广播）
+        self._backend: SessionBackend = InProcessSessionBackend()
+        self._subscribers: Dict[str, List[Callable[[Dict[str, Any]], Awaitable[None]]]] = {}
+        self._adopted_sessions = 0
+        self._stream_takeovers = 0
+
+    def configure(self, config: SessionConfig):
+        """
+        更新会话配置
+
+        Args:
+            config: 会话配置
+        """
+        self.config = config
+        if config.expiry_tick_seconds != self._expiry_wheel.tick_seconds:
+            wheel = TimingWheel(config.expiry_tick_seconds)
+            for session in self._sessions.values():
+                wheel.schedule(session.session_id, self._deadline(session))
+            self._expiry_wheel = wheel
+
+    async def start(self, backend: SessionBackend):
+        """
+        启动共享后端
+
+        Args:
+            backend: 会话后端
+        """
+        self._backend = backend
+        await backend.start(self._on_backend_message)
+
+    async def stop(self):
+        """停止共享后端"""
+        await self._backend.stop()
+        self._backend = InProcessSessionBackend()
+
+    def subscribe(self, topic: str, handler: Callable[[Dict[str, Any]], Awaitable[None]]):
+        """
+        订阅其他 worker 发布的消息
+
+        Args:
+            topic: 消息主题
+            handler: 消息回调
+        """
+        self._subscribers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        """
+        向其他 worker 发布消息（本 worker 需由调用方自行处理）
+
+        Args:
+            topic: 消息主题
+            payload: 消息体
+        """
+        try:
+            await self._backend.publish(topic, payload)
+        except Exception as e:
+            print(f"Failed to publish {topic} to session backend: {e}")
+
+    async def _on_backend_message(self, topic: str, payload: Dict[str, Any]):
+        """处理其他 worker 发布的消息"""
+        if topic == BROADCAST_TOPIC:
+            await self._deliver_to_prefix(payload["prefix"], payload["message"])
+            return
+        if topic == STREAM_TAKEOVER_TOPIC:
+            # 客户端已在其他 worker 上重新连接：结束本 worker 上的旧流
+            session = self._sessions.get(payload["session_id"])
+            if session is not None and session.connected:
+                session.stream_id += 1
+                session.queue.wake()
+                self.mark_disconnected(session)
+            return
+        for handler in self._subscribers.get(topic, []):
+            await handler(payload)
+
+    def _deadline(self, session: McpSession) -> float:
+        """计算会话的过期时间（单调时钟）：空闲超时与断线宽限期取较早者"""
+        deadline = session.last_activity_mono + self.config.max_idle_seconds
+        if not session.connected and session.disconnected_mono is not None:
+            deadline = min(deadline, session.disconnected_mono + self.config.resume_grace_seconds)
+        return deadline
 
     async def create_session(self, prefix: str) -> McpSession:
         """
@@ -41,39 +397,156 @@ class SessionManager:
         Returns:
             新创建的会话
         """
-        async with self._lock:
-            session_id = str(uuid.uuid4())
-            session = McpSession(
-                session_id=session_id,
-                prefix=prefix
-            )
+        session = self._add_session(str(uuid.uuid4()), prefix)
+        await self._backend.register_session(session.session_id, prefix)
+        return session
 
-            self._sessions[session_id] = session
+    def _add_session(self, session_id: str, prefix: str, owned: bool = True) -> McpSession:
+        """在本地索引中加入会话"""
+        session = McpSession(
+            session_id=session_id,
+            prefix=prefix,
+            owned=owned,
+            queue=SessionQueue(maxsize=self.config.max_queue_size),
+            replay_buffer_size=self.config.replay_buffer_size
+        )
 
-            # 建立前缀到会话的映射
-            if prefix not in self._prefix_sessions:
-                self._prefix_sessions[prefix] = set()
-            self._prefix_sessions[prefix].add(session_id)
+        self._sessions[session_id] = session
 
-            return session
+        # 建立前缀到会话的映射
+        if prefix not in self._prefix_sessions:
+            self._prefix_sessions[prefix] = set()
+        self._prefix_sessions[prefix].add(session_id)
+
+        self._expiry_wheel.schedule(session_id, self._deadline(session))
+        return session
 
     async def get_session(self, session_id: str) -> Optional[McpSession]:
-        """获取会话"""
-        return self._sessions.get(session_id)
+        """
+        获取会话
+
+        本地不存在时查询共享后端：会话可能由其他 worker 创建（如 initialize 与后续请求
+        被分配到不同 worker），此时在本地建立该会话的副本。
+
+        Args:
+            session_id: 会话 ID
+
+        Returns:
+            会话，不存在时返回 None
+        """
+        session = self._sessions.get(session_id)
+        if session is not None:
+            await self.touch_session(session)
+            return session
+
+        prefix = await self._backend.lookup_session(session_id)
+        if prefix is None:
+            return None
+
+        # 并发查询期间可能已被其他请求建立
+        session = self._sessions.get(session_id) or self._add_session(session_id, prefix, owned=False)
+        self._adopted_sessions += 1
+        return session
+
+    async def touch_session(self, session: McpSession):
+        """
+        按间隔向共享后端同步活动时间，避免其他 worker 认为会话已过期
+
+        Args:
+            session: 会话（请求处理和 SSE 流发送消息 / 心跳时调用）
+        """
+        now = time.monotonic()
+        if now - session.last_synced_mono >= self.config.touch_interval:
+            session.last_synced_mono = now
+            await self._backend.touch_session(session.session_id)
 
     async def remove_session(self, session_id: str):
-        """移除会话"""
-        async with self._lock:
-            session = self._sessions.get(session_id)
-            if session:
-                # 从前缀映射中移除
-                if session.prefix in self._prefix_sessions:
-                    self._prefix_sessions[session.prefix].discard(session_id)
-                    if not self._prefix_sessions[session.prefix]:
-                        del self._prefix_sessions[session.prefix]
+        """移除会话（由本 worker 创建的会话同时从共享后端注销）"""
+        session = self._sessions.get(session_id)
+        self._discard_session(session_id)
+        if session is not None and session.owned:
+            await self._backend.unregister_session(session_id)
+
+    def _discard_session(self, session_id: str):
+        """
+        同步移除会话
 
-                # 移除会话
-                del self._sessions[session_id]
+        所有会话索引的修改都在单次事件循环调度内完成（无 await），
+        因此不需要全局锁，也不会在过期扫描中自我死锁。
+        """
+        session = self._sessions.pop(session_id, None)
+        if not session:
+            return
+
+        self._expiry_wheel.cancel(session_id)
+        self._dropped_total += session.dropped_messages
+        self._coalesced_total += session.coalesced_messages
+
+        # 从前缀映射中移除
+        prefix_sessions = self._prefix_sessions.get(session.prefix)
+        if prefix_sessions is not None:
+            prefix_sessions.discard(session_id)
+            if not prefix_sessions:
+                del self._prefix_sessions[session.prefix]
+
+    async def attach_stream(self, session: McpSession) -> int:
+        """
+        为会话接入新的 SSE 流
+
+        会话已有 SSE 流时（如客户端在 TCP 断开后携带 Last-Event-ID 重连，
+        旧的半开连接尚未被发现）由新的流接管，旧流的消费者被唤醒后退出；
+        并通知其他 worker 结束它们上面的旧流。
+
+        Args:
+            session: 会话
+
+        Returns:
+            新流的编号（传给 next_message / mark_disconnected）
+        """
+        stream_id = self.mark_connected(session)
+        await self.publish(STREAM_TAKEOVER_TOPIC, {"session_id": session.session_id})
+        return stream_id
+
+    def mark_connected(self, session: McpSession) -> int:
+        """
+        标记会话的 SSE 流已连接（取消断线过期计时），已有的流被接管
+
+        Args:
+            session: 会话
+
+        Returns:
+            新流的编号
+        """
+        session.stream_id += 1
+        if session.connected:
+            self._stream_takeovers += 1
+            session.queue.wake()
+        session.connected = True
+        session.disconnected_at = None
+        session.disconnected_mono = None
+        session.update_activity()
+        return session.stream_id
+
+    def mark_disconnected(self, session: McpSession, stream_id: Optional[int] = None):
+        """
+        标记会话的 SSE 流已断开
+
+        会话不会立即删除：在宽限期内客户端可携带 Last-Event-ID 重连，
+        重放缓冲区中的事件和队列中尚未发送的消息都不会丢失。
+
+        Args:
+            session: 会话
+            stream_id: 断开的流的编号；该流已被新流接管时不做任何处理
+        """
+        if stream_id is not None and stream_id != session.stream_id:
+            return
+        session.connected = False
+        session.disconnected_at = datetime.now()
+        session.disconnected_mono = time.monotonic()
+
+        # 宽限期可能早于空闲超时，提前调度
+        if session.session_id in self._sessions:
+            self._expiry_wheel.schedule(session.session_id, self._deadline(session))
 
     async def get_sessions_by_prefix(self, prefix: str) -> list[McpSession]:
         """
@@ -100,38 +573,89 @@ class SessionManager:
             prefix: MCP Server 前缀
             message: 要广播的消息
         """
+        await self._deliver_to_prefix(prefix, message)
+        # 转发给其他 worker 上的会话
+        await self.publish(BROADCAST_TOPIC, {"prefix": prefix, "message": message})
+
+    async def _deliver_to_prefix(self, prefix: str, message: dict):
+        """将消息放入本 worker 上指定前缀的所有会话队列"""
         sessions = await self.get_sessions_by_prefix(prefix)
+        if not sessions:
+            return
+
+        # 只序列化一次，所有会话共享同一份编码结果
+        message = encode_message(message)
         for session in sessions:
+            # 接管的副本没有 SSE 流时不缓存消息，由创建会话的 worker 负责
+            if not session.owned and not session.connected:
+                continue
             try:
-                await session.queue.put(message)
+                if not session.enqueue(message, self.config.overflow_policy):
+                    await self._disconnect_slow_session(session)
             except Exception as e:
                 print(f"Failed to send message to session {session.session_id}: {e}")
 
-    async def cleanup_stale_sessions(self, max_idle_seconds: int = 3600):
+    async def _disconnect_slow_session(self, session: McpSession):
+        """队列溢出且策略为 disconnect 时，断开并移除消费过慢的会话"""
+        session.dropped_messages += session.queue.qsize()
+        session.close()
+        self._overflow_disconnects += 1
+        await self.remove_session(session.session_id)
+        print(f"Disconnected slow session {session.session_id}: queue overflow")
+
+    async def expire_idle_sessions(self, now: Optional[float] = None) -> int:
         """
-        清理过期会话
+        推进过期时间轮，移除空闲超时或断线超过宽限期的会话
+
+        每次只处理到期桶中的会话：仍有活动的会话按新的截止时间重新调度，
+        其余会话直接移除，不扫描全部会话，也不持有全局锁。
+        本地索引在一次调度内同步清理完毕，之后由创建会话的 worker 从共享后端注销，
+        避免其他 worker 继续接管已过期的会话；接管的副本只在本地移除。
+        共享记录在本地最后活动之后仍被其他 worker 刷新过（如 SSE 流在其他 worker 上）时保留。
 
         Args:
-            max_idle_seconds: 最大空闲时间（秒）
+            now: 当前单调时钟时间，默认 time.monotonic()
+
+        Returns:
+            移除的会话数
         """
-        async with self._lock:
-            now = datetime.now()
-            stale_sessions = [
-                session_id
-                for session_id, session in self._sessions.items()
-                if (now - session.last_activity).total_seconds() > max_idle_seconds
-            ]
+        if now is None:
+            now = time.monotonic()
+
+        expired: List[Tuple[str, Optional[float]]] = []
+        for session_id in self._expiry_wheel.advance(now):
+            session = self._sessions.get(session_id)
+            if session is None:
+                continue
+
+            deadline = self._deadline(session)
+            if deadline > now:
+                self._expiry_wheel.schedule(session_id, deadline)
+                continue
+
+            self._discard_session(session_id)
+            expired.append((session_id, session.last_activity.timestamp() if session.owned else None))
 
-            for session_id in stale_sessions:
-                await self.remove_session(session_id)
+        for session_id, last_activity in expired:
+            if last_activity is not None:
+                await self._backend.unregister_session(session_id, inactive_since=last_activity)
 
-            if stale_sessions:
-                print(f"Cleaned up {len(stale_sessions)} stale sessions")
+        if expired:
+            print(f"Cleaned up {len(expired)} stale sessions")
+        return len(expired)
 
     def get_stats(self) -> dict:
         """获取会话统计信息"""
         return {
             "total_sessions": len(self._sessions),
+            "connected_sessions": sum(1 for s in self._sessions.values() if s.connected),
+            "queued_messages": sum(s.queue.qsize() for s in self._sessions.values()),
+            "dropped_messages": self._dropped_total + sum(s.dropped_messages for s in self._sessions.values()),
+            "coalesced_messages": self._coalesced_total + sum(s.coalesced_messages for s in self._sessions.values()),
+            "overflow_disconnects": self._overflow_disconnects,
+            "backend": type(self._backend).__name__,
+            "adopted_sessions": self._adopted_sessions,
+            "stream_takeovers": self._stream_takeovers,
             "sessions_by_prefix": {
                 prefix: len(session_ids)
                 for prefix, session_ids in self._prefix_sessions.items()
@@ -141,3 +665,19 @@ class SessionManager:
 
 # 全局会话管理器实例
 session_manager = SessionManager()
+
+
+async def notify_tools_changed(prefix: str):
+    """
+    通知工具列表已变更
+
+    Args:
+        prefix: MCP Server 前缀
+    """
+    notification = {
+        "jsonrpc": "2.0",
+        "method": "notifications/tools/list_changed"
+    }
+
+    await session_manager.broadcast_to_prefix(prefix, notification)
+    print(f"Notified tools changed for prefix: {prefix}")
@@ -0,0 +1,256 @@
+"""
+MCP 会话共享后端
+多 worker 部署时共享会话注册信息，并在 worker 之间转发广播消息
+"""
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.config import SessionConfig
+
+# 收到其他 worker 发布的消息时的回调：(主题, 消息体)
+MessageHandler = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+
+class SessionBackend:
+    """
+    会话后端接口
+
+    - 会话注册表：记录 session_id -> prefix，任意 worker 都能识别其他 worker 创建的会话
+    - 发布订阅：publish() 的消息投递给其他 worker（本 worker 由调用方直接处理）
+    """
+
+    async def start(self, on_message: MessageHandler):
+        """
+        启动后端
+
+        Args:
+            on_message: 收到其他 worker 消息时的回调
+        """
+
+    async def stop(self):
+        """停止后端"""
+
+    async def register_session(self, session_id: str, prefix: str):
+        """登记新会话"""
+
+    async def lookup_session(self, session_id: str) -> Optional[str]:
+        """
+        查找其他 worker 创建的会话
+
+        Returns:
+            会话所属前缀，不存在时返回 None
+        """
+        return None
+
+    async def touch_session(self, session_id: str):
+        """刷新会话的最近活动时间"""
+
+    async def unregister_session(self, session_id: str, inactive_since: Optional[float] = None):
+        """
+        注销会话（只由创建会话的 worker 调用）
+
+        会话被关闭或在本 worker 上空闲过期时调用；
+        未注销的记录（如 worker 异常退出）按最近活动时间自行过期。
+
+        Args:
+            session_id: 会话 ID
+            inactive_since: 本 worker 上的最后活动时间（Unix 时间戳），
+                给出时只在共享记录此后未被刷新的情况下注销
+        """
+
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        """
+        向其他 worker 发布消息
+
+        Args:
+            topic: 消息主题
+            payload: 消息体（需可 JSON 序列化）
+        """
+
+
+class InProcessSessionBackend(SessionBackend):
+    """
+    进程内后端（默认）
+
+    单 worker 时会话管理器自身就是完整的会话注册表，
+    也不存在其他 worker，因此所有操作均为空实现。
+    """
+
+
+class SqliteSessionBackend(SessionBackend):
+    """
+    SQLite 文件后端
+
+    同一主机上的多个 worker 共享一个 SQLite 文件（WAL 模式）：
+    - mcp_sessions 表保存会话注册信息
+    - mcp_events 表作为消息日志，每个 worker 轮询读取其他 worker 追加的消息
+    数据库操作在线程中执行，不阻塞事件循环。
+    """
+
+    # 消息日志保留时间（秒），超过后由轮询任务清理
+    EVENT_RETENTION_SECONDS = 60
+
+    def __init__(self, path: str, poll_interval: float = 0.2, session_ttl: float = 3600):
+        """
+        初始化 SQLite 后端
+
+        Args:
+            path: 数据库文件路径
+            poll_interval: 消息轮询间隔（秒）
+            session_ttl: 会话在共享注册表中的有效期（秒，自最近活动起算）
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.session_ttl = session_ttl
+        self.worker_id = uuid.uuid4().hex
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+        self._last_event_id = 0
+        self._poll_task: Optional[asyncio.Task] = None
+        self._on_message: Optional[MessageHandler] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS mcp_sessions ("
+            " session_id TEXT PRIMARY KEY,"
+            " prefix TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS mcp_events ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " origin TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        return conn
+
+    async def _execute(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        """在线程中执行 SQL（同一连接上的操作串行化）"""
+        async with self._lock:
+            return await asyncio.to_thread(lambda: self._conn.execute(sql, params).fetchall())
+
+    async def start(self, on_message: MessageHandler):
+        self._on_message = on_message
+        self._conn = await asyncio.to_thread(self._connect)
+
+        # 只接收启动之后发布的消息
+        rows = await self._execute("SELECT COALESCE(MAX(id), 0) FROM mcp_events")
+        self._last_event_id = rows[0][0]
+        self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        if self._poll_task:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._conn:
+            async with self._lock:
+                await asyncio.to_thread(self._conn.close)
+            self._conn = None
+
+    async def register_session(self, session_id: str, prefix: str):
+        now = time.time()
+        await self._execute(
+            "INSERT OR REPLACE INTO mcp_sessions (session_id, prefix, created_at, last_seen) VALUES (?, ?, ?, ?)",
+            (session_id, prefix, now, now)
+        )
+
+    async def lookup_session(self, session_id: str) -> Optional[str]:
+        rows = await self._execute(
+            "SELECT prefix FROM mcp_sessions WHERE session_id = ? AND last_seen >= ?",
+            (session_id, time.time() - self.session_ttl)
+        )
+        return rows[0][0] if rows else None
+
+    async def touch_session(self, session_id: str):
+        await self._execute(
+            "UPDATE mcp_sessions SET last_seen = ? WHERE session_id = ?",
+            (time.time(), session_id)
+        )
+
+    async def unregister_session(self, session_id: str, inactive_since: Optional[float] = None):
+        if inactive_since is None:
+            await self._execute("DELETE FROM mcp_sessions WHERE session_id = ?", (session_id,))
+            return
+        # 容许 1 秒误差：创建和刷新记录的时刻可能略晚于本地活动时间
+        await self._execute(
+            "DELETE FROM mcp_sessions WHERE session_id = ? AND last_seen < ?",
+            (session_id, inactive_since + 1.0)
+        )
+
+    async def publish(self, topic: str, payload: Dict[str, Any]):
+        await self._execute(
+            "INSERT INTO mcp_events (origin, topic, payload, created_at) VALUES (?, ?, ?, ?)",
+            (self.worker_id, topic, json.dumps(payload), time.time())
+        )
+
+    async def _poll_loop(self):
+        """轮询消息日志，将其他 worker 发布的消息交给回调处理"""
+        last_cleanup = time.monotonic()
+        while True:
+            try:
+                await asyncio.sleep(self.poll_interval)
+                rows = await self._execute(
+                    "SELECT id, origin, topic, payload FROM mcp_events WHERE id > ? ORDER BY id",
+                    (self._last_event_id,)
+                )
+                for event_id, origin, topic, payload in rows:
+                    self._last_event_id = event_id
+                    if origin == self.worker_id:
+                        continue
+                    await self._on_message(topic, json.loads(payload))
+
+                # 定期清理过期的消息日志和会话
+                if time.monotonic() - last_cleanup > self.EVENT_RETENTION_SECONDS:
+                    last_cleanup = time.monotonic()
+                    now = time.time()
+                    await self._execute(
+                        "DELETE FROM mcp_events WHERE created_at < ?",
+                        (now - self.EVENT_RETENTION_SECONDS,)
+                    )
+                    await self._execute(
+                        "DELETE FROM mcp_sessions WHERE last_seen < ?",
+                        (now - self.session_ttl,)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error polling session backend events: {e}")
+
+
+def create_session_backend(config: SessionConfig) -> SessionBackend:
+    """
+    根据配置创建会话后端
+
+    Args:
+        config: 会话配置
+
+    Returns:
+        会话后端实例
+    """
+    if config.backend == "sqlite":
+        path = Path(config.sqlite_path)
+        if not path.is_absolute():
+            # 相对路径基于 backend 目录
+            path = Path(__file__).parent.parent / path
+        return SqliteSessionBackend(
+            str(path),
+            poll_interval=config.poll_interval,
+            session_ttl=config.max_idle_seconds
+        )
+    return InProcessSessionBackend()
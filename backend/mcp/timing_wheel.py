@@ -0,0 +1,108 @@
+"""
+时间轮
+按到期时间分桶管理大量定时器，调度、取消均为 O(1)，推进时只处理到期的桶
+"""
+import math
+from typing import Dict, Hashable, List, Set
+
+
+class TimingWheel:
+    """
+    分桶时间轮
+
+    到期时间按 tick 精度映射到桶（桶号为绝对 tick 序号，只保存非空桶），
+    advance() 依次弹出已到期的桶并返回其中的键。
+    时间轮只负责"到点提醒"，调用方应在到期时再次检查真实截止时间，
+    未到期的键重新调度即可（惰性调度，活动更新无需操作时间轮）。
+    """
+
+    def __init__(self, tick_seconds: float = 1.0):
+        """
+        初始化时间轮
+
+        Args:
+            tick_seconds: 时间精度（秒）
+        """
+        self.tick_seconds = tick_seconds
+        self._buckets: Dict[int, Set[Hashable]] = {}
+        self._bucket_of: Dict[Hashable, int] = {}
+        self._current_tick: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._bucket_of)
+
+    def schedule(self, key: Hashable, deadline: float):
+        """
+        调度（或重新调度）一个键
+
+        Args:
+            key: 定时器键
+            deadline: 到期时间（与 advance 使用同一时钟，如 time.monotonic()）
+        """
+        tick = math.ceil(deadline / self.tick_seconds)
+        if self._current_tick is not None and tick <= self._current_tick:
+            # 已过期的键放入下一个桶，在下一次推进时处理
+            tick = self._current_tick + 1
+
+        old_tick = self._bucket_of.get(key)
+        if old_tick == tick:
+            return
+        if old_tick is not None:
+            self._discard_from_bucket(key, old_tick)
+
+        self._buckets.setdefault(tick, set()).add(key)
+        self._bucket_of[key] = tick
+
+    def cancel(self, key: Hashable):
+        """
+        取消一个键
+
+        Args:
+            key: 定时器键
+        """
+        tick = self._bucket_of.pop(key, None)
+        if tick is not None:
+            bucket = self._buckets.get(tick)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[tick]
+
+    def advance(self, now: float) -> List[Hashable]:
+        """
+        推进时间轮到当前时间
+
+        Args:
+            now: 当前时间
+
+        Returns:
+            到期的键列表（已从时间轮中移除）
+        """
+        now_tick = math.floor(now / self.tick_seconds)
+        if self._current_tick is None:
+            self._current_tick = min(self._buckets, default=now_tick) - 1
+
+        expired: List[Hashable] = []
+        # 桶数远少于经过的 tick 数时直接按桶号查找，避免长时间暂停后逐 tick 空转
+        if now_tick - self._current_tick > len(self._buckets):
+            due = sorted(tick for tick in self._buckets if tick <= now_tick)
+        else:
+            due = range(self._current_tick + 1, now_tick + 1)
+
+        for tick in due:
+            bucket = self._buckets.pop(tick, None)
+            if not bucket:
+                continue
+            for key in bucket:
+                del self._bucket_of[key]
+            expired.extend(bucket)
+
+        self._current_tick = max(self._current_tick, now_tick)
+        return expired
+
+    def _discard_from_bucket(self, key: Hashable, tick: int):
+        bucket = self._buckets.get(tick)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[tick]
@@ -2,110 +2,255 @@
 """
 MCP Server Stdio Launcher
 用于 Cursor、Claude Desktop 等工具的 stdio 传输方式
+
+用法:
+    mcp_stdio_server.py <prefix>                         从配置的数据库加载
+    mcp_stdio_server.py <prefix> --snapshot demo.json    从导出的快照加载（无需数据库）
+    mcp_stdio_server.py <prefix> --export demo.json      从数据库导出快照后退出
 """
-import sys
-import json
+import argparse
 import asyncio
-from typing import Optional
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
 
-# 添加项目路径以便导入
-sys.path.insert(0, '/Users/zhaojl/Development/Projects/Synapse/backend')
+# 添加 backend 目录以便从任意工作目录启动
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-from mcp.protocol import JsonRpcRequest
+from core.config import load_config
+from core.database import DatabaseManager
+from core.tracing import tracer
+from mcp.protocol import JsonRpcRequest, McpError, create_error_response
+from mcp.registry import build_handler, load_server_snapshot
 from mcp.server import McpServerHandler
+from services.upstream_pool import upstream_pool
+
+# 单行 JSON-RPC 消息的最大长度
+MAX_LINE_BYTES = 16 * 1024 * 1024
+
+
+class StdioTransport:
+    """
+    stdio 传输
+
+    stdout 专用于 JSON-RPC 消息：启动时保存原始 stdout，
+    并将 sys.stdout 重定向到 stderr，避免日志输出破坏协议流。
+    """
+
+    def __init__(self):
+        self._out = sys.stdout.buffer
+        sys.stdout = sys.stderr
+
+    def send(self, message: Any):
+        """
+        写出一条 JSON-RPC 消息（单次同步写入，并发任务之间不会交错）
+
+        Args:
+            message: JSON-RPC 消息或消息数组
+        """
+        self._out.write(json.dumps(message).encode() + b"\n")
+        self._out.flush()
+
+    @staticmethod
+    async def open_reader() -> asyncio.StreamReader:
+        """
+        以异步方式打开 stdin
+
+        Returns:
+            StreamReader
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=MAX_LINE_BYTES)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        except (NotImplementedError, ValueError):
+            # Windows 或 stdin 重定向自普通文件时不支持管道传输，改由线程读取
+            async def feed():
+                while True:
+                    line = await asyncio.to_thread(sys.stdin.buffer.readline)
+                    if not line:
+                        reader.feed_eof()
+                        return
+                    reader.feed_data(line)
+
+            asyncio.create_task(feed())
+        return reader
 
 
-async def main(prefix: str):
+async def load_snapshot(prefix: str, snapshot_path: Optional[str]) -> Optional[Dict[str, Any]]:
     """
-    主函数：从 stdin 读取 JSON-RPC 请求，输出到 stdout
+    加载 MCP Server 快照
 
     Args:
         prefix: MCP Server 前缀
+        snapshot_path: 快照文件路径，为 None 时从配置的数据库加载
+
+    Returns:
+        快照，前缀不存在时返回 None
     """
-    # 导入数据（这里简化处理，实际应该连接数据库或 API）
-    from main import mcp_servers_db, combinations_db
-
-    # 查找对应的 MCP Server
-    mcp_server = None
-    for server in mcp_servers_db.values():
-        if server.prefix == prefix:
-            mcp_server = server
-            break
+    if snapshot_path:
+        snapshot = json.loads(Path(snapshot_path).read_text(encoding="utf-8"))
+        if snapshot.get("server", {}).get("prefix") != prefix:
+            return None
+        return snapshot
 
-    if not mcp_server:
-        error_msg = {
-            "jsonrpc": "2.0",
-            "error": {
-                "code": -32001,
-                "message": f"MCP Server with prefix '{prefix}' not found"
-            },
-            "id": None
-        }
-        print(json.dumps(error_msg), flush=True)
-        sys.exit(1)
+    manager = DatabaseManager(load_config())
+    manager.create_engine()
+    try:
+        async with manager.get_session() as db:
+            return await load_server_snapshot(prefix, db)
+    finally:
+        await manager.close()
 
-    # 创建 handler
-    server_dict = mcp_server.model_dump()
-    combinations_list = [comb.model_dump() for comb in combinations_db.values()]
 
-    handler = McpServerHandler(
-        server_config=server_dict,
-        combinations=combinations_list
-    )
+async def handle_message(handler: McpServerHandler, message: Any, transport: StdioTransport):
+    """
+    处理一条 stdin 消息（单个请求或批量请求），完成后立即写出响应
 
-    # 输出服务器就绪信息到 stderr（不影响 JSON-RPC 通信）
-    print(f"MCP Server '{prefix}' ready on stdio", file=sys.stderr, flush=True)
+    Args:
+        handler: MCP Server Handler
+        message: 解析后的 JSON 消息
+        transport: stdio 传输
+    """
+    async def notify(notification: Dict[str, Any]):
+        transport.send(notification)
 
-    # 主循环：读取请求并处理
-    while True:
+    async def run_item(item: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(item, dict):
+            return create_error_response(
+                code=McpError.INVALID_REQUEST,
+                message="Invalid JSON-RPC request",
+                id=None
+            )
         try:
-            # 从 stdin 读取一行
-            line = sys.stdin.readline()
-            if not line:
-                break
-
-            line = line.strip()
-            if not line:
-                continue
-
-            # 解析 JSON-RPC 请求
-            try:
-                request_data = json.loads(line)
-                rpc_request = JsonRpcRequest(**request_data)
-            except Exception as e:
-                error_response = {
-                    "jsonrpc": "2.0",
-                    "error": {
-                        "code": -32700,
-                        "message": f"Parse error: {str(e)}"
-                    },
-                    "id": None
-                }
-                print(json.dumps(error_response), flush=True)
-                continue
-
-            # 处理请求
-            response = await handler.handle_request(
-                method=rpc_request.method,
-                params=rpc_request.params,
-                request_id=rpc_request.id
+            rpc_request = JsonRpcRequest(**item)
+        except Exception as e:
+            return create_error_response(
+                code=McpError.INVALID_REQUEST,
+                message=f"Invalid JSON-RPC request: {str(e)}",
+                id=item.get("id")
             )
 
-            # 输出响应
-            print(json.dumps(response), flush=True)
+        result = await handler.handle_request(
+            method=rpc_request.method,
+            params=rpc_request.params,
+            request_id=rpc_request.id,
+            notify=notify
+        )
+        # 通知没有响应
+        return result if "id" in item else None
 
-        except KeyboardInterrupt:
-            break
+    if isinstance(message, list):
+        results = await asyncio.gather(*(run_item(item) for item in message))
+        responses = [result for result in results if result is not None]
+        if responses:
+            transport.send(responses)
+    else:
+        response = await run_item(message)
+        if response is not None:
+            transport.send(response)
+
+
+async def serve(handler: McpServerHandler, transport: StdioTransport):
+    """
+    主循环：异步读取 stdin，每个请求作为独立任务并发处理
+
+    Args:
+        handler: MCP Server Handler
+        transport: stdio 传输
+    """
+    reader = await transport.open_reader()
+    tasks: Set[asyncio.Task] = set()
+
+    async def run(message: Any):
+        try:
+            await handle_message(handler, message, transport)
         except Exception as e:
-            print(f"Error: {e}", file=sys.stderr, flush=True)
+            print(f"Error handling request: {e}", file=sys.stderr, flush=True)
+
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError as e:
+            # 单行超过长度限制
+            print(f"Error reading stdin: {e}", file=sys.stderr, flush=True)
+            break
+        if not line:
             break
 
+        line = line.strip()
+        if not line:
+            continue
 
-if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: mcp_stdio_server.py <prefix>", file=sys.stderr)
-        print("Example: mcp_stdio_server.py synapse", file=sys.stderr)
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as e:
+            transport.send(create_error_response(
+                code=McpError.PARSE_ERROR,
+                message=f"Parse error: {str(e)}",
+                id=None
+            ))
+            continue
+
+        task = asyncio.create_task(run(message))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # stdin 关闭后等待进行中的请求完成
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def main(prefix: str, snapshot_path: Optional[str] = None, export_path: Optional[str] = None):
+    """
+    主函数
+
+    Args:
+        prefix: MCP Server 前缀
+        snapshot_path: 快照文件路径（为 None 时从数据库加载）
+        export_path: 导出快照的路径（导出后退出）
+    """
+    transport = StdioTransport()
+
+    snapshot = await load_snapshot(prefix, snapshot_path)
+    if snapshot is None:
+        print(f"MCP Server with prefix '{prefix}' not found", file=sys.stderr, flush=True)
+        sys.exit(1)
+
+    if export_path:
+        Path(export_path).write_text(json.dumps(snapshot, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Snapshot of '{prefix}' exported to {export_path}", file=sys.stderr, flush=True)
+        return
+
+    if snapshot["server"].get("status") != "active":
+        print(f"MCP Server '{prefix}' is not active", file=sys.stderr, flush=True)
         sys.exit(1)
 
-    prefix = sys.argv[1]
-    asyncio.run(main(prefix))
+    app_config = load_config()
+    upstream_pool.configure(app_config.upstream)
+    tracer.configure(app_config.tracing)
+    handler = build_handler(snapshot)
+
+    # 输出服务器就绪信息到 stderr（不影响 JSON-RPC 通信）
+    print(f"MCP Server '{prefix}' ready on stdio ({len(handler.get_tools())} tools)", file=sys.stderr, flush=True)
+
+    try:
+        await serve(handler, transport)
+    finally:
+        await upstream_pool.aclose()
+        tracer.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synapse MCP Server (stdio)")
+    parser.add_argument("prefix", help="MCP Server 前缀，例如 synapse")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--snapshot", help="从导出的快照文件加载，无需连接数据库")
+    source.add_argument("--export", help="从数据库导出快照到指定文件后退出")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.prefix, snapshot_path=args.snapshot, export_path=args.export))
+    except KeyboardInterrupt:
+        pass
@@ -15,6 +15,7 @@ class CombinationEndpoint(BaseModel):
     operationId: str | None = Field(default="", description="操作 ID")
     parameters: List[dict] | None = Field(default_factory=list, description="OpenAPI 参数定义")
     requestBody: dict | None = Field(None, description="OpenAPI 请求体定义")
+    schemaDefs: dict | None = Field(None, description="参数和请求体中 $ref 引用的共享 schema（schema_mode=defs 时提取）")
 
 
 class CombinationBase(BaseModel):
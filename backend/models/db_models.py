@@ -1,10 +1,10 @@
 """
 SQLAlchemy 数据库表模型
-定义了 Combination、McpServer、Service 和 User 的数据库结构
+定义了 Combination、McpServer、Service、ServiceHealth、SchedulerLease、User 和 ToolCallLog 的数据库结构
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, DateTime, JSON, Index, Boolean
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, JSON, Index, Boolean
 from sqlalchemy.orm import declarative_base
 
 # 创建基类
@@ -96,6 +96,41 @@ class ServiceDB(Base):
         return f"<ServiceDB(id={self.id}, name='{self.name}', type='{self.type}', status='{self.status}')>"
 
 
+class ServiceHealthDB(Base):
+    """服务健康检查状态数据库模型（每个服务一行，由健康检查调度器维护）"""
+    __tablename__ = "service_health"
+
+    # 主键：服务 ID
+    service_id = Column(Integer, primary_key=True, autoincrement=False, comment="服务 ID")
+
+    # 最近一次检查
+    last_checked_at = Column(DateTime, nullable=True, comment="最近检查时间")
+    last_success_at = Column(DateTime, nullable=True, comment="最近一次检查成功的时间")
+    latency_ms = Column(Float, nullable=True, comment="最近一次获取文档的耗时（毫秒）")
+    consecutive_failures = Column(Integer, nullable=False, default=0, comment="连续失败次数")
+    last_error = Column(Text, nullable=True, comment="最近一次失败的错误信息")
+
+    # 文档版本
+    spec_hash = Column(String(64), nullable=True, comment="文档内容 SHA-256 摘要")
+    spec_changed_at = Column(DateTime, nullable=True, comment="文档内容最近一次变化的时间")
+
+    def __repr__(self):
+        return f"<ServiceHealthDB(service_id={self.service_id}, failures={self.consecutive_failures})>"
+
+
+class SchedulerLeaseDB(Base):
+    """后台任务租约数据库模型（多 worker 部署时只有持有租约的 worker 运行该任务）"""
+    __tablename__ = "scheduler_leases"
+
+    # 主键：任务名称
+    name = Column(String(100), primary_key=True, comment="任务名称")
+    owner = Column(String(64), nullable=False, comment="持有租约的 worker 标识")
+    expires_at = Column(DateTime, nullable=False, comment="租约到期时间")
+
+    def __repr__(self):
+        return f"<SchedulerLeaseDB(name='{self.name}', owner='{self.owner}')>"
+
+
 class UserDB(Base):
     """用户数据库模型"""
     __tablename__ = "users"
@@ -125,3 +160,32 @@ class UserDB(Base):
 
     def __repr__(self):
         return f"<UserDB(id={self.id}, username='{self.username}', role='{self.role}', is_active={self.is_active})>"
+
+
+class ToolCallLogDB(Base):
+    """工具调用审计日志数据库模型"""
+    __tablename__ = "tool_call_logs"
+
+    # 主键
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+
+    # 调用信息
+    prefix = Column(String(50), nullable=False, index=True, comment="MCP 前缀")
+    tool_name = Column(String(255), nullable=False, index=True, comment="工具名称")
+    arguments_hash = Column(String(64), nullable=False, comment="参数 SHA-256 摘要（不保存原始参数）")
+    status = Column(String(20), nullable=False, index=True, comment="结果：success/error")
+    error = Column(Text, nullable=True, comment="错误信息")
+    latency_ms = Column(Float, nullable=False, comment="调用耗时（毫秒）")
+    response_bytes = Column(Integer, nullable=False, default=0, comment="上游响应大小（字节）")
+
+    # 时间戳
+    created_at = Column(DateTime, default=datetime.now, nullable=False, index=True, comment="调用时间")
+
+    # 复合索引
+    __table_args__ = (
+        Index('idx_tool_call_prefix_created', 'prefix', 'created_at'),
+        Index('idx_tool_call_tool_created', 'tool_name', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<ToolCallLogDB(id={self.id}, prefix='{self.prefix}', tool='{self.tool_name}', status='{self.status}')>"
@@ -45,3 +45,29 @@ class Service(ServiceBase):
             createdAt=db_obj.created_at,
             updatedAt=db_obj.updated_at,
         )
+
+
+class ServiceHealth(BaseModel):
+    """服务健康状态"""
+    serviceId: int
+    lastCheckedAt: datetime | None = None
+    lastSuccessAt: datetime | None = None
+    latencyMs: float | None = None
+    consecutiveFailures: int = 0
+    lastError: str | None = None
+    specHash: str | None = None
+    specChangedAt: datetime | None = None
+
+    @classmethod
+    def from_orm(cls, db_obj):
+        """从数据库对象转换为 Pydantic 模型"""
+        return cls(
+            serviceId=db_obj.service_id,
+            lastCheckedAt=db_obj.last_checked_at,
+            lastSuccessAt=db_obj.last_success_at,
+            latencyMs=db_obj.latency_ms,
+            consecutiveFailures=db_obj.consecutive_failures or 0,
+            lastError=db_obj.last_error,
+            specHash=db_obj.spec_hash,
+            specChangedAt=db_obj.spec_changed_at,
+        )
@@ -0,0 +1,41 @@
+# backend/models/tool_call.py
+
+from datetime import datetime
+from typing import List, Literal
+from pydantic import BaseModel, Field
+
+
+class ToolCallLog(BaseModel):
+    """工具调用审计记录"""
+    id: int
+    prefix: str = Field(..., description="MCP 前缀")
+    toolName: str = Field(..., description="工具名称")
+    argumentsHash: str = Field(..., description="参数 SHA-256 摘要")
+    status: Literal["success", "error"] = Field(..., description="调用结果")
+    error: str | None = Field(None, description="错误信息")
+    latencyMs: float = Field(..., description="调用耗时（毫秒）")
+    responseBytes: int = Field(..., description="上游响应大小（字节）")
+    createdAt: datetime = Field(..., description="调用时间")
+
+    model_config = {"from_attributes": True}
+
+    @classmethod
+    def from_orm(cls, db_obj):
+        """从数据库对象转换为 Pydantic 模型"""
+        return cls(
+            id=db_obj.id,
+            prefix=db_obj.prefix,
+            toolName=db_obj.tool_name,
+            argumentsHash=db_obj.arguments_hash,
+            status=db_obj.status,
+            error=db_obj.error,
+            latencyMs=db_obj.latency_ms,
+            responseBytes=db_obj.response_bytes,
+            createdAt=db_obj.created_at,
+        )
+
+
+class ToolCallLogListResponse(BaseModel):
+    """工具调用记录列表响应"""
+    calls: List[ToolCallLog]
+    total: int
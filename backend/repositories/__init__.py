@@ -5,8 +5,10 @@ Repositories 数据访问层
 
 from .combination_repository import CombinationRepository
 from .mcp_server_repository import McpServerRepository
+from .tool_call_log_repository import ToolCallLogRepository
 
 __all__ = [
     "CombinationRepository",
     "McpServerRepository",
+    "ToolCallLogRepository",
 ]
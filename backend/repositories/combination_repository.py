@@ -51,6 +51,24 @@ class CombinationRepository:
         )
         return result.scalar_one_or_none()
 
+    async def get_by_ids(self, combination_ids: List[int]) -> List[CombinationDB]:
+        """
+        根据 ID 列表批量获取组合
+
+        Args:
+            combination_ids: 组合 ID 列表
+
+        Returns:
+            List[CombinationDB]: 组合列表（不存在的 ID 会被忽略）
+        """
+        if not combination_ids:
+            return []
+
+        result = await self.session.execute(
+            select(CombinationDB).where(CombinationDB.id.in_(combination_ids))
+        )
+        return list(result.scalars().all())
+
     async def create(self, name: str, description: str, endpoints: list) -> CombinationDB:
         """
         创建组合
@@ -0,0 +1,54 @@
+# backend/repositories/scheduler_lease_repository.py
+
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, or_, update
+from models.db_models import SchedulerLeaseDB
+
+
+class SchedulerLeaseRepository:
+    """后台任务租约数据仓库"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def try_acquire(self, name: str, owner: str, ttl_seconds: float) -> bool:
+        """
+        获取或续期租约：租约不存在、已过期或已由 owner 持有时成功
+
+        并发插入同名租约时由主键冲突（IntegrityError）保证只有一个 worker 成功，
+        调用方需捕获该异常并视为未获取
+
+        Args:
+            name: 任务名称
+            owner: worker 标识
+            ttl_seconds: 租约有效期（秒）
+
+        Returns:
+            是否持有租约
+        """
+        now = datetime.now()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+        result = await self.session.execute(
+            update(SchedulerLeaseDB)
+            .where(
+                SchedulerLeaseDB.name == name,
+                or_(SchedulerLeaseDB.owner == owner, SchedulerLeaseDB.expires_at < now)
+            )
+            .values(owner=owner, expires_at=expires_at)
+        )
+        if result.rowcount:
+            return True
+        if await self.session.get(SchedulerLeaseDB, name) is not None:
+            return False
+        self.session.add(SchedulerLeaseDB(name=name, owner=owner, expires_at=expires_at))
+        await self.session.flush()
+        return True
+
+    async def release(self, name: str, owner: str) -> bool:
+        """释放 owner 持有的租约"""
+        result = await self.session.execute(
+            delete(SchedulerLeaseDB).where(SchedulerLeaseDB.name == name, SchedulerLeaseDB.owner == owner)
+        )
+        await self.session.flush()
+        return bool(result.rowcount)
@@ -0,0 +1,47 @@
+# backend/repositories/service_health_repository.py
+
+from typing import Iterable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete, select
+from models.db_models import ServiceHealthDB
+
+
+class ServiceHealthRepository:
+    """服务健康状态数据仓库"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def get_all(self) -> List[ServiceHealthDB]:
+        """获取所有服务的健康状态"""
+        result = await self.session.execute(select(ServiceHealthDB))
+        return list(result.scalars().all())
+
+    async def get(self, service_id: int) -> Optional[ServiceHealthDB]:
+        """根据服务 ID 获取健康状态"""
+        return await self.session.get(ServiceHealthDB, service_id)
+
+    async def get_or_create(self, service_id: int) -> ServiceHealthDB:
+        """获取健康状态，不存在时创建"""
+        health = await self.get(service_id)
+        if health is None:
+            health = ServiceHealthDB(service_id=service_id, consecutive_failures=0)
+            self.session.add(health)
+            await self.session.flush()
+        return health
+
+    async def delete(self, service_id: int) -> bool:
+        """删除服务的健康状态"""
+        result = await self.session.execute(
+            delete(ServiceHealthDB).where(ServiceHealthDB.service_id == service_id)
+        )
+        await self.session.flush()
+        return bool(result.rowcount)
+
+    async def delete_except(self, service_ids: Iterable[int]) -> int:
+        """删除已不存在的服务的健康状态"""
+        result = await self.session.execute(
+            delete(ServiceHealthDB).where(ServiceHealthDB.service_id.not_in(list(service_ids)))
+        )
+        await self.session.flush()
+        return result.rowcount or 0
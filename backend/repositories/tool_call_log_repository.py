@@ -0,0 +1,94 @@
+# backend/repositories/tool_call_log_repository.py
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, insert, select
+from models.db_models import ToolCallLogDB
+
+
+class ToolCallLogRepository:
+    """工具调用审计日志数据仓库"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def add_batch(self, records: List[Dict[str, Any]]) -> int:
+        """
+        批量写入调用记录（单条 INSERT 语句，executemany）
+
+        Args:
+            records: 调用记录字典列表
+
+        Returns:
+            写入的记录数
+        """
+        if not records:
+            return 0
+        await self.session.execute(insert(ToolCallLogDB), records)
+        return len(records)
+
+    async def get_recent(
+        self,
+        limit: int = 100,
+        prefix: Optional[str] = None,
+        tool_name: Optional[str] = None,
+        status: Optional[str] = None
+    ) -> List[ToolCallLogDB]:
+        """获取最近的调用记录（按时间倒序）"""
+        query = select(ToolCallLogDB)
+        if prefix:
+            query = query.where(ToolCallLogDB.prefix == prefix)
+        if tool_name:
+            query = query.where(ToolCallLogDB.tool_name == tool_name)
+        if status:
+            query = query.where(ToolCallLogDB.status == status)
+
+        result = await self.session.execute(
+            query.order_by(ToolCallLogDB.created_at.desc(), ToolCallLogDB.id.desc()).limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def get_error_rates(self, since: datetime, prefix: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        按前缀和工具统计调用次数、错误率和平均耗时
+
+        Args:
+            since: 统计起始时间
+            prefix: 只统计指定前缀
+
+        Returns:
+            统计结果列表（按调用次数倒序）
+        """
+        errors = func.sum(case((ToolCallLogDB.status == "error", 1), else_=0))
+        query = (
+            select(
+                ToolCallLogDB.prefix,
+                ToolCallLogDB.tool_name,
+                func.count().label("calls"),
+                errors.label("errors"),
+                func.avg(ToolCallLogDB.latency_ms).label("avg_latency_ms"),
+                func.max(ToolCallLogDB.latency_ms).label("max_latency_ms"),
+                func.sum(ToolCallLogDB.response_bytes).label("response_bytes"),
+            )
+            .where(ToolCallLogDB.created_at >= since)
+            .group_by(ToolCallLogDB.prefix, ToolCallLogDB.tool_name)
+            .order_by(func.count().desc())
+        )
+        if prefix:
+            query = query.where(ToolCallLogDB.prefix == prefix)
+
+        result = await self.session.execute(query)
+        return [
+            {
+                "prefix": row.prefix,
+                "tool": row.tool_name,
+                "calls": row.calls,
+                "errors": int(row.errors or 0),
+                "error_rate": round((row.errors or 0) / row.calls, 4) if row.calls else 0.0,
+                "avg_latency_ms": round(row.avg_latency_ms or 0, 2),
+                "max_latency_ms": round(row.max_latency_ms or 0, 2),
+                "response_bytes": int(row.response_bytes or 0),
+            }
+            for row in result
+        ]
@@ -0,0 +1,101 @@
+# backend/services/cpu_pool.py
+"""
+CPU 密集任务池
+OpenAPI 文档解析、$ref 展开和工具转换放到有界的线程池 / 进程池中执行，
+避免大文档阻塞事件循环（MCP 请求和 SSE 心跳）
+"""
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from core.config import CpuPoolConfig
+
+T = TypeVar("T")
+
+
+class CpuTaskPool:
+    """
+    CPU 密集任务池
+
+    - kind=thread：线程池，结果与调用方共享对象；纯 Python 代码仍受 GIL 限制，
+      但解释器会定期切换线程，事件循环不会被一次长任务完全阻塞
+    - kind=process：进程池，完全不占用事件循环所在进程的 GIL；参数和结果需要序列化，
+      函数必须是模块级函数，返回值必须可 pickle
+    - run_in_thread() 始终使用线程池，用于结果无法序列化的任务（如编译 Handler）
+    """
+
+    def __init__(self, config: Optional[CpuPoolConfig] = None):
+        self.config = config or CpuPoolConfig()
+        self._executor: Optional[Executor] = None
+        self._thread_executor: Optional[ThreadPoolExecutor] = None
+
+    def configure(self, config: CpuPoolConfig):
+        """
+        更新配置（应在提交任何任务之前调用）
+
+        Args:
+            config: 任务池配置
+        """
+        self.config = config
+
+    def _threads(self) -> ThreadPoolExecutor:
+        if self._thread_executor is None:
+            self._thread_executor = ThreadPoolExecutor(
+                max_workers=self.config.max_workers,
+                thread_name_prefix="synapse-cpu"
+            )
+        return self._thread_executor
+
+    def _pool(self) -> Executor:
+        if self.config.kind == "thread":
+            return self._threads()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.config.max_workers)
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在任务池中执行函数
+
+        Args:
+            func: 模块级函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+        """
+        if not self.config.enabled:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), functools.partial(func, *args, **kwargs))
+
+    async def run_in_thread(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        在线程池中执行函数（不论 kind 配置）
+
+        Args:
+            func: 函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            函数返回值
+        """
+        if not self.config.enabled:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._threads(), functools.partial(func, *args, **kwargs))
+
+    def shutdown(self):
+        """关闭任务池（不等待未开始的任务）"""
+        for executor in (self._executor, self._thread_executor):
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+        self._thread_executor = None
+
+
+# 全局 CPU 任务池实例
+cpu_pool = CpuTaskPool()
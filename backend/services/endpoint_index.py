@@ -0,0 +1,440 @@
+# backend/services/endpoint_index.py
+"""
+接口全文索引
+对所有服务文档中的接口（path、method、summary、description、operationId、tags）建立内存倒排索引，
+文档刷新时按接口增量更新，供 /api/v1/endpoints/search 分页检索
+"""
+import asyncio
+import bisect
+import heapq
+import re
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.database import DatabaseManager
+from repositories.service_repository import ServiceRepository
+from services.cpu_pool import cpu_pool
+from services.openapi_fetcher import fetch_openapi_spec
+
+HTTP_METHODS = ("get", "put", "post", "delete", "patch", "head", "options", "trace")
+
+# 各字段命中时的权重
+FIELD_WEIGHTS = {
+    "path": 3.0,
+    "operationId": 3.0,
+    "summary": 2.0,
+    "tags": 2.0,
+    "method": 1.0,
+    "description": 1.0,
+}
+# 前缀命中（如 pet 命中 pets）相对完整词命中的得分比例
+PREFIX_FACTOR = 0.6
+# 单个查询词最多展开的前缀词数
+MAX_PREFIX_EXPANSION = 500
+
+# 驼峰 / 下划线 / 路径分隔的英文单词、数字，以及逐字切分的中日韩字符
+_WORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]")
+_IDENTIFIER_PATTERN = re.compile(r"[A-Za-z0-9]+")
+
+
+def tokenize(text: str, identifiers: bool = False) -> List[str]:
+    """
+    切分文本为小写词
+
+    Args:
+        text: 文本
+        identifiers: 是否同时保留完整的标识符（如 getPetById 额外产生 getpetbyid）
+
+    Returns:
+        词列表（可能重复）
+    """
+    if not text:
+        return []
+    tokens = [token.lower() for token in _WORD_PATTERN.findall(text)]
+    if identifiers:
+        tokens.extend(word.lower() for word in _IDENTIFIER_PATTERN.findall(text) if len(word) > 1)
+    return tokens
+
+
+@dataclass(slots=True)
+class IndexedEndpoint:
+    """索引中的接口"""
+    service_id: int
+    service_name: str
+    service_url: str
+    method: str
+    path: str
+    summary: str
+    description: str
+    operation_id: str
+    tags: Tuple[str, ...]
+    # 词 -> 权重（各字段命中时取最大权重）
+    terms: Dict[str, float]
+
+    @property
+    def key(self) -> Tuple[int, str, str]:
+        return self.service_id, self.method, self.path
+
+    def same_as(self, other: "IndexedEndpoint") -> bool:
+        """索引内容是否相同"""
+        return (
+            self.service_name == other.service_name
+            and self.service_url == other.service_url
+            and self.summary == other.summary
+            and self.description == other.description
+            and self.operation_id == other.operation_id
+            and self.tags == other.tags
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "serviceId": self.service_id,
+            "serviceName": self.service_name,
+            "serviceUrl": self.service_url,
+            "method": self.method,
+            "path": self.path,
+            "summary": self.summary,
+            "description": self.description,
+            "operationId": self.operation_id,
+            "tags": list(self.tags),
+        }
+
+
+def build_documents(service_id: int, service_name: str, service_url: str, spec: Dict[str, Any]) -> List[IndexedEndpoint]:
+    """
+    从文档中提取待索引的接口（只读取元数据，不展开 schema；CPU 密集，应通过 cpu_pool 调用）
+
+    Args:
+        service_id: 服务 ID
+        service_name: 服务名称
+        service_url: 服务文档地址
+        spec: 解析后的 OpenAPI 文档
+
+    Returns:
+        接口列表
+    """
+    documents = []
+    for path, path_item in (spec.get("paths") or {}).items():
+        if not isinstance(path_item, dict):
+            continue
+        for method, operation in path_item.items():
+            if method not in HTTP_METHODS or not isinstance(operation, dict):
+                continue
+            summary = str(operation.get("summary") or "")
+            description = str(operation.get("description") or "")
+            operation_id = str(operation.get("operationId") or "")
+            tags = tuple(str(tag) for tag in operation.get("tags") or [])
+
+            terms: Dict[str, float] = {}
+            fields = (
+                ("path", tokenize(path, identifiers=True)),
+                ("operationId", tokenize(operation_id, identifiers=True)),
+                ("summary", tokenize(summary, identifiers=True)),
+                ("tags", [token for tag in tags for token in tokenize(tag, identifiers=True)]),
+                ("method", [method]),
+                ("description", tokenize(description, identifiers=True)),
+            )
+            for field_name, tokens in fields:
+                weight = FIELD_WEIGHTS[field_name]
+                for token in tokens:
+                    if terms.get(token, 0.0) < weight:
+                        terms[token] = weight
+
+            documents.append(IndexedEndpoint(
+                service_id=service_id,
+                service_name=service_name,
+                service_url=service_url,
+                method=method.upper(),
+                path=path,
+                summary=summary,
+                description=description,
+                operation_id=operation_id,
+                tags=tags,
+                terms=terms
+            ))
+    return documents
+
+
+class EndpointIndex:
+    """
+    接口倒排索引
+
+    - 每个服务的接口按 (method, path) 与上次索引的内容比较，只更新有变化的接口
+    - 查询词之间为 AND 关系；每个查询词同时匹配以它开头的词（前缀命中得分较低）
+    - 所有修改都在事件循环线程中进行，查询无需加锁
+    """
+
+    def __init__(self):
+        self._documents: Dict[int, IndexedEndpoint] = {}
+        self._keys: Dict[Tuple[int, str, str], int] = {}
+        self._service_documents: Dict[int, Set[int]] = {}
+        self._method_documents: Dict[str, Set[int]] = {}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._next_id = 1
+        # 有序词表，用于前缀查找（索引变化后按需重建）
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._db: Optional[DatabaseManager] = None
+        self._task: Optional[asyncio.Task] = None
+        # 同一时间只有一个 index_service 在写入（写入过程中会让出事件循环）
+        self._write_lock = asyncio.Lock()
+        # 服务 ID -> 删除次数；索引过程中服务被删除时丢弃本次结果
+        self._removals: Dict[int, int] = {}
+
+    async def start(self, db: DatabaseManager):
+        """
+        后台为所有已注册的服务建立索引
+
+        Args:
+            db: 数据库管理器
+        """
+        self._db = db
+        if self._task is None:
+            self._task = asyncio.create_task(self._index_all())
+
+    async def stop(self):
+        """停止后台建立索引的任务"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _index_all(self):
+        async with self._db.session_maker() as db:
+            services = await ServiceRepository(db).get_all()
+        for service in services:
+            await self.refresh_service(service.id, service.name, service.url)
+        print(f"🔎 Endpoint index ready: {len(self._documents)} endpoints from {len(self._service_documents)} services")
+
+    async def refresh_service(self, service_id: int, service_name: str, service_url: str) -> bool:
+        """
+        获取服务文档（经文档缓存）并更新索引，失败时只打印警告
+
+        Args:
+            service_id: 服务 ID
+            service_name: 服务名称
+            service_url: 服务文档地址
+
+        Returns:
+            是否成功
+        """
+        try:
+            spec = await fetch_openapi_spec(service_url)
+        except Exception as e:
+            print(f"⚠️  Failed to index endpoints of service '{service_name}': {e}")
+            return False
+        await self.index_service(service_id, service_name, service_url, spec)
+        return True
+
+    async def index_service(
+        self,
+        service_id: int,
+        service_name: str,
+        service_url: str,
+        spec: Dict[str, Any]
+    ) -> Dict[str, int]:
+        """
+        用文档增量更新某个服务的索引
+
+        Args:
+            service_id: 服务 ID
+            service_name: 服务名称
+            service_url: 服务文档地址
+            spec: 解析后的 OpenAPI 文档
+
+        Returns:
+            {"added": n, "updated": n, "removed": n}
+        """
+        removals = self._removals.get(service_id, 0)
+        documents = await cpu_pool.run(build_documents, service_id, service_name, service_url, spec)
+
+        counts = {"added": 0, "updated": 0, "removed": 0}
+        async with self._write_lock:
+            if self._removals.get(service_id, 0) != removals:
+                return counts
+            seen: Set[int] = set()
+            for position, document in enumerate(documents):
+                doc_id = self._keys.get(document.key)
+                if doc_id is not None:
+                    if self._documents[doc_id].same_as(document):
+                        seen.add(doc_id)
+                        continue
+                    self._remove(doc_id)
+                    counts["updated"] += 1
+                else:
+                    counts["added"] += 1
+                seen.add(self._add(document))
+                # 大文档分批写入，避免长时间占用事件循环
+                if position % 2000 == 1999:
+                    await asyncio.sleep(0)
+
+            for doc_id in list(self._service_documents.get(service_id, set()) - seen):
+                self._remove(doc_id)
+                counts["removed"] += 1
+            if not self._service_documents.get(service_id):
+                self._service_documents.pop(service_id, None)
+        return counts
+
+    async def remove_service(self, service_id: int) -> int:
+        """
+        从索引中删除服务（等待正在进行的写入完成，之前开始的索引结果将被丢弃）
+
+        Args:
+            service_id: 服务 ID
+
+        Returns:
+            删除的接口数
+        """
+        self._removals[service_id] = self._removals.get(service_id, 0) + 1
+        async with self._write_lock:
+            doc_ids = self._service_documents.pop(service_id, set())
+            for doc_id in list(doc_ids):
+                self._remove(doc_id)
+        return len(doc_ids)
+
+    def _add(self, document: IndexedEndpoint) -> int:
+        doc_id = self._next_id
+        self._next_id += 1
+        self._documents[doc_id] = document
+        self._keys[document.key] = doc_id
+        self._service_documents.setdefault(document.service_id, set()).add(doc_id)
+        self._method_documents.setdefault(document.method, set()).add(doc_id)
+        for term, weight in document.terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary_dirty = True
+            postings[doc_id] = weight
+        return doc_id
+
+    def _remove(self, doc_id: int):
+        document = self._documents.pop(doc_id)
+        self._keys.pop(document.key, None)
+        service_docs = self._service_documents.get(document.service_id)
+        if service_docs is not None:
+            service_docs.discard(doc_id)
+        self._method_documents.get(document.method, set()).discard(doc_id)
+        for term in document.terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocabulary_dirty = True
+
+    def _expand(self, term: str) -> Iterable[Tuple[str, float]]:
+        """查询词 -> (索引词, 得分系数)：完整命中和前缀命中"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+        start = bisect.bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:start + MAX_PREFIX_EXPANSION]:
+            if not token.startswith(term):
+                break
+            yield token, 1.0 if token == term else PREFIX_FACTOR
+
+    def search(
+        self,
+        query: str = "",
+        method: Optional[str] = None,
+        service_id: Optional[int] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        检索接口
+
+        Args:
+            query: 查询文本（为空时按加入索引的顺序列出全部接口）
+            method: 只返回该 HTTP 方法的接口
+            service_id: 只返回该服务的接口
+            offset: 跳过的结果数
+            limit: 返回的最大结果数
+
+        Returns:
+            (命中总数, 当前页结果)；结果按得分降序，得分相同时按服务名称和路径排序
+        """
+        method = method.upper() if method else None
+        documents = self._documents
+
+        # 方法和服务过滤先确定候选集
+        allowed: Optional[Set[int]] = None
+        if method is not None:
+            allowed = self._method_documents.get(method, set())
+        if service_id is not None:
+            service_docs = self._service_documents.get(service_id, set())
+            allowed = service_docs if allowed is None else allowed & service_docs
+
+        terms = list(dict.fromkeys(tokenize(query, identifiers=True)))
+        if not terms:
+            # 无查询词：按索引顺序（文档 ID）分页，不需要计算得分
+            if allowed is None:
+                total, page_ids = len(documents), list(islice(documents, offset, offset + limit))
+            else:
+                total, page_ids = len(allowed), sorted(allowed)[offset:offset + limit]
+            return total, [{**documents[doc_id].to_dict(), "score": 0.0} for doc_id in page_ids]
+
+        # 先处理命中文档少的词，缩小后续词的候选集
+        expanded = []
+        for term in terms:
+            tokens = list(self._expand(term))
+            expanded.append((sum(len(self._postings[token]) for token, _ in tokens), tokens))
+        expanded.sort(key=lambda item: item[0])
+
+        scores: Optional[Dict[int, float]] = None
+        for postings_size, tokens in expanded:
+            term_scores: Dict[int, float] = {}
+            candidates = scores if scores is not None else allowed
+            if candidates is not None and len(candidates) * len(tokens) < postings_size:
+                # 候选集较小：逐个候选文档查找
+                for doc_id in candidates:
+                    best = 0.0
+                    for token, factor in tokens:
+                        weight = self._postings[token].get(doc_id)
+                        if weight is not None and weight * factor > best:
+                            best = weight * factor
+                    if best:
+                        term_scores[doc_id] = best
+            else:
+                for token, factor in tokens:
+                    for doc_id, weight in self._postings[token].items():
+                        if candidates is not None and doc_id not in candidates:
+                            continue
+                        score = weight * factor
+                        if term_scores.get(doc_id, 0.0) < score:
+                            term_scores[doc_id] = score
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {doc_id: scores[doc_id] + score for doc_id, score in term_scores.items()}
+            if not scores:
+                return 0, []
+
+        # 只对当前页之前的结果排序
+        top = heapq.nsmallest(
+            offset + limit,
+            scores.items(),
+            key=lambda item: (-item[1], documents[item[0]].service_name, documents[item[0]].path, documents[item[0]].method)
+        )
+        return len(scores), [
+            {**documents[doc_id].to_dict(), "score": round(score, 3)}
+            for doc_id, score in top[offset:]
+        ]
+
+    def get_stats(self) -> dict:
+        """获取索引统计信息"""
+        return {
+            "services": len(self._service_documents),
+            "endpoints": len(self._documents),
+            "terms": len(self._postings),
+        }
+
+
+# 全局接口索引实例
+endpoint_index = EndpointIndex()
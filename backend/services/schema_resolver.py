@@ -0,0 +1,271 @@
+# backend/services/schema_resolver.py
+"""
+OpenAPI $ref 解析器
+按文档缓存已解析的组件，结果直接共享子树而不做深拷贝；
+循环引用在引用链上第二次出现处替换为占位对象，并按上下文缓存，不会重复展开。
+也可以不展开，而是把引用的组件提取到 JSON Schema $defs 中（见 hoist）
+"""
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+_MISSING = object()
+
+
+def _decode_pointer_token(token: str) -> str:
+    """JSON Pointer 转义：~1 表示 /，~0 表示 ~"""
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+class SchemaResolver:
+    """
+    单个 OpenAPI 文档的 $ref 解析器（同一文档的所有操作共用一个实例）
+
+    - 不含 $ref 的子树原样返回，包含 $ref 的节点只做浅拷贝
+    - 解析结果在多个调用方之间共享，调用方不能就地修改返回值
+    - 组件 X 的展开结果只取决于“当前引用链中 X 可达的那部分引用”，
+      以 (X, 引用链 ∩ reach(X)) 为键缓存；无环组件的键只有一个，整篇文档只展开一次
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        """
+        初始化解析器
+
+        Args:
+            spec: OpenAPI 文档（解析期间不会被修改）
+        """
+        self.spec = spec
+        self._targets: Dict[str, Any] = {}
+        self._direct_refs: Dict[str, FrozenSet[str]] = {}
+        self._reachable: Dict[str, FrozenSet[str]] = {}
+        self._resolved: Dict[Tuple[str, FrozenSet[str]], Any] = {}
+        self._placeholders: Dict[str, Dict[str, Any]] = {}
+        # hoist 模式：引用 -> $defs 中的名称 / 改写为本地引用后的组件定义
+        self._def_names: Dict[str, str] = {}
+        self._used_def_names: Set[str] = set()
+        self._hoisted: Dict[str, Any] = {}
+
+    def lookup(self, ref: str) -> Optional[Any]:
+        """
+        按本地 JSON Pointer 查找引用目标（不展开其中的 $ref）
+
+        Args:
+            ref: 引用，如 #/components/schemas/Pet
+
+        Returns:
+            引用目标，不存在时返回 None
+        """
+        target = self._target(ref)
+        return None if target is _MISSING else target
+
+    def resolve(self, schema: Any) -> Any:
+        """
+        展开 schema 中的全部 $ref
+
+        Args:
+            schema: schema 片段（字典、列表或标量）
+
+        Returns:
+            展开后的 schema；循环引用处为 {"$ref": ..., "description": "Circular reference detected"}，
+            不存在的引用为带错误描述的原节点
+        """
+        return self._resolve(schema, set())
+
+    def hoist(self, schema: Any, defs: Dict[str, Any]) -> Any:
+        """
+        将 schema 中的 $ref 改写为指向 #/$defs/<名称> 的本地引用，
+        并把引用的组件（含传递依赖）加入 defs；循环引用保持为引用，不会丢失结构
+
+        Args:
+            schema: schema 片段
+            defs: 输出的 $defs 字典（同一工具的多个 schema 共用一个）
+
+        Returns:
+            改写后的 schema（与 defs 一起放入同一个 JSON Schema 文档时有效）
+        """
+        return self._rewrite(schema, defs)
+
+    def _def_name(self, ref: str) -> str:
+        """为引用分配 $defs 名称：默认取 JSON Pointer 最后一段，重名时追加序号"""
+        name = self._def_names.get(ref)
+        if name is None:
+            base = _decode_pointer_token(ref.rstrip("/").rsplit("/", 1)[-1]) or "schema"
+            name, index = base, 2
+            while name in self._used_def_names:
+                name, index = f"{base}_{index}", index + 1
+            self._used_def_names.add(name)
+            self._def_names[ref] = name
+        return name
+
+    def _rewrite(self, node: Any, defs: Optional[Dict[str, Any]]) -> Any:
+        """改写 $ref 为本地引用（defs 为 None 时只改写，不收集依赖）"""
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                if self._target(ref) is _MISSING:
+                    return {key: value for key, value in node.items() if key != "$ref"} | {
+                        "description": f"Error: Reference '{ref}' not found"
+                    }
+                if defs is not None:
+                    self._collect_defs(ref, defs)
+                name = self._def_name(ref).replace("~", "~0").replace("/", "~1")
+                return {**node, "$ref": f"#/$defs/{name}"}
+            copied: Optional[Dict[str, Any]] = None
+            for key, value in node.items():
+                if isinstance(value, (dict, list)):
+                    rewritten = self._rewrite(value, defs)
+                    if rewritten is not value:
+                        if copied is None:
+                            copied = dict(node)
+                        copied[key] = rewritten
+            return node if copied is None else copied
+
+        if isinstance(node, list):
+            copied_list: Optional[List[Any]] = None
+            for index, value in enumerate(node):
+                if isinstance(value, (dict, list)):
+                    rewritten = self._rewrite(value, defs)
+                    if rewritten is not value:
+                        if copied_list is None:
+                            copied_list = list(node)
+                        copied_list[index] = rewritten
+            return node if copied_list is None else copied_list
+
+        return node
+
+    def _collect_defs(self, ref: str, defs: Dict[str, Any]):
+        """把引用及其传递依赖的组件定义加入 defs（组件只改写一次，之后共享）"""
+        if self._def_name(ref) in defs:
+            return
+        for item in (ref, *sorted(self._reach(ref))):
+            name = self._def_name(item)
+            if name in defs or self._target(item) is _MISSING:
+                continue
+            hoisted = self._hoisted.get(item, _MISSING)
+            if hoisted is _MISSING:
+                hoisted = self._hoisted[item] = self._rewrite(self._target(item), None)
+            defs[name] = hoisted
+
+    def _target(self, ref: str) -> Any:
+        target = self._targets.get(ref, _MISSING)
+        if target is not _MISSING or ref in self._targets:
+            return target
+
+        node: Any = self.spec
+        if ref.startswith("#"):
+            for part in ref[1:].lstrip("/").split("/"):
+                if not part:
+                    continue
+                part = _decode_pointer_token(part)
+                if isinstance(node, dict) and part in node:
+                    node = node[part]
+                elif isinstance(node, list) and part.isdigit() and int(part) < len(node):
+                    node = node[int(part)]
+                else:
+                    node = _MISSING
+                    break
+        else:
+            # 不支持外部文档引用
+            node = _MISSING
+        self._targets[ref] = node
+        return node
+
+    def _refs_in(self, ref: str) -> FrozenSet[str]:
+        """引用目标中直接出现的 $ref（不展开）"""
+        refs = self._direct_refs.get(ref)
+        if refs is not None:
+            return refs
+
+        found: Set[str] = set()
+        target = self._target(ref)
+        pending: List[Any] = [] if target is _MISSING else [target]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, dict):
+                value = node.get("$ref")
+                if isinstance(value, str):
+                    found.add(value)
+                    continue
+                pending.extend(child for child in node.values() if isinstance(child, (dict, list)))
+            elif isinstance(node, list):
+                pending.extend(child for child in node if isinstance(child, (dict, list)))
+
+        refs = self._direct_refs[ref] = frozenset(found)
+        return refs
+
+    def _reach(self, ref: str) -> FrozenSet[str]:
+        """从引用目标出发可传递到达的全部引用（处于环上时包含自身）"""
+        reach = self._reachable.get(ref)
+        if reach is not None:
+            return reach
+
+        seen: Set[str] = set()
+        pending = [ref]
+        while pending:
+            for child in self._refs_in(pending.pop()):
+                if child in seen:
+                    continue
+                seen.add(child)
+                known = self._reachable.get(child)
+                if known is not None:
+                    seen |= known
+                else:
+                    pending.append(child)
+
+        reach = self._reachable[ref] = frozenset(seen)
+        return reach
+
+    def _resolve_ref(self, ref: str, node: Dict[str, Any], chain: Set[str]) -> Any:
+        if ref in chain:
+            placeholder = self._placeholders.get(ref)
+            if placeholder is None:
+                placeholder = self._placeholders[ref] = {"$ref": ref, "description": "Circular reference detected"}
+            return placeholder
+
+        target = self._target(ref)
+        if target is _MISSING:
+            return {"description": f"Error: Reference '{ref}' not found", **node}
+
+        if chain:
+            reach = self._reach(ref)
+            context = frozenset(item for item in chain if item in reach)
+        else:
+            context = frozenset()
+        key = (ref, context)
+        cached = self._resolved.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+        chain.add(ref)
+        try:
+            resolved = self._resolve(target, chain)
+        finally:
+            chain.discard(ref)
+        self._resolved[key] = resolved
+        return resolved
+
+    def _resolve(self, node: Any, chain: Set[str]) -> Any:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                return self._resolve_ref(ref, node, chain)
+            copied: Optional[Dict[str, Any]] = None
+            for key, value in node.items():
+                if isinstance(value, (dict, list)):
+                    resolved = self._resolve(value, chain)
+                    if resolved is not value:
+                        if copied is None:
+                            copied = dict(node)
+                        copied[key] = resolved
+            return node if copied is None else copied
+
+        if isinstance(node, list):
+            copied_list: Optional[List[Any]] = None
+            for index, value in enumerate(node):
+                if isinstance(value, (dict, list)):
+                    resolved = self._resolve(value, chain)
+                    if resolved is not value:
+                        if copied_list is None:
+                            copied_list = list(node)
+                        copied_list[index] = resolved
+            return node if copied_list is None else copied_list
+
+        return node
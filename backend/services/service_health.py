@@ -0,0 +1,307 @@
+# backend/services/service_health.py
+"""
+服务健康检查调度器
+后台定期重新验证每个服务的 OpenAPI 文档（经文档缓存发起条件请求），记录耗时、
+更新服务状态，增量更新接口索引，并在文档内容变化时触发增量同步（services.spec_sync）
+"""
+import asyncio
+import hashlib
+import random
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from core.config import ServiceHealthConfig
+from core.database import DatabaseManager
+from models.service import ServiceHealth
+from repositories.scheduler_lease_repository import SchedulerLeaseRepository
+from repositories.service_health_repository import ServiceHealthRepository
+from repositories.service_repository import ServiceRepository
+from services.endpoint_index import endpoint_index
+from services.spec_cache import spec_cache
+from services.spec_sync import resync_service
+
+
+class ServiceHealthScheduler:
+    """
+    服务健康检查调度器
+
+    - 每个服务独立计划下次检查时间，间隔带随机抖动，首轮检查在启动后分散进行
+    - 同时进行的检查数不超过 max_concurrency
+    - 连续失败 failure_threshold 次后标记为 unhealthy，成功一次即恢复 healthy
+    - 上游不可用但有缓存的文档时仍计为失败（工具调用同样会失败）
+    - 多 worker 部署时只有持有数据库租约的 worker 运行后台检查，
+      避免每个服务被重复检查、重复同步和重复通知
+    """
+
+    # 数据库租约名称
+    LEASE_NAME = "service_health"
+
+    def __init__(self, config: Optional[ServiceHealthConfig] = None):
+        self.config = config or ServiceHealthConfig()
+        self._db: Optional[DatabaseManager] = None
+        self._task: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        # 服务 ID -> 下次检查时间（monotonic）
+        self._next_due: Dict[int, float] = {}
+        # 服务 ID -> 检查锁（后台检查与手动检查同一服务时串行进行）
+        self._service_locks: Dict[int, asyncio.Lock] = {}
+        self._checks = 0
+        self._failures = 0
+        self._resyncs = 0
+        self._worker_id = uuid.uuid4().hex
+        self._leader = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def lease_ttl(self) -> float:
+        """租约有效期：至少两个检查间隔，每轮检查时续期"""
+        return max(self.config.lease_ttl, self.config.interval * 2)
+
+    def configure(self, config: ServiceHealthConfig):
+        """
+        更新配置
+
+        Args:
+            config: 健康检查配置
+        """
+        self.config = config
+        self._semaphore = asyncio.Semaphore(config.max_concurrency)
+
+    async def start(self, db: DatabaseManager):
+        """
+        启动后台检查任务
+
+        Args:
+            db: 数据库管理器
+        """
+        self._db = db
+        if not self.config.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run_loop())
+
+    async def stop(self):
+        """停止后台任务（持有租约时释放，其他 worker 可立即接管）"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        if self._leader:
+            self._leader = False
+            try:
+                async with self._db.session_maker() as db:
+                    await SchedulerLeaseRepository(db).release(self.LEASE_NAME, self._worker_id)
+                    await db.commit()
+            except Exception as e:
+                print(f"Failed to release service health lease: {e}")
+
+    async def _acquire_lease(self) -> bool:
+        """获取或续期后台检查租约"""
+        try:
+            async with self._db.session_maker() as db:
+                acquired = await SchedulerLeaseRepository(db).try_acquire(
+                    self.LEASE_NAME, self._worker_id, self.lease_ttl
+                )
+                await db.commit()
+        except IntegrityError:
+            # 其他 worker 同时创建了租约
+            acquired = False
+
+        if acquired != self._leader:
+            print("🩺 Service health checks " + ("run in this worker" if acquired else "moved to another worker"))
+            self._leader = acquired
+        return acquired
+
+    def _next_interval(self) -> float:
+        """带抖动的检查间隔"""
+        jitter = self.config.jitter
+        return self.config.interval * random.uniform(1 - jitter, 1 + jitter)
+
+    async def _run_loop(self):
+        await asyncio.sleep(self.config.initial_delay)
+        while True:
+            try:
+                if await self._acquire_lease():
+                    await self._run_due()
+                else:
+                    # 由其他 worker 检查；接管时重新分散首轮检查
+                    self._next_due.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Service health check round failed: {e}")
+
+            now = time.monotonic()
+            delay = min(self._next_due.values(), default=now + self.config.interval) - now
+            await asyncio.sleep(min(max(delay, 1.0), self.config.interval))
+
+    async def _run_due(self):
+        """检查所有到期的服务"""
+        async with self._db.session_maker() as db:
+            service_ids = [service.id for service in await ServiceRepository(db).get_all()]
+            removed = await ServiceHealthRepository(db).delete_except(service_ids)
+            if removed:
+                await db.commit()
+
+        now = time.monotonic()
+        for service_id in list(self._next_due):
+            if service_id not in service_ids:
+                del self._next_due[service_id]
+        for service_id in list(self._service_locks):
+            if service_id not in service_ids and not self._service_locks[service_id].locked():
+                del self._service_locks[service_id]
+        for service_id in service_ids:
+            if service_id not in self._next_due:
+                # 新服务：在一个抖动窗口内分散首次检查
+                self._next_due[service_id] = now + random.uniform(0, self.config.interval * self.config.jitter)
+
+        due = [service_id for service_id, at in self._next_due.items() if at <= now]
+        if due:
+            await asyncio.gather(*(self._check_scheduled(service_id) for service_id in due))
+
+    async def _check_scheduled(self, service_id: int):
+        try:
+            await self.check_service(service_id)
+        except Exception as e:
+            print(f"Health check for service {service_id} failed: {e}")
+        finally:
+            if service_id in self._next_due:
+                self._next_due[service_id] = time.monotonic() + self._next_interval()
+
+    async def check_service(self, service_id: int) -> Optional[ServiceHealth]:
+        """
+        立即检查一个服务：重新验证文档、记录耗时、更新状态，文档变化时同步到组合
+
+        文档在数据库会话之外获取，之后在一个短事务中写入健康状态，
+        避免上游响应慢时长时间占用 SQLite 写锁；同一服务的检查串行进行
+
+        Args:
+            service_id: 服务 ID
+
+        Returns:
+            更新后的健康状态，服务不存在时返回 None
+        """
+        if self._db is None:
+            raise RuntimeError("Service health scheduler is not started")
+
+        lock = self._service_locks.setdefault(service_id, asyncio.Lock())
+        async with lock, self._semaphore:
+            async with self._db.session_maker() as db:
+                service = await ServiceRepository(db).get_by_id(service_id)
+                if service is None:
+                    return None
+                url = service.url
+
+            started = time.perf_counter()
+            spec, content_hash, changed_at, error = await self._fetch_spec(url)
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            async with self._db.session_maker() as db:
+                service = await ServiceRepository(db).get_by_id(service_id)
+                if service is None:
+                    return None
+                health = await ServiceHealthRepository(db).get_or_create(service_id)
+
+                now = datetime.now()
+                health.last_checked_at = now
+                health.latency_ms = round(latency_ms, 2)
+                spec_changed = False
+                if error is None:
+                    health.consecutive_failures = 0
+                    health.last_error = None
+                    health.last_success_at = now
+                    spec_changed = content_hash != health.spec_hash
+                else:
+                    health.consecutive_failures += 1
+                    health.last_error = error[:1000]
+
+                # 服务地址在获取期间被修改时，文档已不属于该服务，交给下一次检查
+                same_url = service.url == url
+                # 需要同步时，新的文档哈希在同步成功后才写入，同步失败时下次检查会重试
+                needs_resync = spec_changed and same_url and self.config.auto_resync
+                if spec_changed and not needs_resync:
+                    health.spec_hash = content_hash
+                    health.spec_changed_at = changed_at
+
+                status = "unhealthy" if health.consecutive_failures >= self.config.failure_threshold else "healthy"
+                if service.status != status:
+                    print(f"🩺 Service '{service.name}' is now {status}" + (f": {error}" if error else ""))
+                    service.status = status
+                    service.updated_at = now
+                await db.commit()
+
+                self._checks += 1
+                if error is not None:
+                    self._failures += 1
+                if spec is not None and same_url:
+                    await endpoint_index.index_service(service.id, service.name, service.url, spec)
+                if needs_resync:
+                    service_name = service.name
+                    try:
+                        result = await resync_service(db, service, spec=spec)
+                        health.spec_hash = content_hash
+                        health.spec_changed_at = changed_at
+                        await db.commit()
+                        if result.updated_combinations:
+                            self._resyncs += 1
+                    except Exception as e:
+                        await db.rollback()
+                        await db.refresh(health)
+                        print(f"Failed to resync service '{service_name}': {e}")
+                # 在会话关闭前生成响应模型，之后不再访问数据库对象
+                return ServiceHealth.from_orm(health)
+
+    async def _fetch_spec(
+        self,
+        url: str
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[datetime], Optional[str]]:
+        """
+        重新验证服务文档
+
+        Args:
+            url: 文档 URL 或本地路径
+
+        Returns:
+            (文档, 内容哈希, 内容变化时间, 错误信息)，失败时前三项为 None
+        """
+        try:
+            if url.startswith(("http://", "https://")):
+                entry, status = await spec_cache.fetch(url, force_refresh=True)
+                if status == "stale":
+                    return None, None, None, entry.last_error or "Upstream unavailable"
+                return entry.spec, entry.content_hash, datetime.fromtimestamp(entry.changed_at), None
+
+            path = Path(url)
+            content = await asyncio.to_thread(path.read_bytes)
+            spec = await spec_cache.read_local(path)
+            return spec, hashlib.sha256(content).hexdigest(), datetime.now(), None
+        except Exception as e:
+            return None, None, None, str(e) or type(e).__name__
+
+    def get_stats(self) -> dict:
+        """获取调度器统计信息"""
+        return {
+            "enabled": self.config.enabled,
+            "running": self.running,
+            "leader": self._leader,
+            "scheduled_services": len(self._next_due),
+            "checks": self._checks,
+            "failures": self._failures,
+            "resyncs": self._resyncs,
+        }
+
+
+# 全局服务健康检查调度器实例
+service_health_scheduler = ServiceHealthScheduler()
@@ -0,0 +1,304 @@
+# backend/services/spec_cache.py
+"""
+OpenAPI 文档缓存
+远程文档按 URL 保存到磁盘（含 ETag / Last-Modified 验证器），内存中保留最近使用的解析结果；
+缓存过期后发起条件请求，上游返回 304 或内容未变时直接复用已解析的文档
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import yaml
+
+from core.config import SpecCacheConfig
+from services.cpu_pool import cpu_pool
+from services.upstream_pool import upstream_pool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# libyaml 可用时使用 C 实现的 SafeLoader（快一个数量级）
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_spec_content(content: bytes | str, source: str) -> Dict[str, Any]:
+    """
+    解析 OpenAPI 文档内容（先按 JSON，失败后按 YAML）
+    安装了 orjson 时用 orjson 解析 JSON；CPU 密集，应通过 cpu_pool 调用
+
+    Args:
+        content: 文档内容
+        source: 文档来源（用于错误信息）
+
+    Returns:
+        解析后的文档
+
+    Raises:
+        ValueError: 内容无法解析时抛出
+    """
+    try:
+        if orjson is not None:
+            return orjson.loads(content)
+        return json.loads(content)
+    except (ValueError, UnicodeDecodeError):
+        try:
+            return yaml.load(content, Loader=YAML_LOADER)
+        except yaml.YAMLError as e:
+            raise ValueError(f"Could not parse OpenAPI spec content from {source}: {e}")
+
+
+@dataclass(slots=True)
+class CachedSpec:
+    """缓存的文档及其验证器"""
+    url: str
+    spec: Dict[str, Any]
+    content_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # 最近一次从上游确认（200 / 304）的时间
+    fetched_at: float = 0.0
+    # 内容最近一次变化的时间
+    changed_at: float = 0.0
+    # 最近一次重新验证失败的原因（成功后清空，不写入磁盘）
+    last_error: Optional[str] = None
+
+    def to_file(self) -> Dict[str, Any]:
+        """磁盘文件内容"""
+        return {
+            "url": self.url,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "content_hash": self.content_hash,
+            "fetched_at": self.fetched_at,
+            "changed_at": self.changed_at,
+            "spec": self.spec,
+        }
+
+
+class SpecCache:
+    """
+    OpenAPI 文档缓存
+
+    - revalidate_after 内直接返回缓存，不访问上游
+    - 过期后携带 If-None-Match / If-Modified-Since 重新验证，304 时复用已解析的文档
+    - 同一 URL 的并发请求合并为一次下载
+    - 上游不可用时返回过期的缓存（并打印警告）
+    - 返回的文档在调用方之间共享，不能就地修改
+    """
+
+    def __init__(self, config: Optional[SpecCacheConfig] = None):
+        self.config = config or SpecCacheConfig()
+        self._memory: "OrderedDict[str, CachedSpec]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # 本地文件：路径 -> ((mtime_ns, size), 解析结果)
+        self._files: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any]]]" = OrderedDict()
+
+    def configure(self, config: SpecCacheConfig):
+        """
+        更新配置
+
+        Args:
+            config: 文档缓存配置
+        """
+        self.config = config
+
+    @property
+    def directory(self) -> Path:
+        path = Path(self.config.directory)
+        if not path.is_absolute():
+            # 相对路径基于 backend 目录
+            path = Path(__file__).parent.parent / path
+        return path
+
+    def _cache_file(self, url: str) -> Path:
+        return self.directory / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _remember(self, entry: CachedSpec):
+        self._memory[entry.url] = entry
+        self._memory.move_to_end(entry.url)
+        while len(self._memory) > self.config.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read_file(self, url: str) -> Optional[CachedSpec]:
+        path = self._cache_file(url)
+        if not path.is_file():
+            return None
+        try:
+            data = json.loads(path.read_bytes())
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable spec cache file {path}: {e}")
+            return None
+        if data.get("url") != url:
+            return None
+        return CachedSpec(
+            url=url,
+            spec=data["spec"],
+            content_hash=data.get("content_hash", ""),
+            etag=data.get("etag"),
+            last_modified=data.get("last_modified"),
+            fetched_at=data.get("fetched_at", 0.0),
+            changed_at=data.get("changed_at", 0.0)
+        )
+
+    def _write_file(self, entry: CachedSpec):
+        path = self._cache_file(entry.url)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp = path.with_suffix(".tmp")
+        temp.write_text(json.dumps(entry.to_file(), ensure_ascii=False), encoding="utf-8")
+        # 原子替换，避免并发读到写了一半的文件
+        os.replace(temp, path)
+
+    async def _load(self, url: str) -> Optional[CachedSpec]:
+        """从内存或磁盘获取缓存条目"""
+        entry = self._memory.get(url)
+        if entry is None:
+            entry = await asyncio.to_thread(self._read_file, url)
+            if entry is not None:
+                self._remember(entry)
+        return entry
+
+    async def _store(self, entry: CachedSpec):
+        self._remember(entry)
+        try:
+            await asyncio.to_thread(self._write_file, entry)
+        except OSError as e:
+            print(f"Failed to write spec cache for {entry.url}: {e}")
+
+    async def fetch(self, url: str, force_refresh: bool = False) -> Tuple[CachedSpec, str]:
+        """
+        获取远程文档
+
+        Args:
+            url: 文档 URL
+            force_refresh: 忽略 revalidate_after，立即向上游重新验证
+
+        Returns:
+            (缓存条目, 状态)；状态为 cached（未访问上游）, not_modified（304 或内容未变）,
+            updated（内容有变化或首次下载）, stale（上游不可用，返回过期缓存）
+
+        Raises:
+            httpx.HTTPStatusError: 上游返回错误且没有缓存时抛出
+            httpx.RequestError: 网络错误且没有缓存时抛出
+            ValueError: 文档内容无法解析时抛出
+        """
+        if not self.config.enabled:
+            response = await upstream_pool.get_client(url).get(url, timeout=self.config.timeout)
+            response.raise_for_status()
+            content = response.content
+            now = time.time()
+            return CachedSpec(
+                url=url,
+                spec=await cpu_pool.run(parse_spec_content, content, url),
+                content_hash=hashlib.sha256(content).hexdigest(),
+                fetched_at=now,
+                changed_at=now
+            ), "updated"
+
+        lock = self._locks.setdefault(url, asyncio.Lock())
+        async with lock:
+            entry = await self._load(url)
+            now = time.time()
+            if entry is not None and not force_refresh and now - entry.fetched_at < self.config.revalidate_after:
+                return entry, "cached"
+
+            headers = {}
+            if entry is not None:
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+
+            try:
+                response = await upstream_pool.get_client(url).get(url, headers=headers, timeout=self.config.timeout)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except httpx.HTTPError as e:
+                if entry is None:
+                    raise
+                print(f"⚠️  Failed to revalidate OpenAPI spec {url}, serving cached copy: {e}")
+                entry.last_error = str(e) or type(e).__name__
+                return entry, "stale"
+
+            if response.status_code == 304 and entry is not None:
+                entry.fetched_at = now
+                entry.last_error = None
+                entry.etag = response.headers.get("ETag", entry.etag)
+                entry.last_modified = response.headers.get("Last-Modified", entry.last_modified)
+                await self._store(entry)
+                return entry, "not_modified"
+
+            content = response.content
+            content_hash = hashlib.sha256(content).hexdigest()
+            unchanged = entry is not None and entry.content_hash == content_hash
+            new_entry = CachedSpec(
+                url=url,
+                # 内容未变（上游不支持条件请求时）直接复用已解析的文档
+                spec=entry.spec if unchanged else await cpu_pool.run(parse_spec_content, content, url),
+                content_hash=content_hash,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                fetched_at=now,
+                changed_at=entry.changed_at if unchanged else now
+            )
+            await self._store(new_entry)
+            return new_entry, "not_modified" if unchanged else "updated"
+
+    async def read_local(self, path: Path) -> Dict[str, Any]:
+        """
+        读取本地文档，文件未修改时复用上次的解析结果
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            解析后的文档
+        """
+        stat = path.stat()
+        key = str(path.resolve())
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._files.get(key)
+        if cached is not None and cached[0] == version:
+            self._files.move_to_end(key)
+            return cached[1]
+
+        content = await asyncio.to_thread(path.read_bytes)
+        spec = await cpu_pool.run(parse_spec_content, content, str(path))
+        self._files[key] = (version, spec)
+        while len(self._files) > self.config.memory_entries:
+            self._files.popitem(last=False)
+        return spec
+
+    def invalidate(self, url: str):
+        """
+        删除某个 URL 的缓存（内存和磁盘）
+
+        Args:
+            url: 文档 URL
+        """
+        self._memory.pop(url, None)
+        try:
+            self._cache_file(url).unlink(missing_ok=True)
+        except OSError as e:
+            print(f"Failed to remove spec cache for {url}: {e}")
+
+    def get_stats(self) -> dict:
+        """获取缓存统计"""
+        return {
+            "enabled": self.config.enabled,
+            "memory_entries": len(self._memory),
+            "local_files": len(self._files),
+            "urls": list(self._memory.keys()),
+        }
+
+
+# 全局 OpenAPI 文档缓存实例
+spec_cache = SpecCache()
@@ -0,0 +1,202 @@
+# backend/services/spec_sync.py
+"""
+服务文档增量同步
+上游 OpenAPI 文档变化后，对比新提取的接口与组合中保存的接口定义，只更新有变化的接口，
+并且只让引用了这些组合的 MCP 前缀失效、只向这些前缀的会话发送 tools/list_changed
+"""
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from mcp.registry import server_registry
+from mcp.session import notify_tools_changed
+from models.db_models import ServiceDB
+from repositories.combination_repository import CombinationRepository
+from repositories.mcp_server_repository import McpServerRepository
+from repositories.service_repository import ServiceRepository
+from services.cpu_pool import cpu_pool
+from services.endpoint_index import endpoint_index
+from services.openapi_fetcher import extract_api_endpoints, fetch_openapi_spec
+
+# 从文档同步到组合接口中的字段（serviceName / serviceUrl / path / method 用于匹配，另行处理）
+SYNCED_FIELDS = ("summary", "description", "operationId", "parameters", "requestBody", "schemaDefs")
+
+
+@dataclass
+class ResyncResult:
+    """一次同步的结果"""
+    service_id: int
+    service_name: str
+    dry_run: bool = False
+    # 文档中的接口数
+    spec_endpoints: int = 0
+    # 引用该服务的组合接口数
+    referenced_endpoints: int = 0
+    # 有变化的接口：[{"combination_id", "combination_name", "method", "path", "fields"}]
+    changed: List[Dict[str, Any]] = field(default_factory=list)
+    # 文档中已不存在的接口（保留原定义，不删除）
+    missing: List[Dict[str, Any]] = field(default_factory=list)
+    updated_combinations: List[int] = field(default_factory=list)
+    affected_prefixes: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "service_id": self.service_id,
+            "service_name": self.service_name,
+            "dry_run": self.dry_run,
+            "spec_endpoints": self.spec_endpoints,
+            "referenced_endpoints": self.referenced_endpoints,
+            "changed": self.changed,
+            "missing": self.missing,
+            "updated_combinations": self.updated_combinations,
+            "affected_prefixes": self.affected_prefixes,
+        }
+
+
+def _references_service(endpoint: Dict[str, Any], service: ServiceDB, known_urls: Set[str]) -> bool:
+    """
+    判断组合接口是否来自该服务：按 serviceUrl 匹配；
+    serviceUrl 不属于任何现有服务时（服务地址被修改过）按 serviceName 匹配
+    """
+    url = endpoint.get("serviceUrl")
+    if url == service.url:
+        return True
+    return url not in known_urls and endpoint.get("serviceName") == service.name
+
+
+def _patch_endpoint(
+    stored: Dict[str, Any],
+    fresh: Dict[str, Any],
+    service: ServiceDB
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    用文档中的最新定义更新组合接口
+
+    Args:
+        stored: 组合中保存的接口
+        fresh: 新提取的接口（与文档共享子树，只读）
+        service: 服务
+
+    Returns:
+        (更新后的接口, 有变化的字段列表)
+    """
+    updates: Dict[str, Any] = {"serviceUrl": service.url}
+    for name in SYNCED_FIELDS:
+        if name in fresh:
+            updates[name] = fresh[name]
+        elif name == "schemaDefs":
+            updates[name] = None
+    # JSON 往返：与数据库中保存的形式一致，便于比较，同时不与缓存的文档共享对象
+    updates = json.loads(json.dumps(updates))
+    changed = [name for name, value in updates.items() if stored.get(name) != value]
+    if not changed:
+        return stored, []
+    return {**stored, **updates}, changed
+
+
+async def resync_service(
+    db: AsyncSession,
+    service: ServiceDB,
+    spec: Optional[Dict[str, Any]] = None,
+    dry_run: bool = False
+) -> ResyncResult:
+    """
+    将服务文档的最新接口定义同步到引用它的组合中
+
+    Args:
+        db: 数据库会话（有更新时在此提交）
+        service: 服务
+        spec: 已获取的文档，为空时强制重新验证后获取
+        dry_run: 只计算差异，不写入数据库、不发送通知
+
+    Returns:
+        同步结果
+
+    Raises:
+        ValueError / httpx.HTTPError / FileNotFoundError: 文档获取或解析失败时抛出
+    """
+    if spec is None:
+        spec = await fetch_openapi_spec(service.url, force_refresh=True)
+        if not dry_run:
+            await endpoint_index.index_service(service.id, service.name, service.url, spec)
+
+    result = ResyncResult(service_id=service.id, service_name=service.name, dry_run=dry_run)
+    # 按组合接口保存时的 schema 模式分别提取，需要时才提取
+    extracted: Dict[str, Dict[Tuple[str, str], Dict[str, Any]]] = {}
+
+    async def fresh_endpoints(schema_mode: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        if schema_mode not in extracted:
+            endpoints = await cpu_pool.run(extract_api_endpoints, spec, schema_mode=schema_mode)
+            extracted[schema_mode] = {(endpoint["method"], endpoint["path"]): endpoint for endpoint in endpoints}
+        return extracted[schema_mode]
+
+    result.spec_endpoints = len(await fresh_endpoints("inline"))
+    known_urls = {item.url for item in await ServiceRepository(db).get_all()}
+
+    changed_ids: Set[int] = set()
+    for combination in await CombinationRepository(db).get_all():
+        patched_endpoints = []
+        modified = False
+        for stored in combination.endpoints or []:
+            if not _references_service(stored, service, known_urls):
+                patched_endpoints.append(stored)
+                continue
+
+            result.referenced_endpoints += 1
+            method = str(stored.get("method", "")).upper()
+            path = stored.get("path", "")
+            schema_mode = "defs" if stored.get("schemaDefs") else "inline"
+            fresh = (await fresh_endpoints(schema_mode)).get((method, path))
+            if fresh is None:
+                result.missing.append({
+                    "combination_id": combination.id,
+                    "combination_name": combination.name,
+                    "method": method,
+                    "path": path,
+                })
+                patched_endpoints.append(stored)
+                continue
+
+            patched, fields = _patch_endpoint(stored, fresh, service)
+            if fields:
+                modified = True
+                result.changed.append({
+                    "combination_id": combination.id,
+                    "combination_name": combination.name,
+                    "method": method,
+                    "path": path,
+                    "fields": fields,
+                })
+            patched_endpoints.append(patched)
+
+        if modified:
+            changed_ids.add(combination.id)
+            if not dry_run:
+                # 整体赋值，JSON 列才会被标记为已修改
+                combination.endpoints = patched_endpoints
+                combination.updated_at = datetime.now()
+
+    result.updated_combinations = sorted(changed_ids)
+    if not changed_ids:
+        return result
+
+    result.affected_prefixes = sorted(
+        server.prefix
+        for server in await McpServerRepository(db).get_all()
+        if changed_ids.intersection(server.combination_ids or [])
+    )
+    if dry_run:
+        return result
+
+    await db.flush()
+    await db.commit()
+
+    for prefix in result.affected_prefixes:
+        await server_registry.invalidate(prefix)
+        await notify_tools_changed(prefix)
+    print(f"🔄 Resynced service '{service.name}': {len(result.changed)} endpoint(s) updated in "
+          f"{len(changed_ids)} combination(s), prefixes: {', '.join(result.affected_prefixes) or '-'}")
+    return result
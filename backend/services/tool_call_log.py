@@ -0,0 +1,230 @@
+# backend/services/tool_call_log.py
+"""
+工具调用审计日志（write-behind）
+调用路径只把记录追加到内存环形缓冲区，后台任务按批量 / 定时策略写入数据库
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from core.config import ToolCallLogConfig
+from core.database import DatabaseManager
+from repositories.tool_call_log_repository import ToolCallLogRepository
+
+
+@dataclass(slots=True)
+class ToolCallRecord:
+    """一次工具调用（参数摘要在后台刷新时计算）"""
+    prefix: str
+    tool_name: str
+    arguments: Any
+    status: str
+    error: Optional[str]
+    latency_ms: float
+    response_bytes: int
+    created_at: datetime
+
+    def to_row(self) -> Dict[str, Any]:
+        """转换为数据库行"""
+        return {
+            "prefix": self.prefix,
+            "tool_name": self.tool_name,
+            "arguments_hash": hash_arguments(self.arguments),
+            "status": self.status,
+            "error": self.error,
+            "latency_ms": self.latency_ms,
+            "response_bytes": self.response_bytes,
+            "created_at": self.created_at,
+        }
+
+
+def hash_arguments(arguments: Any) -> str:
+    """
+    计算工具参数的 SHA-256 摘要（键排序，相同参数得到相同摘要）
+
+    Args:
+        arguments: 工具参数
+
+    Returns:
+        十六进制摘要
+    """
+    payload = json.dumps(arguments or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ToolCallLogger:
+    """
+    工具调用审计日志记录器
+
+    - record() 为 O(1) 内存操作，不在 tools/call 热路径上访问数据库
+    - 缓冲区达到 batch_size 时立即唤醒刷新，否则每 flush_interval 秒刷新一次
+    - 缓冲区有上限，写满后按 overflow_policy 丢弃记录（计入 dropped）
+    """
+
+    def __init__(self, config: Optional[ToolCallLogConfig] = None):
+        self.config = config or ToolCallLogConfig()
+        self._buffer: Deque[ToolCallRecord] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._db: Optional[DatabaseManager] = None
+        self._flushed = 0
+        self._dropped = 0
+        self._failed = 0
+        self._last_flush_at: Optional[datetime] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def configure(self, config: ToolCallLogConfig):
+        """
+        更新配置
+
+        Args:
+            config: 审计日志配置
+        """
+        self.config = config
+
+    async def start(self, db: DatabaseManager):
+        """
+        启动后台刷新任务
+
+        Args:
+            db: 数据库管理器
+        """
+        if not self.config.enabled or self._task is not None:
+            return
+        self._db = db
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """停止后台任务，并把缓冲区中剩余的记录写入数据库"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while self._buffer:
+            if not await self.flush():
+                break
+
+    def record(
+        self,
+        prefix: str,
+        tool_name: str,
+        arguments: Any,
+        status: str,
+        latency_ms: float,
+        response_bytes: int = 0,
+        error: Optional[str] = None
+    ):
+        """
+        记录一次工具调用（非阻塞）
+
+        Args:
+            prefix: MCP Server 前缀
+            tool_name: 工具名称
+            arguments: 工具参数（只保存摘要）
+            status: 调用结果 success / error
+            latency_ms: 调用耗时（毫秒）
+            response_bytes: 上游响应大小（字节）
+            error: 错误信息
+        """
+        if self._task is None:
+            return
+
+        if len(self._buffer) >= self.config.buffer_size:
+            self._dropped += 1
+            if self.config.overflow_policy == "drop_newest":
+                return
+            self._buffer.popleft()
+
+        self._buffer.append(ToolCallRecord(
+            prefix=prefix,
+            tool_name=tool_name,
+            arguments=arguments,
+            status=status,
+            error=error,
+            latency_ms=latency_ms,
+            response_bytes=response_bytes,
+            created_at=datetime.now()
+        ))
+
+        if len(self._buffer) >= self.config.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> bool:
+        """
+        将一批记录写入数据库
+
+        Returns:
+            是否写入成功（失败的批次直接丢弃并计入 failed，避免重复写入和内存堆积）
+        """
+        if not self._buffer or self._db is None:
+            return True
+
+        count = min(len(self._buffer), self.config.batch_size)
+        batch: List[ToolCallRecord] = [self._buffer.popleft() for _ in range(count)]
+        try:
+            rows = [record.to_row() for record in batch]
+            async with self._db.get_session() as session:
+                await ToolCallLogRepository(session).add_batch(rows)
+        except Exception as e:
+            self._failed += len(batch)
+            print(f"Failed to flush {len(batch)} tool call logs: {e}")
+            return False
+
+        self._flushed += len(batch)
+        self._last_flush_at = datetime.now()
+        return True
+
+    async def _flush_loop(self):
+        """后台刷新任务：达到批量大小或到达刷新间隔时写入"""
+        while True:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.config.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+                started = time.monotonic()
+                while self._buffer:
+                    if not await self.flush():
+                        break
+                    # 缓冲区不足一批时等下一个周期，避免频繁小批量写入
+                    if len(self._buffer) < self.config.batch_size:
+                        break
+                    # 持续高负载时让出事件循环
+                    if time.monotonic() - started > self.config.flush_interval:
+                        break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error in tool call log flush task: {e}")
+
+    def get_stats(self) -> dict:
+        """获取审计日志缓冲区统计"""
+        return {
+            "enabled": self.config.enabled,
+            "running": self.running,
+            "buffered": len(self._buffer),
+            "buffer_size": self.config.buffer_size,
+            "flushed": self._flushed,
+            "dropped": self._dropped,
+            "failed": self._failed,
+            "last_flush_at": self._last_flush_at,
+        }
+
+
+# 全局工具调用审计日志实例
+tool_call_logger = ToolCallLogger()
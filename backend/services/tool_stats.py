@@ -0,0 +1,187 @@
+# backend/services/tool_stats.py
+"""
+工具调用滚动窗口统计
+按分钟分桶在内存中聚合调用次数、错误、响应大小和对数刻度延迟直方图，
+仪表盘查询时只合并窗口内的桶，不扫描审计日志表
+"""
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+# 最长统计窗口（分钟），超过的分钟桶会被丢弃
+MAX_WINDOW_MINUTES = 60
+
+# 延迟直方图刻度：每个桶的上界是下界的 2^(1/8) 倍（相对误差约 9%）
+_BINS_PER_OCTAVE = 8
+_LOG_BASE = math.log(2) / _BINS_PER_OCTAVE
+# 小于该值（毫秒）的延迟归入第 0 桶
+_MIN_LATENCY_MS = 0.01
+
+
+def _latency_bin(latency_ms: float) -> int:
+    """计算延迟所在的对数刻度桶号"""
+    if latency_ms <= _MIN_LATENCY_MS:
+        return 0
+    return max(0, math.ceil(math.log(latency_ms / _MIN_LATENCY_MS) / _LOG_BASE))
+
+
+def _bin_upper_bound(index: int) -> float:
+    """桶号对应的延迟上界（毫秒）"""
+    return _MIN_LATENCY_MS * math.exp(index * _LOG_BASE)
+
+
+@dataclass(slots=True)
+class MinuteBucket:
+    """单个工具一分钟内的聚合数据"""
+    minute: int
+    calls: int = 0
+    errors: int = 0
+    response_bytes: int = 0
+    latency_sum_ms: float = 0.0
+    # 稀疏直方图：桶号 -> 次数
+    latency_bins: Dict[int, int] = field(default_factory=dict)
+
+
+class ToolStatsAggregator:
+    """
+    工具调用统计聚合器
+
+    每个 (prefix, tool) 保留最近 MAX_WINDOW_MINUTES 个分钟桶；
+    record() 为 O(1)，snapshot() 的开销与工具数 × 窗口分钟数成正比。
+    """
+
+    def __init__(self):
+        self._tools: Dict[Tuple[str, str], Deque[MinuteBucket]] = {}
+
+    def record(self, prefix: str, tool_name: str, status: str, latency_ms: float, response_bytes: int = 0):
+        """
+        记录一次工具调用
+
+        Args:
+            prefix: MCP Server 前缀
+            tool_name: 工具名称
+            status: 调用结果 success / error
+            latency_ms: 调用耗时（毫秒）
+            response_bytes: 上游响应大小（字节）
+        """
+        minute = int(time.time() // 60)
+        buckets = self._tools.get((prefix, tool_name))
+        if buckets is None:
+            buckets = self._tools[(prefix, tool_name)] = deque()
+
+        if not buckets or buckets[-1].minute != minute:
+            buckets.append(MinuteBucket(minute=minute))
+            while buckets[0].minute <= minute - MAX_WINDOW_MINUTES:
+                buckets.popleft()
+
+        bucket = buckets[-1]
+        bucket.calls += 1
+        if status != "success":
+            bucket.errors += 1
+        bucket.response_bytes += response_bytes
+        bucket.latency_sum_ms += latency_ms
+        index = _latency_bin(latency_ms)
+        bucket.latency_bins[index] = bucket.latency_bins.get(index, 0) + 1
+
+    @staticmethod
+    def _percentiles(bins: Dict[int, int], total: int, quantiles: Tuple[float, ...]) -> List[Optional[float]]:
+        """按合并后的直方图计算分位数（返回所在桶的上界）"""
+        if not total:
+            return [None] * len(quantiles)
+        results: List[Optional[float]] = []
+        ordered = sorted(bins.items())
+        for q in quantiles:
+            rank = max(1, math.ceil(q * total))
+            cumulative = 0
+            for index, count in ordered:
+                cumulative += count
+                if cumulative >= rank:
+                    results.append(round(_bin_upper_bound(index), 2))
+                    break
+        return results
+
+    def snapshot(
+        self,
+        window_minutes: int = 15,
+        limit: int = 10,
+        sort_by: str = "calls",
+        prefix: Optional[str] = None
+    ) -> dict:
+        """
+        获取滚动窗口内的工具统计
+
+        Args:
+            window_minutes: 统计窗口（分钟，最大 MAX_WINDOW_MINUTES）
+            limit: 返回的工具数
+            sort_by: 排序字段（calls / p95_ms / error_rate / response_bytes）
+            prefix: 只统计指定前缀
+
+        Returns:
+            窗口统计和按排序字段取前 limit 的工具列表
+        """
+        window_minutes = max(1, min(window_minutes, MAX_WINDOW_MINUTES))
+        current_minute = int(time.time() // 60)
+        oldest = current_minute - window_minutes + 1
+
+        tools = []
+        total_calls = total_errors = 0
+        for key in list(self._tools.keys()):
+            buckets = self._tools[key]
+            # 清理整个保留期内都没有调用的工具
+            if buckets[-1].minute <= current_minute - MAX_WINDOW_MINUTES:
+                del self._tools[key]
+                continue
+            tool_prefix, tool_name = key
+            if prefix and tool_prefix != prefix:
+                continue
+
+            calls = errors = response_bytes = 0
+            latency_sum = 0.0
+            bins: Dict[int, int] = {}
+            for bucket in reversed(buckets):
+                if bucket.minute < oldest:
+                    break
+                calls += bucket.calls
+                errors += bucket.errors
+                response_bytes += bucket.response_bytes
+                latency_sum += bucket.latency_sum_ms
+                for index, count in bucket.latency_bins.items():
+                    bins[index] = bins.get(index, 0) + count
+            if not calls:
+                continue
+
+            p50, p95, p99 = self._percentiles(bins, calls, (0.5, 0.95, 0.99))
+            tools.append({
+                "prefix": tool_prefix,
+                "tool": tool_name,
+                "calls": calls,
+                "calls_per_minute": round(calls / window_minutes, 2),
+                "errors": errors,
+                "error_rate": round(errors / calls, 4),
+                "avg_ms": round(latency_sum / calls, 2),
+                "p50_ms": p50,
+                "p95_ms": p95,
+                "p99_ms": p99,
+                "response_bytes": response_bytes,
+            })
+            total_calls += calls
+            total_errors += errors
+
+        if sort_by not in ("calls", "p95_ms", "error_rate", "response_bytes"):
+            sort_by = "calls"
+        tools.sort(key=lambda item: item[sort_by] or 0, reverse=True)
+
+        return {
+            "window_minutes": window_minutes,
+            "total_calls": total_calls,
+            "total_errors": total_errors,
+            "error_rate": round(total_errors / total_calls, 4) if total_calls else 0.0,
+            "tool_count": len(tools),
+            "tools": tools[:limit],
+        }
+
+
+# 全局工具调用统计实例
+tool_stats = ToolStatsAggregator()
@@ -0,0 +1,158 @@
+# backend/services/upstream_pool.py
+"""
+上游 HTTP 连接池
+按上游基础 URL 复用长连接的 httpx.AsyncClient，支持 HTTP/2 与 keepalive
+"""
+from http.cookiejar import CookieJar
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from core.config import UpstreamConfig
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class _DiscardCookieJar(CookieJar):
+    """
+    不保存任何 Cookie 的 Cookie 罐
+
+    共享客户端被所有会话和前缀复用，上游 Set-Cookie 若被保存，
+    会随之后任意调用方的请求发往同一上游。
+    """
+
+    def set_cookie(self, cookie):
+        pass
+
+    def extract_cookies(self, response, request):
+        pass
+
+
+class UpstreamClientPool:
+    """
+    上游客户端池
+
+    每个上游源（scheme://host:port）对应一个长连接客户端，
+    工具调用复用已建立的 TCP/TLS 连接，不再每次握手。
+    客户端不保存上游返回的 Cookie，避免在不同调用方之间泄漏。
+    """
+
+    def __init__(self, config: Optional[UpstreamConfig] = None):
+        self.config = config or UpstreamConfig()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._warned_http2 = False
+
+    def configure(self, config: UpstreamConfig):
+        """
+        更新连接池配置（应在创建任何客户端之前调用）
+
+        Args:
+            config: 上游连接池配置
+        """
+        self.config = config
+
+    @staticmethod
+    def _origin(base_url: str) -> str:
+        """提取上游源（scheme://host:port）作为连接池键"""
+        parts = urlsplit(base_url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _use_http2(self) -> bool:
+        """判断是否启用 HTTP/2，未安装 h2 时回退到 HTTP/1.1"""
+        if not self.config.http2:
+            return False
+        if not HTTP2_AVAILABLE:
+            if not self._warned_http2:
+                print("⚠️  未安装 h2，上游连接回退到 HTTP/1.1（uv sync --extra http2）")
+                self._warned_http2 = True
+            return False
+        return True
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        """
+        获取指定上游的共享客户端
+
+        Args:
+            base_url: 上游服务基础 URL
+
+        Returns:
+            长连接 httpx.AsyncClient
+        """
+        origin = self._origin(base_url)
+        client = self._clients.get(origin)
+        if client is None or client.is_closed:
+            cfg = self.config
+            client = httpx.AsyncClient(
+                http2=self._use_http2(),
+                limits=httpx.Limits(
+                    max_connections=cfg.max_connections,
+                    max_keepalive_connections=cfg.max_keepalive_connections,
+                    keepalive_expiry=cfg.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(cfg.timeout, connect=cfg.connect_timeout),
+                cookies=_DiscardCookieJar(),
+            )
+            self._clients[origin] = client
+        return client
+
+    def get_timeout(self, service_name: str = "", base_url: str = "") -> httpx.Timeout:
+        """
+        获取指定服务的请求超时
+
+        优先按服务名称匹配，其次按基础 URL 匹配，否则使用默认超时。
+
+        Args:
+            service_name: 服务名称
+            base_url: 服务基础 URL
+
+        Returns:
+            httpx.Timeout
+        """
+        overrides = self.config.service_timeouts
+        timeout = overrides.get(service_name) or overrides.get(base_url) or self.config.timeout
+        return httpx.Timeout(timeout, connect=self.config.connect_timeout)
+
+    async def aclose(self):
+        """关闭所有上游客户端"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def get_stats(self) -> dict:
+        """
+        获取连接池统计信息
+
+        Returns:
+            每个上游的连接数（使用中 / 空闲）和等待连接的请求数
+        """
+        upstreams = {}
+        for origin, client in self._clients.items():
+            # httpx 未公开连接池统计，这里读取 httpcore 连接池状态
+            pool = getattr(client._transport, "_pool", None)
+            connections = list(getattr(pool, "connections", []))
+            idle = sum(1 for conn in connections if conn.is_idle())
+            waiting = sum(
+                1 for pool_request in getattr(pool, "_requests", [])
+                if pool_request.is_queued()
+            )
+            upstreams[origin] = {
+                "connections": len(connections),
+                "in_use": len(connections) - idle,
+                "idle": idle,
+                "waiting": waiting,
+                "http2": self._use_http2(),
+            }
+
+        return {
+            "total_upstreams": len(upstreams),
+            "upstreams": upstreams,
+        }
+
+
+# 全局上游连接池实例
+upstream_pool = UpstreamClientPool()
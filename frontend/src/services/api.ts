@@ -661,3 +661,45 @@ export async function getDashboardStats(): Promise<DashboardStats> {
 
   return response.json();
 }
+
+export interface ToolStatsItem {
+  prefix: string;
+  tool: string;
+  calls: number;
+  calls_per_minute: number;
+  errors: number;
+  error_rate: number;
+  avg_ms: number;
+  p50_ms: number | null;
+  p95_ms: number | null;
+  p99_ms: number | null;
+  response_bytes: number;
+}
+
+export interface ToolStats {
+  window_minutes: number;
+  total_calls: number;
+  total_errors: number;
+  error_rate: number;
+  tool_count: number;
+  tools: ToolStatsItem[];
+}
+
+/**
+ * 获取滚动窗口内的工具调用统计（热门工具、延迟分位数、错误率）
+ */
+export async function getToolStats(
+  window: number = 15,
+  sort: 'calls' | 'p95_ms' | 'error_rate' | 'response_bytes' = 'calls',
+  limit: number = 10
+): Promise<ToolStats> {
+  const params = new URLSearchParams({ window: String(window), sort, limit: String(limit) });
+  const response = await fetchWithAuth(`${BASE_URL}/api/v1/dashboard/tools?${params}`);
+
+  if (!response.ok) {
+    const errorData = await response.json().catch(() => ({ detail: 'An unknown error occurred' }));
+    throw new Error(errorData.detail || `HTTP error! status: ${response.status}`);
+  }
+
+  return response.json();
+}